@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+事件研究回测基准测试
+随机生成 (日期 × 股票) 收盘价矩阵与交易记录, 测量 backtest.py 中事件表构建、
+向量化远期/超额收益计算与分组汇总的耗时; 另取一部分事件按逐个事件循环的方式计算,
+按比例折算为全部事件的耗时作为对照, 并核对两种方式的结果一致。
+
+用法:
+    python trades/bench/bench_backtest.py --events 100000 --tickers 500 --days 504
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import backtest  # noqa: E402
+
+
+def random_closes(n_tickers, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2026-01-02', periods=n_days)
+    columns = [f"T{i:04d}" for i in range(n_tickers)] + [backtest.BENCHMARK]
+    returns = rng.normal(0.0005, 0.02, size=(n_days, len(columns)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=columns)
+
+
+def random_records(closes, n_events, seed=0):
+    """国会交易格式的记录; 少量代码不在价格矩阵中"""
+    rng = np.random.default_rng(seed)
+    tickers = list(closes.columns[:-1]) + ['MISSING']
+    disclosed = closes.index[rng.integers(0, len(closes), n_events)] + pd.to_timedelta(rng.integers(0, 3, n_events), 'D')
+    return [{
+        "politician": f"P{p:03d}",
+        "ticker": ticker,
+        "transaction_type": kind,
+        "transaction_date": (day - pd.Timedelta(days=30)).strftime('%Y-%m-%d'),
+        "disclosure_date": day.strftime('%Y-%m-%d'),
+    } for p, ticker, kind, day in zip(rng.integers(0, 400, n_events), rng.choice(tickers, n_events),
+                                      rng.choice(['Purchase', 'Sale (Partial)', 'Sale (Full)'], n_events), disclosed)]
+
+
+def loop_returns(events, closes, horizons):
+    """逐个事件查找入场与出场价 (对照实现)"""
+    result = np.full((len(events), len(horizons)), np.nan)
+    bench = closes[backtest.BENCHMARK]
+    for i, (ticker, day) in enumerate(zip(events['ticker'], events['date'])):
+        if ticker not in closes:
+            continue
+        entry = closes.index.searchsorted(day, 'right')
+        for j, horizon in enumerate(horizons):
+            if entry + horizon < len(closes):
+                stock = closes[ticker].iloc[entry + horizon] / closes[ticker].iloc[entry] - 1
+                result[i, j] = stock - (bench.iloc[entry + horizon] / bench.iloc[entry] - 1)
+    return result
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = func()
+        timings.append(time.perf_counter() - started)
+    return value, sorted(timings)[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件研究回测基准测试")
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=504)
+    parser.add_argument('--loop-sample', type=int, default=2000, help="循环对照实现计算的事件数")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    closes = random_closes(args.tickers, args.days)
+    records = random_records(closes, args.events)
+
+    events, build = timed(lambda: backtest._events('congress', records, ('disclosure_date', 'transaction_date'),
+                                                   'politician'), args.repeat)
+    (returns, abnormal), study = timed(lambda: backtest.event_study(events, closes), args.repeat)
+    (groups, _), summary = timed(lambda: backtest.summarize(events, returns, abnormal), args.repeat)
+
+    sample = events.iloc[:args.loop_sample]
+    expected, loop = timed(lambda: loop_returns(sample, closes, backtest.HORIZONS), 1)
+    matches = np.allclose(expected, abnormal[:len(sample)], equal_nan=True)
+
+    print(f"📈 {len(events)} 个事件 ({args.events} 条记录) × {len(backtest.HORIZONS)} 个期限, "
+          f"{args.tickers} 只股票 × {args.days} 个交易日")
+    print(f"  事件表构建       {build:.3f}s")
+    print(f"  远期/超额收益     {study:.3f}s")
+    print(f"  分组汇总         {summary:.3f}s ({len(groups)} 组)")
+    print(f"  合计             {build + study + summary:.3f}s")
+    print(f"  逐事件循环       {loop:.3f}s / {len(sample)} 个, 折算全部约 {loop * len(events) / len(sample):.1f}s")
+    print(f"  与循环结果一致: {'是' if matches else '否'}")
+    return 0 if matches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
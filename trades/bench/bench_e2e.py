@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试
+启动本地替身服务 (见 fake_services.py), 在临时目录中以不同规模的监控列表运行完整管道
+(收集 → 简报 → 网页 → 通知), 记录总耗时、峰值内存 (RSS) 与各阶段耗时,
+结果写入 JSON 文件, 便于比较不同改动。
+
+用法:
+    python trades/bench/bench_e2e.py                          # 10/100/1000/5000 只股票
+    python trades/bench/bench_e2e.py --sizes 10,100 --warm    # 额外测量第二次 (缓存命中) 运行
+    python trades/bench/bench_e2e.py --latency yahoo=0.05 --output /tmp/e2e.json
+    python trades/bench/bench_e2e.py --sizes 100 --in-process  # 管道的单进程模式
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+
+import fake_services
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+DEFAULT_OUTPUT = os.path.join(ROOT, 'trades', 'data', 'bench', 'e2e_results.json')
+
+
+def prepare_root(root, n_tickers, archive):
+    """临时工作目录: 含 n_tickers 只股票的监控列表, 可选复制历史简报"""
+    os.makedirs(os.path.join(root, 'trades', 'config'), exist_ok=True)
+    with open(os.path.join(ROOT, 'trades', 'config', 'watchlist.json'), 'r') as f:
+        watchlist = json.load(f)
+    watchlist['tickers'] = [f"B{i:04d}" for i in range(n_tickers)]
+    with open(os.path.join(root, 'trades', 'config', 'watchlist.json'), 'w') as f:
+        json.dump(watchlist, f, indent=2)
+    shutil.copy(os.path.join(ROOT, 'trades', 'config', 'settings.json'), os.path.join(root, 'trades', 'config'))
+
+    briefs = os.path.join(root, 'trades', 'output', 'briefs')
+    if archive:
+        shutil.copytree(os.path.join(ROOT, 'trades', 'output', 'briefs'), briefs, dirs_exist_ok=True)
+    os.makedirs(briefs, exist_ok=True)
+
+
+def run_child(command, env):
+    """在子进程中运行并报告其所有后代进程的峰值 RSS (--child 模式的入口)"""
+    proc = subprocess.run(command, env=env, capture_output=True, text=True)
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux 上 ru_maxrss 以 KB 为单位, macOS 上以字节为单位
+    peak_kb = usage.ru_maxrss / 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    print(json.dumps({"returncode": proc.returncode, "peak_rss_kb": peak_kb,
+                      "output_tail": (proc.stdout + proc.stderr)[-4000:]}))
+
+
+def run_once(root, env, in_process=False):
+    """运行一次完整管道, 返回结果字典"""
+    command = [sys.executable, '-m', 'trades.pipeline', '--root', root] + (['--in-process'] if in_process else [])
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--', *command],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    child = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    with open(os.path.join(root, 'trades', 'data', 'pipeline_timing.json'), 'r') as f:
+        timing = json.load(f)
+    run_files = sorted(glob.glob(os.path.join(root, 'trades', 'data', 'metrics', 'run_*.json')))
+    with open(run_files[-1], 'r') as f:
+        run_metrics = json.load(f)
+
+    stages = {}
+    for name, stage in timing['stages'].items():
+        counters = run_metrics['stages'].get(name, {}).get('counters', {})
+        stages[name] = {
+            "status": stage['status'],
+            "start_offset": stage['start_offset'],
+            "duration": stage['duration'],
+            "http_requests": counters.get('http.requests', 0),
+            "http_bytes": counters.get('http.bytes', 0),
+        }
+    return {
+        "returncode": child['returncode'],
+        "wall_seconds": round(wall, 3),
+        "pipeline_seconds": timing['total_seconds'],
+        "peak_rss_mb": round(child['peak_rss_kb'] / 1024, 1),
+        "stages": stages,
+        "output_tail": child['output_tail'] if child['returncode'] else None,
+    }
+
+
+def print_result(n_tickers, label, result):
+    print(f"  {n_tickers:>6} 只 {label:<4} 总耗时 {result['wall_seconds']:>7.1f}s  "
+          f"峰值 RSS {result['peak_rss_mb']:>7.1f} MB  退出码 {result['returncode']}")
+    for name, stage in sorted(result['stages'].items(), key=lambda kv: kv[1]['start_offset']):
+        print(f"           {name:<18}{stage['status']:<9}{stage['duration']:>7.1f}s"
+              f"  HTTP {stage['http_requests']:>5} 次 {stage['http_bytes'] / 1e6:>7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端管道基准测试")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="监控列表规模, 逗号分隔")
+    parser.add_argument('--warm', action='store_true', help="每个规模再运行一次, 测量缓存命中时的耗时")
+    parser.add_argument('--no-archive', action='store_true', help="不复制历史简报 (网页阶段只渲染当天)")
+    parser.add_argument('--keep', action='store_true', help="保留临时工作目录")
+    parser.add_argument('--in-process', action='store_true', help="以 --in-process 模式运行管道")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="结果 JSON 路径")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('command', nargs='*', help=argparse.SUPPRESS)
+    fake_services.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.command, os.environ.copy())
+        return 0
+
+    config = fake_services.config_from_args(args)
+    server, base_url = fake_services.start(config)
+    env = {**os.environ, **fake_services.service_env(base_url), "PAGES_JOBS": os.environ.get('PAGES_JOBS', '1')}
+    print(f"🧪 替身服务: {base_url}")
+
+    results = []
+    for n_tickers in [int(s) for s in args.sizes.split(',') if s]:
+        root = tempfile.mkdtemp(prefix=f"trades-bench-{n_tickers}-")
+        try:
+            prepare_root(root, n_tickers, archive=not args.no_archive)
+            entry = {"tickers": n_tickers, "in_process": args.in_process,
+                     "cold": run_once(root, env, args.in_process)}
+            print_result(n_tickers, '冷启动', entry['cold'])
+            if args.warm:
+                entry["warm"] = run_once(root, env, args.in_process)
+                print_result(n_tickers, '热运行', entry['warm'])
+            results.append(entry)
+        finally:
+            if args.keep:
+                print(f"           工作目录: {root}")
+            else:
+                shutil.rmtree(root, ignore_errors=True)
+    server.shutdown()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "services": asdict(config),
+        "requests_served": dict(server.RequestHandlerClass.counts),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ 结果已保存到 {args.output}")
+    return 0 if all(r['cold']['returncode'] == 0 for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+技术指标引擎基准测试
+随机生成 (日期 × 股票) 行情矩阵, 测量 compute_indicators 的耗时
+
+用法:
+    python trades/bench/bench_indicators.py --tickers 1000 --days 504
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import indicators  # noqa: E402
+
+
+def random_market(n_tickers, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2026-01-02', periods=n_days)
+    columns = [f"T{i:04d}" for i in range(n_tickers)]
+    returns = rng.normal(0.0005, 0.02, size=(n_days, n_tickers))
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape)) * close
+    volume = rng.lognormal(15, 0.5, size=close.shape)
+    frame = lambda values: pd.DataFrame(values, index=index, columns=columns)  # noqa: E731
+    return frame(close), frame(close + spread), frame(close - spread), frame(volume)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术指标引擎基准测试")
+    parser.add_argument('--tickers', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=504)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    close, high, low, volume = random_market(args.tickers, args.days)
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = indicators.compute_indicators(close, high, low, volume)
+        indicators.latest_values(result)
+        timings.append(time.perf_counter() - started)
+
+    print(f"📐 {args.tickers} 只股票 × {args.days} 个交易日, {len(result)} 个指标")
+    print(f"  最快 {min(timings):.3f}s, 中位数 {sorted(timings)[len(timings) // 2]:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Markdown 渲染基准测试
+在现有简报存档上比较 markdown_render.render_markdown 与旧版 md_to_html 的单份渲染耗时;
+计时前先核对 CHECKS 中各片段的渲染结果
+
+用法:
+    python trades/bench/bench_markdown.py --repeat 20
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from markdown_render import render_markdown  # noqa: E402
+
+
+# generate_pages.py 中被替换前的实现, 保留作为基准
+def legacy_md_to_html(md_text):
+    import re
+    
+    # 移除 YAML front matter
+    md_text = re.sub(r'^---\n.*?\n---\n', '', md_text, flags=re.DOTALL)
+    
+    html = md_text
+    
+    # 标题
+    html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+    html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
+    html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    
+    # 粗体和斜体
+    html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
+    html = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html)
+    
+    # 代码块
+    html = re.sub(r'```(\w*)\n(.*?)```', r'<pre><code>\2</code></pre>', html, flags=re.DOTALL)
+    html = re.sub(r'`(.+?)`', r'<code>\1</code>', html)
+    
+    # 列表
+    html = re.sub(r'^- (.+)$', r'<li>\1</li>', html, flags=re.MULTILINE)
+    html = re.sub(r'(<li>.*</li>\n)+', r'<ul>\g<0></ul>', html)
+    
+    # 段落
+    paragraphs = html.split('\n\n')
+    processed = []
+    for p in paragraphs:
+        p = p.strip()
+        if p and not p.startswith('<'):
+            p = f'<p>{p}</p>'
+        processed.append(p)
+    html = '\n'.join(processed)
+    
+    return html
+
+
+# (Markdown 片段, 期望 HTML); 嵌套列表的缩进 2/4 空格混用时也须输出合法的嵌套结构
+CHECKS = [
+    ('- a\n  - b\n    - c\n- d',
+     '<ul>\n<li>a\n<ul>\n<li>b\n<ul>\n<li>c</li>\n</ul></li>\n</ul></li>\n<li>d</li>\n</ul>'),
+    ('- a\n    - b\n  - c\n- d',
+     '<ul>\n<li>a\n<ul>\n<li>b</li>\n</ul></li>\n<li>c</li>\n<li>d</li>\n</ul>'),
+    ('  - a\n- b',
+     '<ul>\n<li>a</li>\n<li>b</li>\n</ul>'),
+    ('1. a\n2. b\n- c',
+     '<ol>\n<li>a</li>\n<li>b</li>\n</ol>\n<ul>\n<li>c</li>\n</ul>'),
+    ('- a\n  - b\n  1. c\n- d',
+     '<ul>\n<li>a\n<ul>\n<li>b</li>\n</ul>\n<ol>\n<li>c</li>\n</ol></li>\n<li>d</li>\n</ul>'),
+]
+
+
+def run_checks():
+    """返回渲染结果与期望不符的片段数"""
+    failures = 0
+    for markdown, expected in CHECKS:
+        html = render_markdown(markdown)
+        if html != expected:
+            failures += 1
+            print(f"✗ {markdown!r}\n  期望: {expected!r}\n  实际: {html!r}")
+    print(f"{'✓' if not failures else '✗'} 渲染核对 {len(CHECKS) - failures}/{len(CHECKS)} 通过")
+    return failures
+
+
+def time_per_brief(render, texts, repeat):
+    """返回每份简报在 repeat 次中的最短耗时 (秒)"""
+    timings = []
+    for text in texts:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render(text)
+            best = min(best, time.perf_counter() - started)
+        timings.append(best)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown 渲染基准测试")
+    parser.add_argument('--briefs', default='trades/output/briefs/brief_*.md')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if run_checks():
+        return 1
+
+    texts = []
+    for path in sorted(glob.glob(args.briefs)):
+        with open(path, 'r') as f:
+            texts.append(f.read())
+    if not texts:
+        print(f"✗ 没有找到简报: {args.briefs}")
+        return 1
+
+    # 清空 re 模块的编译缓存, 使旧实现的首次编译计入第一份简报
+    re.purge()
+    legacy = time_per_brief(legacy_md_to_html, texts, args.repeat)
+    current = time_per_brief(render_markdown, texts, args.repeat)
+
+    print(f"📝 {len(texts)} 份简报, 每份取 {args.repeat} 次中的最短耗时")
+    print(f"  {'实现':<20}{'中位数':>10}{'平均':>10}{'最大':>10}{'合计':>10}")
+    for name, timings in (('legacy md_to_html', legacy), ('render_markdown', current)):
+        print(f"  {name:<20}{statistics.median(timings) * 1e6:>8.0f}µs{statistics.mean(timings) * 1e6:>8.0f}µs"
+              f"{max(timings) * 1e6:>8.0f}µs{sum(timings) * 1e3:>8.2f}ms")
+    print(f"  中位数耗时比 (render_markdown / legacy): "
+          f"{statistics.median(current) / statistics.median(legacy):.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
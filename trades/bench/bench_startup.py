@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+启动与序列化开销基准测试
+- 导入: 在全新解释器中导入各阶段模块 (只执行模块顶层代码, 不运行入口函数) 的耗时,
+  以及各阶段在入口函数中才加载的重依赖本身的导入耗时; 均扣除空解释器的启动时间
+- 序列化: 数据目录中各 JSON 文件按 indent=2 序列化与重新解析的耗时。子进程模式下
+  每个文件由上游写出、下游再读取; --in-process 模式只在后台写出一次
+
+结果写入 trades/data/bench/startup_results.json。
+
+用法:
+    python trades/bench/bench_startup.py
+    python trades/bench/bench_startup.py --repeat 10 --data-dir /tmp/trades-bench/trades/data
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+SCRIPTS_DIR = os.path.join(ROOT, 'trades', 'scripts')
+DEFAULT_OUTPUT = os.path.join(ROOT, 'trades', 'data', 'bench', 'startup_results.json')
+
+sys.path.insert(0, ROOT)
+from trades.pipeline import STAGES  # noqa: E402
+
+# 入口函数中才导入的重依赖
+HEAVY_MODULES = ['numpy', 'pandas', 'yfinance', 'openai', 'requests']
+
+
+def time_import(statement, repeat):
+    """在全新解释器中执行 statement 的中位耗时 (秒, 含解释器启动)"""
+    code = f"import sys; sys.path.insert(0, {SCRIPTS_DIR!r}); {statement}"
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        samples.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{statement} 失败: {proc.stderr[-500:]}")
+    return statistics.median(samples)
+
+
+def bench_imports(repeat):
+    baseline = time_import('pass', repeat)
+    print(f"  空解释器启动: {baseline * 1000:>7.1f} ms")
+    stages = {}
+    for name, stage in STAGES.items():
+        module = os.path.splitext(stage['script'])[0]
+        seconds = time_import(f"import {module}", repeat) - baseline
+        stages[name] = {"module": module, "import_ms": round(seconds * 1000, 1)}
+        print(f"  {name:<18}{module:<28}{seconds * 1000:>7.1f} ms")
+    heavy = {}
+    for module in HEAVY_MODULES:
+        try:
+            seconds = time_import(f"import {module}", repeat) - baseline
+        except RuntimeError:
+            continue
+        heavy[module] = round(seconds * 1000, 1)
+        print(f"  {'依赖':<18}{module:<28}{seconds * 1000:>7.1f} ms")
+    return {"interpreter_ms": round(baseline * 1000, 1), "stages": stages, "heavy_modules": heavy}
+
+
+def bench_serialization(data_dir, repeat):
+    files = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        dumps, loads = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text = json.dumps(data, indent=2)
+            dumps.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            json.loads(text)
+            loads.append(time.perf_counter() - started)
+        name = os.path.basename(path)
+        files[name] = {
+            "bytes": len(text),
+            "dump_ms": round(statistics.median(dumps) * 1000, 2),
+            "load_ms": round(statistics.median(loads) * 1000, 2),
+        }
+        print(f"  {name:<28}{len(text) / 1e3:>9.1f} KB  写 {files[name]['dump_ms']:>7.2f} ms"
+              f"  读 {files[name]['load_ms']:>7.2f} ms")
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动与序列化开销基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的重复次数 (取中位数)")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'trades', 'data'),
+                        help="测量序列化耗时的 JSON 文件所在目录")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="结果 JSON 路径")
+    args = parser.parse_args()
+
+    print("🧪 导入耗时 (全新解释器, 中位数):")
+    imports = bench_imports(args.repeat)
+    print("\n🧪 JSON 序列化耗时 (indent=2, 中位数):")
+    serialization = bench_serialization(args.data_dir, args.repeat)
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": imports,
+        "serialization": serialization,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ 结果已保存到 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
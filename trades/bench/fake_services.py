@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+本地替身服务
+在一个端口上模拟管道依赖的全部外部服务, 每个服务的延迟与响应大小可配置:
+
+    /yahoo/v8/finance/chart/<代码>   Yahoo chart API (日线)
+    /yahoo/v7/finance/quote          Yahoo quote API (批量报价)
+    /yahoo/v10/finance/quoteSummary/<代码>  Yahoo quoteSummary API (Ticker.info)
+    /yahoo/v1/test/getcrumb          yfinance 请求前获取的 crumb
+    /gamma/markets                   Polymarket Gamma API
+    /house/financial-pdfs/<年份>FD.zip 众议院年度披露索引 (zip 内含 XML)
+    /sec/files/company_tickers.json  SEC 股票代码 → CIK 映射
+    /sec/submissions/CIK<编号>.json  SEC EDGAR submissions
+    /sec/Archives/edgar/daily-index/... SEC 每日索引 (master.YYYYMMDD.idx)
+    /sec/Archives/edgar/data/<CIK>/<accession>/form4.xml  Form 4 原始 XML
+    /deepseek/chat/completions       DeepSeek (OpenAI 兼容, 支持流式)
+    /telegram/bot<token>/sendMessage Telegram Bot API
+    /discord/webhook                 Discord Webhook
+
+用法:
+    python trades/bench/fake_services.py --port 8765 --latency yahoo=0.02 --latency deepseek=0.5
+    python trades/bench/fake_services.py --error-rate sec=0.1   # 10% 的 SEC 请求返回 429 (Retry-After)
+    python trades/bench/fake_services.py --write-house-fixtures /tmp/house   # 供 CONGRESS_ARCHIVE_DIR 使用
+
+yfinance 的地址不可配置: service_env 把 yahoo_redirect/ 加入 PYTHONPATH, 其中的 sitecustomize
+在各进程启动时把 yfinance 对 *.yahoo.com 的请求改写到 /yahoo 下, 管道代码照常调用 yfinance。
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import threading
+import time
+import zipfile
+import zlib
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SERVICES = ('yahoo', 'gamma', 'house', 'sec', 'deepseek', 'telegram', 'discord')
+
+
+@dataclass
+class ServiceConfig:
+    """各服务的延迟 (秒)、瞬时错误比例与响应规模"""
+    latency: dict = field(default_factory=lambda: {
+        'yahoo': 0.02, 'gamma': 0.1, 'house': 0.2, 'sec': 0.05, 'deepseek': 0.5, 'telegram': 0.05, 'discord': 0.05,
+    })
+    error_rate: dict = field(default_factory=dict)
+    history_days: int = 504
+    markets: int = 200
+    filings: int = 2000
+    sec_filings: int = 40
+    brief_tokens: int = 2000
+    tokens_per_second: float = 400.0
+    chunk_tokens: int = 8
+
+
+def _rng(*parts):
+    """按请求内容确定的随机数, 同一代码每次返回相同的数据"""
+    return random.Random(zlib.crc32('|'.join(map(str, parts)).encode()))
+
+
+def chart_payload(symbol, config, start=None):
+    """history_days 根交易日的确定性行情; 指定 start 时只返回其后的部分, 与全量结果一致"""
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = []
+    day = end
+    while len(dates) < config.history_days:
+        if day.weekday() < 5:
+            dates.append(day)
+        day -= timedelta(days=1)
+    dates.reverse()
+
+    rng = _rng(symbol)
+    price = rng.uniform(20, 500)
+    quote = {"open": [], "high": [], "low": [], "close": [], "volume": []}
+    for _ in dates:
+        change = rng.gauss(0.0005, 0.02)
+        open_ = price
+        price = max(1.0, price * (1 + change))
+        quote["open"].append(round(open_, 4))
+        quote["high"].append(round(max(open_, price) * (1 + abs(rng.gauss(0, 0.005))), 4))
+        quote["low"].append(round(min(open_, price) * (1 - abs(rng.gauss(0, 0.005))), 4))
+        quote["close"].append(round(price, 4))
+        quote["volume"].append(int(rng.lognormvariate(15, 0.5)))
+
+    # 与真实接口一样取美东开盘时刻 (UTC 13:30), 换算到交易所时区后仍落在当天
+    timestamps = [int((d + timedelta(hours=13, minutes=30)).replace(tzinfo=timezone.utc).timestamp()) for d in dates]
+    first = 0
+    if start is not None:
+        first = next((i for i, ts in enumerate(timestamps) if ts >= start), len(timestamps))
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "currency": "USD", "instrumentType": "EQUITY", "exchangeName": "NMS",
+                 "exchangeTimezoneName": "America/New_York", "timezone": "EDT", "gmtoffset": -14400,
+                 "priceHint": 2, "dataGranularity": "1d", "regularMarketPrice": quote["close"][-1],
+                 "validRanges": ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"]},
+        "timestamp": timestamps[first:],
+        "indicators": {"quote": [{name: values[first:] for name, values in quote.items()}],
+                       "adjclose": [{"adjclose": quote["close"][first:]}]},
+    }], "error": None}}
+
+
+def quote(symbol):
+    """quote 接口的单只股票报价, 由代码确定"""
+    rng = _rng(symbol)
+    price = rng.uniform(20, 500)
+    return {
+        "symbol": symbol,
+        "longName": f"{symbol} Holdings Inc.",
+        "shortName": symbol,
+        "regularMarketPrice": round(price, 2),
+        "regularMarketPreviousClose": round(price * rng.uniform(0.97, 1.03), 2),
+        "regularMarketChangePercent": round(rng.gauss(0, 1.5), 3),
+        "regularMarketVolume": int(rng.lognormvariate(15, 0.5)),
+        "averageDailyVolume3Month": int(rng.lognormvariate(15, 0.3)),
+        "marketCap": int(price * rng.uniform(1e8, 1e10)),
+        "trailingPE": round(rng.uniform(8, 80), 2),
+        "forwardPE": round(rng.uniform(8, 60), 2),
+        "fiftyTwoWeekHigh": round(price * 1.3, 2),
+        "fiftyTwoWeekLow": round(price * 0.7, 2),
+        "fiftyDayAverage": round(price * rng.uniform(0.9, 1.1), 2),
+        "twoHundredDayAverage": round(price * rng.uniform(0.8, 1.2), 2),
+    }
+
+
+def quote_payload(symbols):
+    return {"quoteResponse": {"result": [quote(symbol) for symbol in symbols], "error": None}}
+
+
+def quote_summary_payload(symbol):
+    """quoteSummary 接口中 Ticker.info 用到的模块, 数值与 quote 接口一致"""
+    q = quote(symbol)
+    sectors = ['Technology', 'Healthcare', 'Financial Services', 'Energy', 'Industrials']
+    return {"quoteSummary": {"result": [{
+        "quoteType": {"symbol": symbol, "quoteType": "EQUITY", "longName": q["longName"], "shortName": q["shortName"]},
+        "financialData": {"currentPrice": q["regularMarketPrice"]},
+        "summaryDetail": {
+            "previousClose": q["regularMarketPreviousClose"],
+            "volume": q["regularMarketVolume"],
+            "averageVolume": q["averageDailyVolume3Month"],
+            "marketCap": q["marketCap"],
+            "trailingPE": q["trailingPE"],
+            "forwardPE": q["forwardPE"],
+            "fiftyTwoWeekHigh": q["fiftyTwoWeekHigh"],
+            "fiftyTwoWeekLow": q["fiftyTwoWeekLow"],
+            "fiftyDayAverage": q["fiftyDayAverage"],
+            "twoHundredDayAverage": q["twoHundredDayAverage"],
+        },
+        "assetProfile": {"sector": sectors[zlib.crc32(symbol.encode()) % len(sectors)], "industry": "Bench"},
+        "defaultKeyStatistics": {},
+    }], "error": None}}
+
+
+def markets_payload(config, limit, offset=0):
+    topics = ['Fed rate cut', 'US recession', 'Bitcoin above $150k', 'CPI inflation above 3%', 'S&P 500 record',
+              'new tariff', 'GDP growth', 'crypto ETF approval', 'stock market crash', 'trade deal']
+    markets = []
+    for i in range(offset, min(offset + limit, config.markets)):
+        rng = _rng('market', i)
+        yes = round(rng.uniform(0.02, 0.98), 3)
+        markets.append({
+            "id": str(100000 + i),
+            "question": f"Will there be a {topics[i % len(topics)]} by {2026 + i % 3}? (#{i})",
+            "outcomePrices": json.dumps([str(yes), str(round(1 - yes, 3))]),
+            "volume": str(round(rng.lognormvariate(12, 1.5), 2)),
+            "liquidity": str(round(rng.lognormvariate(10, 1.2), 2)),
+            "endDate": f"{2026 + i % 3}-12-31T00:00:00Z",
+            "category": "Economics",
+        })
+    return markets
+
+
+HOUSE_LAST_MODIFIED = formatdate(0, usegmt=True)
+HOUSE_MEMBERS = [('Nancy', 'Pelosi', 'CA11'), ('Dan', 'Crenshaw', 'TX02'), ('Josh', 'Gottheimer', 'NJ05'),
+                 ('Ro', 'Khanna', 'CA17'), ('Marjorie', 'Greene', 'GA14'), ('Michael', 'McCaul', 'TX10')]
+
+
+def house_filings(config, year):
+    """年度索引中的 filings 个文件; 约三分之一为 PTR (FilingType=P)"""
+    filings = []
+    for i in range(config.filings):
+        rng = _rng('house', year, i)
+        first, last, district = HOUSE_MEMBERS[i % len(HOUSE_MEMBERS)]
+        day = datetime(year, 1, 1) + timedelta(days=rng.randrange(300))
+        filings.append({"First": first, "Last": last, "StateDst": district,
+                        "FilingType": 'P' if i % 3 == 0 else rng.choice('ACDOX'), "Year": str(year),
+                        "FilingDate": f"{day.month}/{day.day}/{day.year}", "DocID": str(year * 100000 + i)})
+    return filings
+
+
+def house_archive(config, year):
+    """{year}FD.zip: 与众议院书记官办公室相同结构的 XML 索引"""
+    members = ''.join(
+        '<Member><Prefix>Hon.</Prefix>' + ''.join(f"<{k}>{v}</{k}>" for k, v in filing.items()) + '</Member>'
+        for filing in house_filings(config, year)
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(f"{year}FD.xml", f'<?xml version="1.0" encoding="utf-8"?>'
+                                          f'<FinancialDisclosure>{members}</FinancialDisclosure>')
+    return buffer.getvalue()
+
+
+def ptr_text(filing):
+    """PTR 正文 (与 PDF 提取出的文字格式相同), 交易的股票代码为 B0000-B0999"""
+    rng = _rng('ptr', filing['DocID'])
+    lines = [f"PERIODIC TRANSACTION REPORT Name: Hon. {filing['First']} {filing['Last']}",
+             'ID Owner Asset Transaction Type Date Notification Date Amount Cap. Gains > $200?']
+    notified = datetime.strptime(filing['FilingDate'], '%m/%d/%Y')
+    for _ in range(rng.randint(1, 4)):
+        traded = notified - timedelta(days=rng.randint(1, 40))
+        lines.append(f"{rng.choice(['SP', 'JT', ''])} Bench Holdings {rng.randrange(1000)} - Common Stock "
+                     f"(B{rng.randrange(1000):04d}) [ST] {rng.choice(['P', 'S', 'S (partial)'])} "
+                     f"{traded:%m/%d/%Y} {notified:%m/%d/%Y} {rng.choice(['$1,001 - $15,000', '$15,001 - $50,000'])}")
+        lines.append('F S : New')
+    return '\n'.join(lines)
+
+
+def write_house_fixtures(directory, config, years):
+    """写出 CONGRESS_ARCHIVE_DIR 所需的本地文件: <年份>FD.zip 与 ptr/<年份>/<DocID>.txt"""
+    for year in years:
+        with open(os.path.join(directory, f"{year}FD.zip"), 'wb') as f:
+            f.write(house_archive(config, year))
+        ptr_dir = os.path.join(directory, 'ptr', str(year))
+        os.makedirs(ptr_dir, exist_ok=True)
+        for filing in house_filings(config, year):
+            if filing['FilingType'] == 'P':
+                with open(os.path.join(ptr_dir, f"{filing['DocID']}.txt"), 'w') as f:
+                    f.write(ptr_text(filing))
+
+
+SEC_CIK_BASE = 1000000
+SEC_FORMS = ['4', '4', '4', '8-K', '10-Q', '4', 'SC 13G', '8-K', '10-K', 'DEF 14A']
+
+
+def company_tickers():
+    """B0000-B9999 对应 CIK 1000000 起的连续编号"""
+    return {str(i): {"cik_str": SEC_CIK_BASE + i, "ticker": f"B{i:04d}", "title": f"Bench Holdings {i}"}
+            for i in range(10000)}
+
+
+def submissions_payload(config, cik):
+    """sec_filings 个文件, 大约每周一个; 最新的文件日期随当前日期推进, 与旧结果保持一致"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    epoch = datetime(2020, 1, 1)
+    newest = (today - epoch).days // 7
+    recent = {key: [] for key in ('accessionNumber', 'filingDate', 'reportDate', 'form', 'primaryDocument',
+                                  'primaryDocDescription')}
+    for week in range(newest, max(newest - config.sec_filings, -1), -1):
+        form = SEC_FORMS[_rng('sec', cik, week).randrange(len(SEC_FORMS))]
+        recent['accessionNumber'].append(f"{cik:010d}-{week // 52 + 20:02d}-{week:06d}")
+        recent['filingDate'].append((epoch + timedelta(days=week * 7)).strftime('%Y-%m-%d'))
+        recent['reportDate'].append((epoch + timedelta(days=week * 7 - 2)).strftime('%Y-%m-%d'))
+        recent['form'].append(form)
+        recent['primaryDocument'].append('xslF345X05/form4.xml' if form == '4' else f"doc{week}.htm")
+        recent['primaryDocDescription'].append(form)
+    return {"cik": str(cik), "name": f"Bench Holdings {cik - SEC_CIK_BASE}",
+            "tickers": [f"B{cik - SEC_CIK_BASE:04d}"], "filings": {"recent": recent, "files": []}}
+
+
+FORM4_CODES = [('S', 'D'), ('S', 'D'), ('P', 'A'), ('A', 'A'), ('M', 'A'), ('F', 'D')]
+FORM4_TITLES = ['Chief Executive Officer', 'Chief Financial Officer', 'General Counsel', '']
+
+
+def form4_xml(cik, accession):
+    """1-4 笔交易的 Form 4 XML, 内容由 accession 确定"""
+    rng = _rng('form4', accession)
+    i = cik - SEC_CIK_BASE
+    title = rng.choice(FORM4_TITLES)
+    filed = datetime(2020, 1, 1) + timedelta(days=int(accession[-6:]) * 7)
+    tables = {'nonDerivative': [], 'derivative': []}
+    for n in range(rng.randint(1, 4)):
+        code, direction = rng.choice(FORM4_CODES)
+        table = 'derivative' if code == 'M' and n % 2 else 'nonDerivative'
+        tables[table].append(f"""    <{table}Transaction>
+      <securityTitle><value>{'Stock Option' if table == 'derivative' else 'Common Stock'}</value></securityTitle>
+      <transactionDate><value>{filed - timedelta(days=rng.randint(1, 3)):%Y-%m-%d}</value></transactionDate>
+      <transactionCoding><transactionFormType>4</transactionFormType><transactionCode>{code}</transactionCode>
+      </transactionCoding>
+      <transactionAmounts>
+        <transactionShares><value>{rng.choice([500, 2500, 12000, 40000, 150000])}</value></transactionShares>
+        <transactionPricePerShare><value>{rng.uniform(20, 400):.2f}</value></transactionPricePerShare>
+        <transactionAcquiredDisposedCode><value>{direction}</value></transactionAcquiredDisposedCode>
+      </transactionAmounts>
+      <postTransactionAmounts>
+        <sharesOwnedFollowingTransaction><value>{rng.randint(10000, 5000000)}</value></sharesOwnedFollowingTransaction>
+      </postTransactionAmounts>
+      <ownershipNature><directOrIndirectOwnership><value>D</value></directOrIndirectOwnership></ownershipNature>
+    </{table}Transaction>""")
+    rows = [f"  <{table}Table>\n{chr(10).join(items)}\n  </{table}Table>" for table, items in tables.items() if items]
+    return f"""<?xml version="1.0"?>
+<ownershipDocument>
+  <schemaVersion>X0508</schemaVersion>
+  <documentType>4</documentType>
+  <issuer><issuerCik>{cik:010d}</issuerCik><issuerName>Bench Holdings {i}</issuerName>
+    <issuerTradingSymbol>B{i:04d}</issuerTradingSymbol></issuer>
+  <reportingOwner>
+    <reportingOwnerId><rptOwnerCik>{2000000 + rng.randrange(100000):010d}</rptOwnerCik>
+      <rptOwnerName>Insider {rng.randrange(1000)}</rptOwnerName></reportingOwnerId>
+    <reportingOwnerRelationship><isDirector>{int(not title)}</isDirector><isOfficer>{int(bool(title))}</isOfficer>
+      <officerTitle>{title}</officerTitle></reportingOwnerRelationship>
+  </reportingOwner>
+{chr(10).join(rows)}
+</ownershipDocument>
+"""
+
+
+def daily_index(day):
+    """master.idx: 每个 CIK 每周三提交一个文件; 周末与未来日期没有索引"""
+    if day.weekday() >= 5 or day > datetime.now():
+        return None
+    lines = ['Description: Daily Index of EDGAR Dissemination Feed by Company Name', '',
+             'CIK|Company Name|Form Type|Date Filed|Filename', '-' * 80]
+    week, weekday = divmod((day - datetime(2020, 1, 1)).days, 7)
+    if weekday == 0:
+        for i in range(len(company_tickers())):
+            cik = SEC_CIK_BASE + i
+            form = SEC_FORMS[_rng('sec', cik, week).randrange(len(SEC_FORMS))]
+            lines.append(f"{cik}|Bench Holdings {i}|{form}|{day:%Y%m%d}|edgar/data/{cik}/{week}.txt")
+    return '\n'.join(lines)
+
+
+def prompt_tickers(payload):
+    """提示中"监控列表"一节列出的股票"""
+    for message in payload.get('messages', []):
+        _, found, rest = str(message.get('content', '')).partition('## 监控列表\n')
+        if found:
+            return [t.strip() for t in rest.split('\n', 1)[0].split(',') if t.strip()]
+    return []
+
+
+def brief_text(config, tickers=()):
+    """大约 brief_tokens 个 token 的简报正文, 末尾附上各股票的 signals 块"""
+    sections = ['执行摘要', '市场概览', '信号分析', '具体建议', '风险警示', '预测市场洞察', '明日关注']
+    lines = ['# 每日交易简报', '']
+    words = 0
+    n = 0
+    while words < config.brief_tokens * 4:
+        if n % 6 == 0:
+            lines += ['', f"## {sections[(n // 6) % len(sections)]}", '']
+        lines.append(f"- 基准测试生成的第 {n} 条要点: 成交量与价格走势保持一致, 评级 HOLD, 置信度 中。")
+        words += len(lines[-1])
+        n += 1
+    actions = ['BUY', 'HOLD', 'SELL', 'WATCH']
+    lines += ['', '```signals']
+    for ticker in tickers:
+        rng = _rng('signal', ticker)
+        lines.append(json.dumps({"ticker": ticker, "action": rng.choice(actions),
+                                 "confidence": round(rng.uniform(0.4, 0.9), 2)}))
+    lines.append('```')
+    return '\n'.join(lines)
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    config = ServiceConfig()
+    counts = {}
+    lock = threading.Lock()
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _delay(self, service):
+        """模拟延迟; 按 error_rate 返回 429 时返回 True (请求已处理完毕)"""
+        with self.lock:
+            self.counts[service] = self.counts.get(service, 0) + 1
+        time.sleep(self.config.latency.get(service, 0))
+        if random.random() < self.config.error_rate.get(service, 0):
+            self._send(429, {"error": "rate limited"}, headers={"Retry-After": "0.1"})
+            return True
+        return False
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        elif isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        service = parts[0]
+        if self._delay(service):
+            return
+
+        if service == 'yahoo' and parts[1:4] == ['v8', 'finance', 'chart'] and len(parts) == 5:
+            start = int(query['period1']) if 'period1' in query else None
+            self._send(200, chart_payload(parts[4], self.config, start))
+        elif service == 'yahoo' and parts[1:] == ['v7', 'finance', 'quote']:
+            self._send(200, quote_payload([s for s in query.get('symbols', '').split(',') if s]))
+        elif service == 'yahoo' and parts[1:4] == ['v10', 'finance', 'quoteSummary'] and len(parts) == 5:
+            self._send(200, quote_summary_payload(parts[4]))
+        elif service == 'yahoo' and parts[1:] == ['v1', 'test', 'getcrumb']:
+            self._send(200, 'bench-crumb', 'text/plain')
+        elif service == 'yahoo' and parts[1:] in ([], ['']):
+            # fc.yahoo.com: yfinance 获取 crumb 前先请求一次以取得 cookie
+            self._send(200, 'ok', 'text/plain', {"Set-Cookie": "A3=bench; Path=/"})
+        elif service == 'gamma' and parts[1:] == ['markets']:
+            self._send(200, markets_payload(self.config, int(query.get('limit', 50)),
+                                            int(query.get('offset', 0))))
+        elif service == 'sec' and parts[1:] == ['files', 'company_tickers.json']:
+            self._send(200, company_tickers())
+        elif service == 'sec' and parts[1:2] == ['submissions'] and parts[-1].startswith('CIK'):
+            self._send(200, submissions_payload(self.config, int(parts[-1][3:13])))
+        elif service == 'sec' and parts[1:4] == ['Archives', 'edgar', 'daily-index']:
+            index = daily_index(datetime.strptime(parts[-1][7:15], '%Y%m%d'))
+            self._send(404 if index is None else 200, index or b'', 'text/plain')
+        elif service == 'sec' and parts[1:4] == ['Archives', 'edgar', 'data'] and parts[-1] == 'form4.xml':
+            accession = f"{parts[5][:10]}-{parts[5][10:12]}-{parts[5][12:]}"
+            self._send(200, form4_xml(int(parts[4]), accession), 'application/xml')
+        elif service == 'house' and parts[1:2] == ['financial-pdfs'] and parts[-1].endswith('FD.zip'):
+            if self.headers.get('If-Modified-Since') == HOUSE_LAST_MODIFIED:
+                self._send(304)
+            else:
+                self._send(200, house_archive(self.config, int(parts[-1][:4])), 'application/zip',
+                           {"Last-Modified": HOUSE_LAST_MODIFIED})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        service = parts[0]
+
+        if service in SERVICES and self._delay(service):
+            return
+        if service == 'deepseek' and parts[-2:] == ['chat', 'completions']:
+            if payload.get('stream'):
+                self._stream_completion(payload)
+            else:
+                self._send(200, self._completion(payload))
+        elif service == 'telegram' and parts[-1] == 'sendMessage':
+            self._send(200, {"ok": True, "result": {"message_id": 1}})
+        elif service == 'discord':
+            self._send(204)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _completion(self, payload):
+        text = brief_text(self.config, prompt_tickers(payload))
+        time.sleep(self.config.brief_tokens / self.config.tokens_per_second)
+        return {
+            "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": payload.get('model'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": self.config.brief_tokens,
+                      "total_tokens": self.config.brief_tokens},
+        }
+
+    def _stream_completion(self, payload):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        text = brief_text(self.config, prompt_tickers(payload))
+        pieces = max(1, self.config.brief_tokens // self.config.chunk_tokens)
+        step = max(1, len(text) // pieces)
+        pause = self.config.chunk_tokens / self.config.tokens_per_second
+
+        def event(data):
+            self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+
+        base = {"id": "bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": payload.get('model')}
+        for i in range(0, len(text), step):
+            event({**base, "choices": [{"index": 0, "delta": {"content": text[i:i + step]}, "finish_reason": None}]})
+            time.sleep(pause)
+        event({**base, "choices": [], "usage": {"prompt_tokens": 0, "completion_tokens": self.config.brief_tokens,
+                                                 "total_tokens": self.config.brief_tokens}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start(config=None, host='127.0.0.1', port=0):
+    """在后台线程启动替身服务, 返回 (server, 基础 URL)"""
+    handler = type('Handler', (FakeServiceHandler,), {"config": config or ServiceConfig(), "counts": {}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+YAHOO_REDIRECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'yahoo_redirect')
+
+
+def service_env(base_url):
+    """让管道各脚本改用替身服务的环境变量; yfinance 经 yahoo_redirect/sitecustomize.py 改写地址"""
+    return {
+        "YAHOO_API_URL": f"{base_url}/yahoo",
+        "PYTHONPATH": os.pathsep.join(filter(None, [YAHOO_REDIRECT_DIR, os.environ.get('PYTHONPATH')])),
+        "POLYMARKET_GAMMA_API": f"{base_url}/gamma",
+        "HOUSE_DISCLOSURES_URL": f"{base_url}/house",
+        "SEC_WWW_URL": f"{base_url}/sec",
+        "SEC_DATA_URL": f"{base_url}/sec",
+        "DEEPSEEK_BASE_URL": f"{base_url}/deepseek",
+        "DEEPSEEK_API_KEY": "bench",
+        "TELEGRAM_API_URL": f"{base_url}/telegram",
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "DISCORD_WEBHOOK_URL": f"{base_url}/discord/webhook",
+        "GITHUB_PAGES_URL": "http://localhost/",
+    }
+
+
+def parse_service_values(values, target):
+    for value in values:
+        service, _, number = value.partition('=')
+        if service not in SERVICES:
+            raise SystemExit(f"未知服务 {service!r}, 可选: {', '.join(SERVICES)}")
+        target[service] = float(number)
+
+
+def add_config_arguments(parser):
+    defaults = ServiceConfig()
+    parser.add_argument('--latency', action='append', default=[], metavar='SERVICE=SECONDS',
+                        help=f"服务延迟 (可重复), 服务: {', '.join(SERVICES)}")
+    parser.add_argument('--error-rate', action='append', default=[], metavar='SERVICE=RATIO',
+                        help="返回 429 的请求比例 (可重复), 用于验证重试")
+    parser.add_argument('--history-days', type=int, default=defaults.history_days, help="每只股票的日线数量")
+    parser.add_argument('--markets', type=int, default=defaults.markets, help="Gamma API 返回的市场数上限")
+    parser.add_argument('--filings', type=int, default=defaults.filings, help="众议院年度索引中的文件数")
+    parser.add_argument('--sec-filings', type=int, default=defaults.sec_filings, help="每家公司的 SEC 文件数")
+    parser.add_argument('--brief-tokens', type=int, default=defaults.brief_tokens, help="简报长度 (token)")
+    parser.add_argument('--tokens-per-second', type=float, default=defaults.tokens_per_second,
+                        help="模拟的生成速度")
+
+
+def config_from_args(args):
+    config = ServiceConfig(history_days=args.history_days, markets=args.markets, filings=args.filings,
+                           sec_filings=args.sec_filings,
+                           brief_tokens=args.brief_tokens, tokens_per_second=args.tokens_per_second)
+    parse_service_values(args.latency, config.latency)
+    parse_service_values(args.error_rate, config.error_rate)
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动本地替身服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--write-house-fixtures', metavar='DIR', help="写出众议院披露的本地文件后退出")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    if args.write_house_fixtures:
+        os.makedirs(args.write_house_fixtures, exist_ok=True)
+        write_house_fixtures(args.write_house_fixtures, config, [datetime.now().year - 1, datetime.now().year])
+        print(f"✓ 已写出 {args.write_house_fixtures}")
+        return
+    server, base_url = start(config, args.host, args.port)
+    print(f"🧪 替身服务已启动: {base_url}")
+    print(json.dumps(asdict(config), indent=2))
+    for name, value in service_env(base_url).items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+基准测试用的 sitecustomize
+fake_services.service_env 把本目录加入 PYTHONPATH, 管道及其各阶段子进程启动时自动导入。
+设置 YAHOO_API_URL 时, yfinance 所用 curl_cffi 会话对 *.yahoo.com 的请求改写到该地址
+(路径与查询参数不变), 生产代码无需感知替身服务。yfinance 不经过 http_client, 改写后的请求
+在此计入 metrics 的 http.requests / http.bytes, 使 bench_e2e 的各阶段 HTTP 统计包含行情阶段。
+"""
+
+import os
+import sys
+from urllib.parse import urlsplit
+
+BASE_URL = os.environ.get('YAHOO_API_URL', '').rstrip('/')
+
+
+def redirect(url):
+    parts = urlsplit(url)
+    if not (parts.hostname or '').endswith('yahoo.com'):
+        return url
+    return f"{BASE_URL}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else '')
+
+
+if BASE_URL:
+    try:
+        from curl_cffi import requests as _curl_requests
+    except ImportError:
+        _curl_requests = None
+
+    if _curl_requests is not None:
+        _request = _curl_requests.Session.request
+
+        def _redirected_request(self, method, url, *args, **kwargs):
+            response = _request(self, method, redirect(url), *args, **kwargs)
+            metrics = sys.modules.get('metrics')
+            if metrics is not None:
+                metrics.count('http.requests')
+                metrics.count('http.bytes', len(response.content))
+            return response
+
+        _curl_requests.Session.request = _redirected_request
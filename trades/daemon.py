@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+常驻调度进程
+在一个长期运行的进程中按各数据源自己的节奏刷新数据, 用于盘中保持简报与首页最新:
+
+- 收集阶段按 settings.json daemon.cadence_seconds 中的间隔各自运行; 行情在交易时段外
+  改用 off_hours_cadence_seconds 中的间隔 (交易时段由 daemon.market_hours 配置)
+- 收集结果 (去掉 timestamp 等易变字段后) 与上次相比有变化, 且距上次生成超过 brief 的
+  间隔时才重新运行回测并生成简报; 简报或行情变化时才重新生成网页; 默认不发送通知 (--notify 开启)
+- 各阶段与 --in-process 模式一样在本进程中调用, HTTP 连接池、已导入的模块与上一轮的
+  结果在两次刷新之间保留; 上次超时仍在运行的阶段不会重复启动
+
+每日定时任务仍使用单次运行的 python -m trades.pipeline。
+
+用法:
+    python -m trades.daemon
+    python -m trades.daemon --cadence market_data=300 --notify
+    python -m trades.daemon --cycles 3 --root DIR    # 运行 3 轮后退出 (测试用)
+"""
+
+import argparse
+import hashlib
+import json
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from trades.pipeline import COLLECTORS, ROOT, STAGES, enter_in_process, run_pipeline
+
+import metrics  # noqa: E402  (trades.pipeline 已把 trades/scripts 加入 sys.path)
+
+DEFAULT_CADENCE = {
+    'market_data': 900,
+    'polymarket': 600,
+    'congress_trades': 3600,
+    'sec_filings': 1800,
+    'insider_trades': 1800,
+    'brief': 3600,
+}
+DEFAULT_OFF_HOURS_CADENCE = {'market_data': 21600}
+DEFAULT_MARKET_HOURS = {"timezone": "America/New_York", "open": "09:30", "close": "16:00"}
+# 两轮检查之间的最长等待, 使交易时段的切换与停止信号能及时生效
+MAX_SLEEP_SECONDS = 60
+
+
+def parse_cadences(values, target):
+    for value in values:
+        stage, _, seconds = value.partition('=')
+        if stage not in DEFAULT_CADENCE:
+            raise SystemExit(f"未知阶段 {stage!r}, 可选: {', '.join(DEFAULT_CADENCE)}")
+        target[stage] = float(seconds)
+
+
+def in_market_hours(now, market_hours):
+    """now (带时区) 是否处于工作日的交易时段内 (不考虑节假日)"""
+    local = now.astimezone(ZoneInfo(market_hours['timezone']))
+    return local.weekday() < 5 and market_hours['open'] <= local.strftime('%H:%M') < market_hours['close']
+
+
+def fingerprint(value):
+    """去掉易变字段后的内容哈希, 用于判断阶段结果是否变化"""
+    import llm_cache
+    payload = json.dumps(llm_cache.normalize(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def still_running(name):
+    """上次超时的阶段线程是否仍在运行"""
+    return any(thread.name == f"stage-{name}" and thread.is_alive() for thread in threading.enumerate())
+
+
+class Daemon:
+    def __init__(self, root, cadence, off_hours_cadence, market_hours, notify=False):
+        self.root = root
+        self.cadence = cadence
+        self.off_hours_cadence = off_hours_cadence
+        self.market_hours = market_hours
+        self.notify = notify
+        self.values = {}
+        self.fingerprints = {}
+        self.last_run = {}
+        # 上次生成简报/网页时所用输入的指纹
+        self.brief_inputs = None
+        self.pages_inputs = None
+        self.stopping = threading.Event()
+
+    def interval(self, name, now):
+        if name in self.off_hours_cadence and not in_market_hours(now, self.market_hours):
+            return self.off_hours_cadence[name]
+        return self.cadence[name]
+
+    def due_collectors(self, now):
+        clock = time.monotonic()
+        due = [name for name in COLLECTORS
+               if clock - self.last_run.get(name, float('-inf')) >= self.interval(name, now)]
+        for name in due:
+            if still_running(name):
+                print(f"⚠ {name}: 上次运行仍未结束, 本轮跳过", flush=True)
+        return [name for name in due if not still_running(name)]
+
+    def seconds_until_due(self, now):
+        clock = time.monotonic()
+        waits = [self.last_run.get(name, float('-inf')) + self.interval(name, now) - clock for name in COLLECTORS]
+        return max(0.0, min(min(waits), MAX_SLEEP_SECONDS))
+
+    def run_stages(self, names):
+        """在本进程中运行 names 中的阶段, 返回结果有变化的阶段"""
+        from settings import load_watchlist
+        self.values['watchlist'] = load_watchlist()
+        stages = {name: STAGES[name] for name in names}
+        results, total, _ = run_pipeline(stages, self.root, in_process=True, values=self.values)
+        changed = set()
+        for name, result in results.items():
+            self.last_run[name] = time.monotonic()
+            if result['status'] != 'ok':
+                continue
+            self.values[name] = result['value']
+            digest = fingerprint(result['value'])
+            if digest != self.fingerprints.get(name):
+                changed.add(name)
+            self.fingerprints[name] = digest
+        statuses = ', '.join(f"{name} {r['status']}" for name, r in results.items())
+        print(f"🔁 {datetime.now():%H:%M:%S} {statuses} ({total:.1f}s), "
+              f"有变化: {', '.join(sorted(changed)) or '无'}\n", flush=True)
+        return changed
+
+    def cycle(self):
+        """运行一轮: 到期的收集阶段, 以及输入变化后的简报、网页与通知"""
+        now = datetime.now().astimezone()
+        # 跨午夜运行时指标写入当天的文件
+        metrics.RUN_DATE = now.strftime('%Y-%m-%d')
+        due = self.due_collectors(now)
+        if due:
+            self.run_stages(due)
+
+        brief_inputs = [self.fingerprints.get(name) for name in COLLECTORS]
+        brief_elapsed = time.monotonic() - self.last_run.get('brief', float('-inf'))
+        run_brief = (brief_inputs != self.brief_inputs and brief_elapsed >= self.cadence['brief']
+                     and not still_running('brief'))
+        # 简报未变时行情变化也需要刷新首页的指数与价格
+        pages_inputs = [self.fingerprints.get('market_data'), self.fingerprints.get('brief')]
+        run_pages = (run_brief or pages_inputs != self.pages_inputs) and not still_running('pages')
+        # 回测汇总只供简报引用, 随简报一起刷新
+        downstream = (['backtest', 'brief'] if run_brief else []) + (['pages'] if run_pages else [])
+        if run_brief and self.notify:
+            downstream.append('notify')
+        if not downstream:
+            return
+
+        self.run_stages(downstream)
+        if run_brief:
+            self.brief_inputs = brief_inputs
+        if run_pages:
+            self.pages_inputs = [self.fingerprints.get('market_data'), self.fingerprints.get('brief')]
+
+    def run(self, cycles=None):
+        done = 0
+        while not self.stopping.is_set():
+            self.cycle()
+            done += 1
+            if cycles is not None and done >= cycles:
+                break
+            self.stopping.wait(self.seconds_until_due(datetime.now().astimezone()))
+
+    def stop(self, *_):
+        print("⏹ 收到停止信号, 本轮结束后退出", flush=True)
+        self.stopping.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按各数据源的节奏持续刷新数据与简报")
+    parser.add_argument('--root', type=Path, default=ROOT, help="工作目录 (默认: 仓库根目录)")
+    parser.add_argument('--cadence', action='append', default=[], metavar='STAGE=SECONDS',
+                        help=f"覆盖刷新间隔 (可重复), 阶段: {', '.join(DEFAULT_CADENCE)}")
+    parser.add_argument('--notify', action='store_true', help="简报重新生成后发送通知")
+    parser.add_argument('--cycles', type=int, help="运行指定轮数后退出")
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    enter_in_process(root)
+    import artifacts
+    from settings import load_settings
+
+    settings = load_settings('daemon')
+    cadence = {**DEFAULT_CADENCE, **settings.get('cadence_seconds', {})}
+    parse_cadences(args.cadence, cadence)
+    off_hours = {**DEFAULT_OFF_HOURS_CADENCE, **settings.get('off_hours_cadence_seconds', {})}
+    market_hours = {**DEFAULT_MARKET_HOURS, **settings.get('market_hours', {})}
+    notify = args.notify or bool(settings.get('notify', False))
+
+    daemon = Daemon(root, cadence, off_hours, market_hours, notify=notify)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    print("🛰 常驻调度进程启动, 刷新间隔: " + ', '.join(f"{k} {v:g}s" for k, v in cadence.items()) + "\n",
+          flush=True)
+    daemon.run(args.cycles)
+    artifacts.wait()
+    metrics.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
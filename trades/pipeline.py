@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+数据管道编排器
+声明各阶段及其依赖关系, 并发运行互不依赖的收集脚本
+
+用法:
+    python -m trades.pipeline               # 运行完整管道
+    python -m trades.pipeline --skip notify # 跳过指定阶段
+    python -m trades.pipeline --list        # 列出阶段
+    python -m trades.pipeline --root DIR    # 以 DIR 为工作目录运行 (基准测试等)
+    python -m trades.pipeline --in-process  # 所有阶段在同一进程中运行
+
+默认每个阶段是一个子进程, 阶段之间经 trades/data/*.json 传递数据。--in-process 模式下
+各阶段的入口函数 (entry) 在本进程的线程中调用, 上游阶段的返回值直接作为下游的参数,
+解释器启动与重依赖 (pandas、yfinance、openai) 的导入只发生一次; JSON 文件仍由各阶段
+在后台写出一次, 供审计与单独运行脚本使用。超时的阶段无法在线程中终止, 只会被标记为
+超时并不再等待。
+"""
+
+import argparse
+import contextvars
+import importlib
+import inspect
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = ROOT / 'trades' / 'scripts'
+TIMING_REPORT = 'trades/data/pipeline_timing.json'
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+import metrics  # noqa: E402
+
+COLLECTORS = ['market_data', 'congress_trades', 'insider_trades', 'sec_filings', 'polymarket']
+
+# 阶段声明
+#   deps:     必须先结束 (成功、失败或超时) 的阶段
+#   timeout:  阶段截止时间 (秒), 超时后进程被终止
+#   required: 失败时是否跳过下游阶段并使整个管道失败
+#   optional: 失败不影响管道退出码 (对应原工作流中的 continue-on-error)
+#   entry:    --in-process 模式调用的函数; 参数按名称从 watchlist 与已完成阶段的返回值中取
+STAGES = {
+    'market_data': {"script": "collect_market_data.py", "entry": "collect", "deps": [], "timeout": 600,
+                    "required": False},
+    'congress_trades': {"script": "collect_congress_trades.py", "entry": "collect", "deps": [], "timeout": 300,
+                        "required": False},
+    # Form 4 文件列表由 sec_filings 写入; 串行运行也避免两个阶段同时消耗 SEC 的速率配额
+    'insider_trades': {"script": "collect_insider_trades.py", "entry": "collect", "deps": ['sec_filings'],
+                       "timeout": 300, "required": False},
+    'sec_filings': {"script": "collect_sec_filings.py", "entry": "collect", "deps": [], "timeout": 300,
+                    "required": False},
+    'polymarket': {"script": "collect_polymarket.py", "entry": "collect", "deps": [], "timeout": 300,
+                   "required": False, "optional": True},
+    # 事件研究回测: 读取收集阶段更新后的价格与交易数据库
+    'backtest': {"script": "backtest.py", "entry": "run", "deps": ['market_data', 'congress_trades', 'insider_trades'],
+                 "timeout": 300, "required": False, "optional": True},
+    'brief': {"script": "generate_brief.py", "entry": "generate", "deps": COLLECTORS + ['backtest'], "timeout": 900,
+              "required": True},
+    'pages': {"script": "generate_pages.py", "entry": "generate", "deps": ['brief'], "timeout": 300,
+              "required": True},
+    'notify': {"script": "send_notifications.py", "entry": "send", "deps": ['pages'], "timeout": 120,
+               "required": False, "optional": True},
+}
+
+
+def run_stage(name, stage, root, run_date=None):
+    """在子进程中运行单个阶段, 返回结果字典
+
+    子进程通过环境变量得知阶段名、启动时间与运行日期, 其指标写入同一个运行文件
+    """
+    started = time.perf_counter()
+    cmd = [sys.executable, str(SCRIPTS_DIR / stage['script'])]
+    env = {
+        **os.environ,
+        "PIPELINE_STAGE": name,
+        "PIPELINE_STAGE_STARTED": repr(time.time()),
+        "PIPELINE_RUN_DATE": run_date or metrics.RUN_DATE,
+    }
+    try:
+        proc = subprocess.run(cmd, cwd=root, env=env, capture_output=True, text=True, timeout=stage['timeout'])
+        status = 'ok' if proc.returncode == 0 else 'failed'
+        output, returncode = proc.stdout + proc.stderr, proc.returncode
+    except subprocess.TimeoutExpired as e:
+        status, returncode = 'timeout', None
+        output = ''.join(
+            part.decode(errors='replace') if isinstance(part, bytes) else part
+            for part in (e.stdout, e.stderr) if part
+        )
+    return {
+        "status": status,
+        "returncode": returncode,
+        "started": started,
+        "duration": time.perf_counter() - started,
+        "output": output,
+    }
+
+
+# --in-process 模式: 各阶段的输出按上下文写入自己的缓冲区, 结束后与子进程模式一样整段打印
+_stage_output = contextvars.ContextVar('stage_output', default=None)
+
+
+class StageOutput(io.TextIOBase):
+    """替换 sys.stdout: 在阶段上下文中写入该阶段的缓冲区, 否则写到原来的输出"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        return (_stage_output.get() or self.stream).write(text)
+
+    def flush(self):
+        (_stage_output.get() or self.stream).flush()
+
+
+def stage_kwargs(entry, values):
+    """values 中与 entry 参数同名的项; entry 接受 **kwargs 时传入全部"""
+    params = inspect.signature(entry).parameters
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()):
+        return dict(values)
+    return {key: value for key, value in values.items() if key in params}
+
+
+def call_stage(name, stage, values, output):
+    """在当前线程中调用阶段的入口函数, 返回结果字典 (value 为入口函数的返回值)"""
+    started = time.perf_counter()
+    _stage_output.set(output)
+    value = None
+    try:
+        with metrics.stage(name):
+            module = importlib.import_module(Path(stage['script']).stem)
+            entry = getattr(module, stage['entry'])
+            value = entry(**stage_kwargs(entry, values))
+        status = 'ok'
+    except (Exception, SystemExit):
+        traceback.print_exc(file=output)
+        status = 'failed'
+    # 与子进程退出时一样立即写出本阶段的指标 (pages 的健康面板读取当天的运行文件)
+    try:
+        metrics.merge(name, metrics.snapshot(name))
+    except OSError as e:
+        print(f"  ⚠ 指标写入失败: {e}", file=output)
+    return {
+        "status": status,
+        "returncode": 0 if status == 'ok' else 1,
+        "started": started,
+        "duration": time.perf_counter() - started,
+        "output": output.getvalue(),
+        "value": value,
+    }
+
+
+def start_in_process(name, stage, values):
+    """在守护线程中运行阶段, 返回 (Future, 输出缓冲区); 超时后不等待的线程不会阻止进程退出"""
+    future = Future()
+    output = io.StringIO()
+
+    def target():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(call_stage(name, stage, values, output))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name=f"stage-{name}", daemon=True).start()
+    return future, output
+
+
+def enter_in_process(root):
+    """进程内运行阶段前的准备: 切换到 root (各脚本使用相对于仓库根目录的路径) 并接管 stdout"""
+    os.chdir(root)
+    if not isinstance(sys.stdout, StageOutput):
+        sys.stdout = StageOutput(sys.stdout)
+
+
+def print_stage_output(name, result):
+    for line in result['output'].rstrip().splitlines():
+        print(f"[{name}] {line}")
+    icon = {'ok': '✓', 'failed': '✗', 'timeout': '⏰'}[result['status']]
+    print(f"{icon} {name}: {result['status']} ({result['duration']:.1f}s)\n", flush=True)
+
+
+def run_pipeline(stages, root=ROOT, in_process=False, values=None):
+    """按依赖关系调度各阶段; 依赖全部结束后阶段才会启动
+
+    in_process=True 时在本进程中调用各阶段的入口函数 (调用方需先切换到 root 目录),
+    values 为各阶段可用的初始参数 (如 watchlist), 成功阶段的返回值以阶段名加入其中。
+    """
+    pipeline_started = time.perf_counter()
+    results = {}
+    pending = dict(stages)
+    running = {}
+    values = dict(values or {})
+    deadlines = {}
+
+    with ThreadPoolExecutor(max_workers=len(stages) or 1) as pool:
+        while pending or running:
+            for name in list(pending):
+                stage = pending[name]
+                deps = [d for d in stage['deps'] if d in stages]
+                if not all(d in results for d in deps):
+                    continue
+                del pending[name]
+                blocked = [d for d in deps if stages[d].get('required') and results[d]['status'] != 'ok']
+                if blocked:
+                    results[name] = {"status": "skipped", "returncode": None, "started": time.perf_counter(),
+                                     "duration": 0.0, "output": f"依赖阶段未成功: {', '.join(blocked)}"}
+                    print(f"⏭ {name}: 跳过 (依赖阶段未成功: {', '.join(blocked)})\n", flush=True)
+                    continue
+                print(f"▶ {name}: 启动", flush=True)
+                if in_process:
+                    future, output = start_in_process(name, stage, values)
+                    deadlines[future] = (time.perf_counter(), output)
+                    running[future] = name
+                else:
+                    running[pool.submit(run_stage, name, stage, root)] = name
+
+            if not running:
+                continue
+            timeout = None
+            if deadlines:
+                now = time.perf_counter()
+                timeout = max(0.0, min(started + stages[running[f]]['timeout'] - now
+                                       for f, (started, _) in deadlines.items()))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                deadlines.pop(future, None)
+                results[name] = future.result()
+                if results[name].get('status') == 'ok' and 'value' in results[name]:
+                    values[name] = results[name]['value']
+                print_stage_output(name, results[name])
+            # 线程中的阶段无法终止: 超过截止时间后标记为超时, 不再等待其结果
+            now = time.perf_counter()
+            for future, (started, output) in list(deadlines.items()):
+                name = running[future]
+                if now - started >= stages[name]['timeout']:
+                    del running[future], deadlines[future]
+                    results[name] = {"status": "timeout", "returncode": None, "started": started,
+                                     "duration": now - started, "output": output.getvalue()}
+                    print_stage_output(name, results[name])
+
+    total = time.perf_counter() - pipeline_started
+    return results, total, pipeline_started
+
+
+def write_timing_report(results, total, pipeline_started, root=ROOT):
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "total_seconds": round(total, 3),
+        "stages": {
+            name: {
+                "status": r['status'],
+                "returncode": r['returncode'],
+                "start_offset": round(r['started'] - pipeline_started, 3),
+                "duration": round(r['duration'], 3),
+                "deps": STAGES[name]['deps'] if name in STAGES else [],
+            }
+            for name, r in results.items()
+        },
+    }
+    path = Path(root) / TIMING_REPORT
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_timing_table(report):
+    print("⏱ 阶段耗时:")
+    print(f"  {'阶段':<18}{'状态':<8}{'开始':>7}{'耗时':>8}")
+    for name, s in sorted(report['stages'].items(), key=lambda kv: kv[1]['start_offset']):
+        print(f"  {name:<20}{s['status']:<10}{s['start_offset']:>8.1f}s{s['duration']:>9.1f}s")
+    print(f"  总耗时: {report['total_seconds']:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行交易情报数据管道")
+    parser.add_argument('--skip', action='append', default=[], choices=list(STAGES),
+                        help="跳过指定阶段 (可重复)")
+    parser.add_argument('--list', action='store_true', help="列出所有阶段及依赖")
+    parser.add_argument('--root', type=Path, default=ROOT,
+                        help="工作目录: 读取配置、写入数据与网页的位置 (默认: 仓库根目录)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="在同一进程中运行所有阶段, 阶段之间直接传递内存中的结果")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, stage in STAGES.items():
+            deps = ', '.join(stage['deps']) or '-'
+            print(f"{name:<18}{stage['script']:<30}deps: {deps}")
+        return 0
+
+    stages = {name: stage for name, stage in STAGES.items() if name not in args.skip}
+    print(f"🚀 运行数据管道: {len(stages)} 个阶段\n")
+    root = args.root.resolve()
+    os.makedirs(root / 'trades' / 'data', exist_ok=True)
+
+    if args.in_process:
+        enter_in_process(root)
+        import artifacts
+        from settings import load_watchlist
+        results, total, pipeline_started = run_pipeline(stages, root, in_process=True,
+                                                        values={"watchlist": load_watchlist()})
+        failed_writes = artifacts.wait()
+        if failed_writes:
+            print(f"⚠ {failed_writes} 个数据文件写入失败")
+        metrics.flush()
+    else:
+        results, total, pipeline_started = run_pipeline(stages, root)
+    report = write_timing_report(results, total, pipeline_started, root)
+    print_timing_table(report)
+    print(f"\n✓ 阶段耗时报告已保存到 {TIMING_REPORT}")
+
+    # 阶段状态与总耗时并入当天的运行指标 (各阶段自身的指标由子进程或上面的 flush 写入)
+    metrics.merge('pipeline', {"wall": report['total_seconds'], "stages": report['stages']},
+                  path=str(root / metrics.run_path()))
+
+    failed = [name for name, r in results.items()
+              if r['status'] != 'ok' and not stages[name].get('optional')]
+    if failed:
+        print(f"✗ 未成功的阶段: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
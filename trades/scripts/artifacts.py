@@ -0,0 +1,59 @@
+"""
+数据文件写出
+各阶段把结果作为内存对象返回给下游 (管道的 --in-process 模式), trades/data/*.json 只作为
+审计记录与单独运行脚本时的输入写出一次。save() 把序列化与写盘交给一个后台线程后立即返回,
+写入按提交顺序进行; 进程退出前 (或调用 wait() 时) 等待全部写完。
+
+传给 save() 的对象在写完之前不应再被修改。
+"""
+
+import atexit
+import json
+import os
+
+import metrics
+
+_pool = metrics.ContextThreadPool(max_workers=1, thread_name_prefix='artifacts')
+_pending = []
+
+
+def _write(path, data, indent):
+    with metrics.span('artifacts.write', label=os.path.basename(path)):
+        text = json.dumps(data, indent=indent)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    metrics.count('artifacts.bytes', len(text))
+
+
+def save(path, data, indent=2):
+    """在后台把 data 写为 JSON 文件 (先写临时文件再替换, 读者不会看到写了一半的文件)"""
+    future = _pool.submit(_write, path, data, indent)
+    _pending.append(future)
+    return future
+
+
+def load(path, default=None):
+    """读取 JSON 文件; 文件缺失或损坏时返回 default"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+
+
+def wait():
+    """等待已提交的写入全部完成; 返回失败的数量"""
+    failed = 0
+    while _pending:
+        try:
+            _pending.pop(0).result()
+        except Exception as e:
+            failed += 1
+            print(f"  ⚠ 数据文件写入失败: {e}")
+    return failed
+
+
+atexit.register(wait)
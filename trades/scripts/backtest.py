@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+国会与内幕交易事件研究
+把国会交易与内幕交易 (公开市场买卖) 视为事件, 计算事件公开后 1/5/20/60 个交易日的
+远期收益, 以及相对 ^GSPC 的超额收益, 按来源、方向与期限汇总写入
+trades/data/backtest_summary.json, 供简报引用。
+
+- 事件: congress_store / edgar_store 中积累的全部历史交易; 数据库为空时使用收集阶段
+  输出的最近交易。事件日为公开日期 (国会交易的披露日、Form 4 的提交日), 缺失时用交易日
+- 价格: 价格库只由行情收集阶段维护监控列表与指数, 事件涉及的其他股票在这里补齐
+  (与行情收集共用下载与增量写入), 每次最多 BACKFILL_LIMIT 只, 按事件数优先;
+  汇总中的 evaluated / events 即有价格历史、计入统计的事件比例
+- 入场价为事件日之后的第一个收盘价 (披露可能在收盘后), 出场价为其后第 N 个交易日的收盘价
+- 全部事件在一次向量化计算中完成: 事件日期经 searchsorted 定位到收盘价矩阵的行,
+  股票经列索引对齐, 各期限的出场价以 (事件 × 期限) 的下标一次取出, 不逐个事件循环
+- 方向: 买入为 +1, 卖出为 -1; 胜率与 t 值按"跟随方向"的超额收益 (超额收益 × 方向) 计算
+
+用法:
+    python trades/scripts/backtest.py
+"""
+
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import artifacts
+import collect_market_data
+import congress_store
+import edgar_store
+import metrics
+import price_store
+
+SUMMARY_PATH = 'trades/data/backtest_summary.json'
+CONGRESS_PATH = 'trades/data/congress_trades.json'
+INSIDER_PATH = 'trades/data/insider_trades.json'
+HORIZONS = (1, 5, 20, 60)
+BENCHMARK = '^GSPC'
+
+# 每次运行最多补齐行情的股票数 (按事件数优先); 首次回填分几次运行完成
+BACKFILL_LIMIT = int(os.environ.get('BACKTEST_BACKFILL_LIMIT', '500'))
+# 下载不到行情的代码 (退市、非美股等) 在 UNAVAILABLE_RETRY_DAYS 天内不再重试
+UNAVAILABLE_PATH = 'trades/data/store/backtest_unavailable.json'
+UNAVAILABLE_RETRY_DAYS = 30
+SYMBOL = re.compile(r'^[A-Z][A-Z0-9.\-]{0,9}$')
+
+# 按交易人统计时使用的期限与最少事件数
+ACTOR_HORIZON = 20
+MIN_ACTOR_EVENTS = 5
+TOP_ACTORS = 10
+
+
+def direction_of(transaction_types):
+    """Purchase… → 1, Sale… → -1, 其他 (交换、授予等) → 0"""
+    types = pd.Series(transaction_types, dtype='object').fillna('').str.strip().str.lower()
+    return np.select([types.str.startswith('purchase'), types.str.startswith('sale')], [1, -1], 0)
+
+
+def _events(source, records, date_fields, actor_field):
+    """交易记录 → 事件表: 事件日取 date_fields 中第一个非空日期, 同一交易人同日同向的交易合并"""
+    frame = pd.DataFrame.from_records(records)
+    date = pd.Series(pd.NaT, index=frame.index, dtype='datetime64[ns]')
+    for field in date_fields:
+        if field in frame:
+            date = date.fillna(pd.to_datetime(frame[field], format='ISO8601', errors='coerce'))
+    blank = pd.Series('', index=frame.index)
+    events = pd.DataFrame({
+        'source': source,
+        'ticker': frame.get('ticker', blank).fillna('').astype(str).str.strip().str.upper(),
+        'date': date.dt.normalize(),
+        'direction': direction_of(frame.get('transaction_type', blank)),
+        'actor': frame.get(actor_field, blank).fillna('').astype(str),
+    })
+    events = events[(events['direction'] != 0) & events['date'].notna() & events['ticker'].str.match(SYMBOL)]
+    return events.drop_duplicates(['ticker', 'date', 'direction', 'actor'], ignore_index=True)
+
+
+def congress_events(congress_trades=None):
+    records = []
+    if os.path.exists(congress_store.DB_PATH):
+        conn = congress_store.connect()
+        records = congress_store.query_trades(conn)
+        conn.close()
+    if not records:
+        records = (congress_trades or artifacts.load(CONGRESS_PATH, {})).get('trades', [])
+    return _events('congress', records, ('disclosure_date', 'transaction_date'), 'politician')
+
+
+def insider_events(insider_trades=None):
+    records = []
+    if os.path.exists(edgar_store.DB_PATH):
+        conn = edgar_store.connect()
+        records = edgar_store.query_form4_events(conn)
+        conn.close()
+    if not records:
+        records = (insider_trades or artifacts.load(INSIDER_PATH, {})).get('trades', [])
+    return _events('insider', records, ('filing_date', 'transaction_date', 'latest_trans_date'), 'insider_name')
+
+
+def backfill_prices(events, today=None):
+    """为事件涉及的股票补齐价格库, 返回本次下载的代码数
+
+    价格库中没有或落后于上一个交易日的代码按事件数降序下载, 最多 BACKFILL_LIMIT 只;
+    下载后仍没有任何日线的代码记入 UNAVAILABLE_PATH, 一段时间内不再重试。
+    """
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    stale_before = today - pd.offsets.BDay(1)
+    unavailable = {ticker: day for ticker, day in artifacts.load(UNAVAILABLE_PATH, {}).items()
+                   if today - pd.Timestamp(day) < pd.Timedelta(days=UNAVAILABLE_RETRY_DAYS)}
+    wanted = []
+    for ticker in events['ticker'].value_counts().index:
+        if len(wanted) >= BACKFILL_LIMIT:
+            break
+        if ticker in unavailable or ticker == BENCHMARK:
+            continue
+        last = price_store.last_date(ticker)
+        if last is None or pd.Timestamp(last) < stale_before:
+            wanted.append(ticker)
+    if wanted:
+        collect_market_data.update_price_store(wanted)
+        for ticker in wanted:
+            if price_store.last_date(ticker) is None:
+                unavailable[ticker] = today.strftime('%Y-%m-%d')
+    artifacts.save(UNAVAILABLE_PATH, unavailable)
+    return len(wanted)
+
+
+def forward_returns(closes, dates, tickers, horizons=HORIZONS, side='right'):
+    """全部事件的各期限远期收益, 返回 (事件 × 期限) 矩阵; 价格不足或股票缺失处为 NaN
+
+    closes 为 日期 × 股票 的收盘价矩阵。side='right' 时入场为事件日之后的第一个收盘价,
+    'left' 时为事件日当天或之后的第一个收盘价。
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    result = np.full((len(dates), len(horizons)), np.nan)
+    if not len(closes) or not len(dates):
+        return result
+    values = closes.to_numpy(dtype=float)
+    last = len(values) - 1
+    entries = closes.index.searchsorted(dates, side)
+    exits = entries[:, None] + np.asarray(horizons)[None, :]
+    cols = closes.columns.get_indexer(pd.Index(tickers))
+    valid = (cols >= 0)[:, None] & (exits <= last)
+    safe_cols = np.where(cols >= 0, cols, 0)
+    entry_prices = values[np.minimum(entries, last), safe_cols][:, None]
+    exit_prices = values[np.minimum(exits, last), safe_cols[:, None]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[valid] = (exit_prices / entry_prices - 1)[valid]
+    return result
+
+
+def event_study(events, closes, horizons=HORIZONS, benchmark=BENCHMARK):
+    """返回 (远期收益, 超额收益) 两个 (事件 × 期限) 矩阵; 超额收益 = 股票收益 - 同期基准收益"""
+    dates = events['date'].to_numpy()
+    returns = forward_returns(closes, dates, events['ticker'].to_numpy(), horizons)
+    if benchmark in closes:
+        bench = forward_returns(closes[[benchmark]], dates, np.full(len(events), benchmark), horizons)
+    else:
+        bench = np.full(returns.shape, np.nan)
+    return returns, returns - bench
+
+
+def _stats(long, keys):
+    """按 keys 分组的事件数、平均/中位超额收益、胜率与 t 值 (跟随方向的超额收益)"""
+    grouped = long.groupby(keys, sort=True)
+    table = grouped.agg(
+        events=('abnormal', 'size'),
+        mean_return=('return', 'mean'),
+        mean_abnormal=('abnormal', 'mean'),
+        median_abnormal=('abnormal', 'median'),
+        hit_rate=('hit', 'mean'),
+        signed_mean=('signed', 'mean'),
+        signed_std=('signed', 'std'),
+    )
+    table['t_stat'] = table['signed_mean'] / (table['signed_std'] / np.sqrt(table['events']))
+    return table.drop(columns=['signed_std']).replace([np.inf, -np.inf], np.nan).reset_index()
+
+
+def _records(table):
+    records = []
+    for row in table.to_dict('records'):
+        records.append({key: (None if isinstance(value, float) and value != value else
+                              round(value, 4) if isinstance(value, float) else
+                              int(value) if isinstance(value, np.integer) else value)
+                        for key, value in row.items()})
+    return records
+
+
+def summarize(events, returns, abnormal, horizons=HORIZONS):
+    """按 (来源, 方向, 期限) 与交易人汇总; 所有统计在长表上分组计算"""
+    count, width = returns.shape
+    direction = events['direction'].to_numpy()
+    long = pd.DataFrame({
+        'source': np.repeat(events['source'].to_numpy(), width),
+        'side': np.repeat(np.where(direction > 0, 'buy', 'sell'), width),
+        'actor': np.repeat(events['actor'].to_numpy(), width),
+        'horizon': np.tile(np.asarray(horizons), count),
+        'return': returns.ravel(),
+        'abnormal': abnormal.ravel(),
+        'signed': (abnormal * direction[:, None]).ravel(),
+    }).dropna(subset=['abnormal'])
+    long['hit'] = (long['signed'] > 0).astype(float)
+
+    groups = _stats(long, ['source', 'side', 'horizon'])
+    actors = _stats(long[long['horizon'] == ACTOR_HORIZON], ['source', 'actor'])
+    actors = actors[actors['events'] >= MIN_ACTOR_EVENTS].sort_values('signed_mean', ascending=False)
+    top = actors.groupby('source', sort=True).head(TOP_ACTORS)
+    return _records(groups.drop(columns=['signed_mean'])), _records(top)
+
+
+def run(congress_trades=None, insider_trades=None, closes=None):
+    """运行事件研究并写出 backtest_summary.json, 返回汇总
+
+    congress_trades / insider_trades 为收集阶段的输出, 仅在对应数据库为空时使用;
+    closes 为收盘价矩阵, 未传入时从 price_store 读取事件涉及的股票与基准。
+    """
+    print("📈 回测国会与内幕交易信号...")
+    with metrics.span('backtest.events'):
+        events = pd.concat([congress_events(congress_trades), insider_events(insider_trades)], ignore_index=True)
+    if closes is None and len(events):
+        with metrics.span('backtest.backfill'):
+            try:
+                metrics.count('backtest.backfilled', backfill_prices(events))
+            except Exception as e:
+                print(f"  ⚠ 补齐行情失败, 只使用价格库中已有的股票: {e}")
+        with metrics.span('backtest.prices'):
+            tickers = sorted(set(events['ticker'])) + [BENCHMARK]
+            start = events['date'].min().strftime('%Y-%m-%d')
+            closes = price_store.load_matrix(tickers, start=start, fields=('close',))['close']
+            closes = closes.dropna(axis=1, how='all')
+    if closes is None:
+        closes = pd.DataFrame()
+
+    with metrics.span('backtest.compute'):
+        returns, abnormal = event_study(events, closes)
+        groups, actors = summarize(events, returns, abnormal)
+    evaluated = int(np.isfinite(abnormal).any(axis=1).sum())
+    metrics.count('backtest.events', len(events))
+    metrics.count('backtest.evaluated', evaluated)
+
+    summary = {
+        "timestamp": datetime.now().isoformat(),
+        "benchmark": BENCHMARK,
+        "horizons": list(HORIZONS),
+        "events": {source: int(n) for source, n in events['source'].value_counts().sort_index().items()},
+        "evaluated": evaluated,
+        "price_range": [closes.index.min().strftime('%Y-%m-%d'), closes.index.max().strftime('%Y-%m-%d')]
+        if len(closes) else None,
+        "groups": groups,
+        "actors": {"horizon": ACTOR_HORIZON, "min_events": MIN_ACTOR_EVENTS, "top": actors},
+    }
+    artifacts.save(SUMMARY_PATH, summary)
+
+    coverage = f"{evaluated / len(events):.0%}" if len(events) else '-'
+    print(f"  ✓ {len(events)} 个事件, 其中 {evaluated} 个 ({coverage}) 有价格历史 "
+          f"({closes.shape[1] if len(closes) else 0} 只股票)")
+    for group in groups:
+        if group['horizon'] in (5, 20):
+            abnormal_text = '-' if group['mean_abnormal'] is None else f"{group['mean_abnormal']:+.2%}"
+            hit_text = '-' if group['hit_rate'] is None else f"{group['hit_rate']:.0%}"
+            print(f"  {group['source']:<9}{group['side']:<5}{group['horizon']:>3} 日: {group['events']:>6} 个, "
+                  f"平均超额 {abnormal_text}, 胜率 {hit_text}")
+    print(f"\n✓ 回测汇总已保存: {SUMMARY_PATH}")
+    return summary
+
+
+if __name__ == '__main__':
+    run()
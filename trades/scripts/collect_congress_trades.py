@@ -2,100 +2,183 @@
 """
 国会交易数据收集脚本
 从公开来源获取美国国会议员的股票交易披露
+
+数据来自众议院书记官办公室的年度批量披露文件 (见 house_disclosures.py): 每次运行只处理
+索引中尚未处理过的文件, 解析结果写入 congress_store 的 SQLite 数据库, 再从数据库中
+查询监控列表股票最近的交易。参议院没有批量文件, 暂不收录。数据库为空时使用示例数据。
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 
-import requests
-from bs4 import BeautifulSoup
+import artifacts
+import congress_store
+import house_disclosures
+import metrics
+from settings import load_watchlist
 
-os.makedirs('trades/data', exist_ok=True)
+OUTPUT_PATH = 'trades/data/congress_trades.json'
+LOOKBACK_DAYS = int(os.environ.get('CONGRESS_LOOKBACK_DAYS', '90'))
+WORKERS = int(os.environ.get('CONGRESS_WORKERS', '4'))
+# 单次运行最多下载的 PTR 数量, 首次回填分摊到多次运行
+MAX_DOCUMENTS = int(os.environ.get('CONGRESS_MAX_DOCUMENTS', '300'))
 
-print("🏛️ 收集国会交易数据...")
 
-congress_trades = []
+def years():
+    """要处理的年度: 默认为当年; 1 月份同时补齐上一年度"""
+    now = datetime.now()
+    default_years = f"{now.year - 1},{now.year}" if now.month == 1 else str(now.year)
+    return [int(y) for y in os.environ.get('CONGRESS_YEARS', default_years).split(',') if y.strip()]
+
+
+def process_ptr(filing):
+    """返回 (文件, 状态, 交易列表)"""
+    try:
+        text = house_disclosures.ptr_text(filing)
+    except Exception as e:
+        metrics.count('congress.document_errors')
+        print(f"  ⚠ {filing['doc_id']} ({filing['politician']}): {e}")
+        return filing, 'error', []
+    if text is None:
+        status = 'no_parser' if house_disclosures.PdfReader is None else 'no_text'
+        return filing, status, []
+    trades = house_disclosures.parse_ptr(text, filing)
+    return filing, 'parsed' if trades or text.strip() else 'no_text', trades
+
+
+def ingest(conn, year):
+    """处理一个年度索引中的新文件, 返回 (新文件数, 新交易数)"""
+    with metrics.span('congress.archive', label=year):
+        path = house_disclosures.fetch_archive(year)
+    if path is None:
+        print(f"  ⚠ {year} 年没有批量披露文件")
+        return 0, 0
+
+    # 没有 PDF 解析器时 PTR 只记录索引, 已记录过的不再重复写入
+    can_parse = house_disclosures.PdfReader is not None or bool(house_disclosures.ARCHIVE_DIR)
+    seen = congress_store.seen_ids(conn, 'house', year)
+    if not can_parse:
+        seen |= congress_store.seen_ids(conn, 'house', year, ('no_parser',))
+    reports = []
+    new_filings = 0
+    with metrics.span('congress.index', label=year):
+        for filing in house_disclosures.iter_filings(path):
+            if filing['doc_id'] in seen:
+                continue
+            if filing['filing_type'] == 'P' and can_parse:
+                reports.append(filing)
+            else:
+                congress_store.save_filing(conn, filing, 'indexed' if filing['filing_type'] != 'P' else 'no_parser')
+                new_filings += 1
+    conn.commit()
+
+    deferred = max(len(reports) - MAX_DOCUMENTS, 0)
+    new_trades = 0
+    with metrics.ContextThreadPool(max_workers=WORKERS) as pool:
+        for filing, status, trades in pool.map(process_ptr, reports[:MAX_DOCUMENTS]):
+            congress_store.save_filing(conn, filing, status, trades)
+            new_filings += 1
+            new_trades += len(trades)
+    conn.commit()
+
+    metrics.count('congress.new_filings', new_filings)
+    metrics.count('congress.new_trades', new_trades)
+    print(f"  ✓ {year}: 新文件 {new_filings} 个 (其中 PTR {min(len(reports), MAX_DOCUMENTS)} 个), "
+          f"解析出 {new_trades} 笔交易{f', {deferred} 个 PTR 留待下次运行' if deferred else ''}")
+    if not can_parse:
+        print("  ⚠ 未安装 pypdf, PTR 只记录索引, 正文在安装后的运行中解析")
+    return new_filings, new_trades
 
-# 方法1: 尝试从 Capitol Trades API 获取数据
-try:
-    # Capitol Trades 是一个追踪国会交易的网站
-    url = "https://www.capitoltrades.com/trades?page=1&pageSize=20"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
-    response = requests.get(url, headers=headers, timeout=10)
-    if response.status_code == 200:
-        # 解析HTML获取交易数据
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # 注意: 实际解析逻辑需要根据网站结构调整
-        print("  ✓ Capitol Trades 连接成功")
-except Exception as e:
-    print(f"  ⚠ Capitol Trades 获取失败: {e}")
-
-# 方法2: 使用模拟数据（用于演示）
-# 在实际部署时，应该接入真实的数据源如 QuiverQuant API
-sample_trades = [
-    {
-        "politician": "Nancy Pelosi",
-        "party": "D",
-        "state": "CA",
-        "ticker": "NVDA",
-        "transaction_type": "Purchase",
-        "amount_range": "$1,000,001 - $5,000,000",
-        "transaction_date": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
-        "disclosure_date": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),
-        "asset_description": "NVIDIA Corporation - Common Stock"
-    },
-    {
-        "politician": "Dan Crenshaw",
-        "party": "R",
-        "state": "TX",
-        "ticker": "MSFT",
-        "transaction_type": "Purchase",
-        "amount_range": "$15,001 - $50,000",
-        "transaction_date": (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
-        "disclosure_date": (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d"),
-        "asset_description": "Microsoft Corporation - Common Stock"
-    },
-    {
-        "politician": "Josh Gottheimer",
-        "party": "D",
-        "state": "NJ",
-        "ticker": "GOOGL",
-        "transaction_type": "Sale",
-        "amount_range": "$50,001 - $100,000",
-        "transaction_date": (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),
-        "disclosure_date": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
-        "asset_description": "Alphabet Inc. - Class A Common Stock"
-    }
-]
 
-# 读取watchlist，过滤相关交易
-try:
-    with open('trades/config/watchlist.json', 'r') as f:
-        watchlist = json.load(f)
+def sample_trades():
+    """数据库为空 (从未成功获取批量文件) 时使用的示例数据 (用于演示)"""
+    return [
+        {
+            "politician": "Nancy Pelosi",
+            "party": "D",
+            "state": "CA",
+            "ticker": "NVDA",
+            "transaction_type": "Purchase",
+            "amount_range": "$1,000,001 - $5,000,000",
+            "transaction_date": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
+            "disclosure_date": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "asset_description": "NVIDIA Corporation - Common Stock"
+        },
+        {
+            "politician": "Dan Crenshaw",
+            "party": "R",
+            "state": "TX",
+            "ticker": "MSFT",
+            "transaction_type": "Purchase",
+            "amount_range": "$15,001 - $50,000",
+            "transaction_date": (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
+            "disclosure_date": (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d"),
+            "asset_description": "Microsoft Corporation - Common Stock"
+        },
+        {
+            "politician": "Josh Gottheimer",
+            "party": "D",
+            "state": "NJ",
+            "ticker": "GOOGL",
+            "transaction_type": "Sale",
+            "amount_range": "$50,001 - $100,000",
+            "transaction_date": (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),
+            "disclosure_date": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
+            "asset_description": "Alphabet Inc. - Class A Common Stock"
+        }
+    ]
+
+
+def collect(watchlist=None):
+    """处理新的披露文件, 返回 congress_trades.json 的内容"""
+    print("🏛️ 收集国会交易数据...")
+    watchlist = watchlist or load_watchlist() or {}
     watchlist_tickers = set(watchlist.get('tickers', []))
-except:
-    watchlist_tickers = set()
-
-# 过滤出与watchlist相关的交易
-relevant_trades = []
-for trade in sample_trades:
-    if trade['ticker'] in watchlist_tickers or not watchlist_tickers:
-        relevant_trades.append(trade)
-        print(f"  ✓ {trade['politician']} ({trade['party']}-{trade['state']}): {trade['transaction_type']} {trade['ticker']}")
-
-# 保存数据
-output = {
-    "timestamp": datetime.now().isoformat(),
-    "source": "sample_data",  # 实际部署时改为真实数据源
-    "trades": relevant_trades,
-    "total_count": len(relevant_trades)
-}
-
-with open('trades/data/congress_trades.json', 'w') as f:
-    json.dump(output, f, indent=2)
-
-print(f"\n✓ 国会交易数据已保存: {len(relevant_trades)} 条记录")
+    congress_trades = []
+
+    source = "sample_data"
+    conn = congress_store.connect()
+    for year in years():
+        try:
+            ingest(conn, year)
+        except Exception as e:
+            print(f"  ⚠ {year} 年批量披露文件处理失败: {e}")
+
+    # 从数据库查询监控列表股票最近披露的交易
+    if congress_store.count_filings(conn):
+        since = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        congress_trades = congress_store.query_trades(
+            conn, tickers=sorted(watchlist_tickers) if watchlist_tickers else None,
+            since=since, date_field='disclosure_date',
+        )
+        for trade in congress_trades[:20]:
+            print(f"  ✓ {trade['politician']} ({trade['state']}): {trade['transaction_type']} {trade['ticker']} "
+                  f"{trade['amount_range']}")
+        source = "house_clerk"
+    conn.close()
+
+    if source == "sample_data":
+        print("  ⚠ 国会交易数据库为空，使用示例数据")
+        # 过滤出与watchlist相关的交易
+        for trade in sample_trades():
+            if trade['ticker'] in watchlist_tickers or not watchlist_tickers:
+                congress_trades.append(trade)
+                print(f"  ✓ {trade['politician']} ({trade['party']}-{trade['state']}): "
+                      f"{trade['transaction_type']} {trade['ticker']}")
+
+    metrics.count('congress.records', len(congress_trades))
+
+    # 保存数据
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "source": source,
+        "trades": congress_trades,
+        "total_count": len(congress_trades)
+    }
+    artifacts.save(OUTPUT_PATH, output)
+    print(f"\n✓ 国会交易数据已保存: {len(congress_trades)} 条记录")
+    return output
+
+
+if __name__ == '__main__':
+    collect()
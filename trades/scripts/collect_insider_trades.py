@@ -2,90 +2,145 @@
 """
 内幕交易数据收集脚本
 从 SEC Form 4 获取公司内部人员的股票交易
+
+Form 4 文件列表来自 sec_filings 阶段写入的 edgar_store (因此在其之后运行, 两者不会同时
+占用 SEC 的速率限制)。尚未解析的文件经令牌桶限速下载原始 XML, 用 iterparse 流式解析
+(见 form4.py); 股数低于 alert_thresholds.insider_trade_min_shares 的交易在写入时丢弃,
+每个 accession 只解析一次。交易按 XML 中的发行人记账 (关注列表中的公司作为申报人申报的
+其他公司交易归入该发行人)。输出最近 SEC_LOOKBACK_DAYS 天的交易; 数据库为空时使用示例数据。
 """
 
-import json
 import os
-import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+import artifacts
+import edgar
+import edgar_store
+import form4
+import metrics
+from settings import load_settings, load_watchlist
+
+OUTPUT_PATH = 'trades/data/insider_trades.json'
+
+_settings = load_settings('edgar')
+LOOKBACK_DAYS = int(os.environ.get('SEC_LOOKBACK_DAYS', _settings.get('lookback_days', 30)))
+MAX_DOCUMENTS = int(os.environ.get('FORM4_MAX_DOCUMENTS', _settings.get('form4_max_documents', 500)))
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOGL", "NVDA", "TSLA"]
 
-os.makedirs('trades/data', exist_ok=True)
 
-print("📋 收集内幕交易数据...")
+def parse_filing(filing):
+    """返回 (文件, 状态, 全部交易, 错误)"""
+    try:
+        with metrics.span('insider.form4', label=filing['ticker']):
+            return filing, 'parsed', form4.fetch(filing), None
+    except ValueError as e:
+        return filing, 'no_xml', [], e
+    except Exception as e:
+        return filing, 'error', [], e
 
-# 读取watchlist
-try:
-    with open('trades/config/watchlist.json', 'r') as f:
-        watchlist = json.load(f)
+
+def collect(watchlist=None):
+    """解析新的 Form 4 文件, 返回 insider_trades.json 的内容"""
+    print("📋 收集内幕交易数据...")
+    watchlist = watchlist or load_watchlist() or {"tickers": DEFAULT_TICKERS}
     tickers = watchlist.get('tickers', [])
-except:
-    tickers = ["AAPL", "MSFT", "GOOGL", "NVDA", "TSLA"]
-
-insider_trades = []
-
-# 尝试使用 Manus API 获取内幕交易数据
-try:
-    sys.path.append('/opt/.manus/.sandbox-runtime')
-    from data_api import ApiClient
-    
-    client = ApiClient()
-    
-    for ticker in tickers[:5]:  # 限制请求数量
-        try:
-            response = client.call_api('YahooFinance/get_stock_holders', query={
-                'symbol': ticker,
-                'region': 'US',
-                'lang': 'en-US'
-            })
-            
-            if response and 'quoteSummary' in response:
-                result = response['quoteSummary'].get('result', [{}])[0]
-                insider_holders = result.get('insiderHolders', {}).get('holders', [])
-                
-                for holder in insider_holders[:5]:
-                    trade = {
-                        "ticker": ticker,
-                        "insider_name": holder.get('name', 'Unknown'),
-                        "relation": holder.get('relation', 'Unknown'),
-                        "transaction_type": holder.get('transactionDescription', 'Unknown'),
-                        "shares": holder.get('positionDirect', {}).get('raw', 0) if isinstance(holder.get('positionDirect'), dict) else 0,
-                        "latest_trans_date": holder.get('latestTransDate', {}).get('fmt', 'Unknown') if isinstance(holder.get('latestTransDate'), dict) else 'Unknown'
-                    }
-                    insider_trades.append(trade)
-                    print(f"  ✓ {ticker}: {trade['insider_name']} - {trade['transaction_type']}")
-        except Exception as e:
-            print(f"  ⚠ {ticker}: {e}")
-            
-except ImportError:
-    print("  ⚠ Manus API 不可用，使用模拟数据")
-    # 使用模拟数据
-    insider_trades = [
-        {
-            "ticker": "NVDA",
-            "insider_name": "Jensen Huang",
-            "relation": "CEO",
-            "transaction_type": "Sale",
-            "shares": 100000,
-            "latest_trans_date": "2026-01-10"
-        },
-        {
-            "ticker": "AAPL",
-            "insider_name": "Tim Cook",
-            "relation": "CEO",
-            "transaction_type": "Sale",
-            "shares": 50000,
-            "latest_trans_date": "2026-01-08"
-        }
-    ]
-
-# 保存数据
-output = {
-    "timestamp": datetime.now().isoformat(),
-    "trades": insider_trades,
-    "total_count": len(insider_trades)
-}
-
-with open('trades/data/insider_trades.json', 'w') as f:
-    json.dump(output, f, indent=2)
-
-print(f"\n✓ 内幕交易数据已保存: {len(insider_trades)} 条记录")
+    min_shares = float(watchlist.get('alert_thresholds', {}).get('insider_trade_min_shares', 0) or 0)
+    insider_trades = []
+    since = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+
+    conn = edgar_store.connect()
+    try:
+        reset = edgar_store.reset_misattributed_form4(conn)
+        if reset:
+            conn.commit()
+            print(f"  ⚠ {reset} 个 Form 4 文件的交易曾按申报人代码记账, 已清除并重新解析")
+        # Form 4 文件列表来自 sec_filings 阶段写入的 edgar_store; 已解析的 accession 不再请求
+        pending = edgar_store.pending_form4(conn, tickers=tickers, since=since, limit=MAX_DOCUMENTS)
+        started = time.perf_counter()
+        parsed = kept = other = done = 0
+        with metrics.ContextThreadPool(max_workers=edgar.WORKERS) as pool:
+            for filing, status, transactions, error in pool.map(parse_filing, pending):
+                metrics.count('insider.api_requests')
+                if status == 'error':
+                    metrics.count('insider.api_errors')
+                    print(f"  ⚠ {filing['ticker']} {filing['accession']}: {error}")
+                    continue
+                # 发行人缺少交易代码时, 只有与申报文件同一 CIK 才沿用文件的代码, 否则无法归属而丢弃
+                for t in transactions:
+                    if not t.ticker and t.issuer_cik == filing['cik']:
+                        t.ticker = filing['ticker']
+                # 阈值在写入时过滤: 低于 insider_trade_min_shares 的交易不进入数据库
+                selected = [t.as_dict() for t in transactions if t.ticker and t.shares >= min_shares]
+                edgar_store.save_form4(conn, filing['accession'], status, selected, len(transactions))
+                parsed += len(transactions)
+                kept += len(selected)
+                other += sum(t['issuer_cik'] != filing['cik'] for t in selected)
+                done += 1
+                if done % 100 == 0:
+                    conn.commit()
+        conn.commit()
+        metrics.count('insider.form4_documents', done)
+        metrics.count('insider.form4_transactions', parsed)
+        print(f"  ✓ 新 Form 4 文件 {done}/{len(pending)} 个, 交易 {parsed} 笔, "
+              f"其中 {kept} 笔不少于 {min_shares:,.0f} 股 "
+              f"({other} 笔属于申报公司以外的发行人), 耗时 {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"  ⚠ Form 4 解析失败: {e}")
+
+    store_empty = not edgar_store.count_form4(conn)
+    if not store_empty:
+        insider_trades = [{
+            "ticker": t['ticker'],
+            "insider_name": t['insider_name'],
+            "relation": t['relation'],
+            "transaction_type": t['transaction_type'],
+            "shares": t['shares'],
+            "latest_trans_date": t['transaction_date'],
+            "price": t['price'],
+            "shares_after": t['shares_after'],
+            "derivative": bool(t['derivative']),
+            "accession": t['accession'],
+        } for t in edgar_store.query_form4(conn, tickers=tickers, since=since)]
+        for ticker in sorted({t['ticker'] for t in insider_trades})[:20]:
+            print(f"  ✓ {ticker}: {sum(t['ticker'] == ticker for t in insider_trades)} 笔内幕交易")
+    conn.close()
+
+    if store_empty:
+        print("  ⚠ Form 4 数据库为空，使用模拟数据")
+        # 使用模拟数据
+        insider_trades = [
+            {
+                "ticker": "NVDA",
+                "insider_name": "Jensen Huang",
+                "relation": "CEO",
+                "transaction_type": "Sale",
+                "shares": 100000,
+                "latest_trans_date": "2026-01-10"
+            },
+            {
+                "ticker": "AAPL",
+                "insider_name": "Tim Cook",
+                "relation": "CEO",
+                "transaction_type": "Sale",
+                "shares": 50000,
+                "latest_trans_date": "2026-01-08"
+            }
+        ]
+
+    metrics.count('insider.records', len(insider_trades))
+
+    # 保存数据
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "trades": insider_trades,
+        "total_count": len(insider_trades)
+    }
+
+    artifacts.save(OUTPUT_PATH, output)
+    print(f"\n✓ 内幕交易数据已保存: {len(insider_trades)} 条记录")
+    return output
+
+
+if __name__ == '__main__':
+    collect()
@@ -2,61 +2,37 @@
 """
 市场数据收集脚本
 使用 Yahoo Finance API 获取股票市场数据
+
+默认使用批量模式: 行情 (OHLCV) 按块批量下载, 基本面信息使用有界线程池并发获取。
+设置 MARKET_FETCH_MODE=serial 可回退到逐只股票获取的旧路径。
+
+日线行情持久化在 trades/data/store/prices/ 中 (见 price_store.py):
+首次运行回填历史, 之后只下载缺失的日线; 重叠日线的收盘价与已存的不一致时 (拆股或分红后
+Yahoo 重新复权了全部历史) 删除分区并整段回填。技术指标 (见 indicators.py)
+基于价格库对整个监控列表一次性计算, 写入每只股票的 technicals 字段。
 """
 
-import json
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
-import yfinance as yf
+import artifacts
+import indicators
+import metrics
+import price_store
+from settings import load_watchlist
 
-# 确保目录存在
-os.makedirs('trades/data', exist_ok=True)
-
-# 读取watchlist
-try:
-    with open('trades/config/watchlist.json', 'r') as f:
-        watchlist = json.load(f)
-except FileNotFoundError:
-    watchlist = {
-        "tickers": ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "AMD", "NFLX", "CRM"]
-    }
+OUTPUT_PATH = 'trades/data/market_snapshot.json'
 
-print(f"📊 收集市场数据: {len(watchlist.get('tickers', []))} 只股票")
+# 技术指标所需的历史长度 (日历日)
+INDICATOR_LOOKBACK_DAYS = 400
 
-# 获取市场数据
-market_data = {}
-for ticker in watchlist.get('tickers', []):
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        hist = stock.history(period="5d")
-        
-        market_data[ticker] = {
-            "name": info.get('longName', info.get('shortName', ticker)),
-            "price": info.get('currentPrice', info.get('regularMarketPrice', 'N/A')),
-            "previous_close": info.get('previousClose', 'N/A'),
-            "change_percent": info.get('regularMarketChangePercent', 'N/A'),
-            "volume": info.get('volume', 'N/A'),
-            "avg_volume": info.get('averageVolume', 'N/A'),
-            "market_cap": info.get('marketCap', 'N/A'),
-            "pe_ratio": info.get('trailingPE', 'N/A'),
-            "forward_pe": info.get('forwardPE', 'N/A'),
-            "52w_high": info.get('fiftyTwoWeekHigh', 'N/A'),
-            "52w_low": info.get('fiftyTwoWeekLow', 'N/A'),
-            "50d_avg": info.get('fiftyDayAverage', 'N/A'),
-            "200d_avg": info.get('twoHundredDayAverage', 'N/A'),
-            "sector": info.get('sector', 'N/A'),
-            "industry": info.get('industry', 'N/A'),
-            "recent_prices": hist['Close'].tolist()[-5:] if not hist.empty else [],
-            "recent_volumes": hist['Volume'].tolist()[-5:] if not hist.empty else []
-        }
-        print(f"  ✓ {ticker}: ${market_data[ticker]['price']}")
-    except Exception as e:
-        market_data[ticker] = {"error": str(e)}
-        print(f"  ✗ {ticker}: {e}")
+# 获取模式与批量参数
+FETCH_MODE = os.environ.get('MARKET_FETCH_MODE', 'batch')
+CHUNK_SIZE = int(os.environ.get('MARKET_CHUNK_SIZE', '100'))
+INFO_WORKERS = int(os.environ.get('MARKET_INFO_WORKERS', '8'))
 
-# 获取主要指数
+# 主要指数
 indices = {
     "^GSPC": "S&P 500",
     "^DJI": "Dow Jones",
@@ -64,27 +40,260 @@ indices = {
     "^VIX": "VIX"
 }
 
-index_data = {}
-for symbol, name in indices.items():
+DEFAULT_WATCHLIST = {
+    "tickers": ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "AMD", "NFLX", "CRM"]
+}
+
+
+def build_ticker_entry(ticker, info, hist):
+    """由 info 字典和历史行情组装 market_snapshot.json 中的单只股票记录"""
+    return {
+        "name": info.get('longName', info.get('shortName', ticker)),
+        "price": info.get('currentPrice', info.get('regularMarketPrice', 'N/A')),
+        "previous_close": info.get('previousClose', 'N/A'),
+        "change_percent": info.get('regularMarketChangePercent', 'N/A'),
+        "volume": info.get('volume', 'N/A'),
+        "avg_volume": info.get('averageVolume', 'N/A'),
+        "market_cap": info.get('marketCap', 'N/A'),
+        "pe_ratio": info.get('trailingPE', 'N/A'),
+        "forward_pe": info.get('forwardPE', 'N/A'),
+        "52w_high": info.get('fiftyTwoWeekHigh', 'N/A'),
+        "52w_low": info.get('fiftyTwoWeekLow', 'N/A'),
+        "50d_avg": info.get('fiftyDayAverage', 'N/A'),
+        "200d_avg": info.get('twoHundredDayAverage', 'N/A'),
+        "sector": info.get('sector', 'N/A'),
+        "industry": info.get('industry', 'N/A'),
+        "recent_prices": hist['Close'].tolist()[-5:] if hist is not None and not hist.empty else [],
+        "recent_volumes": hist['Volume'].tolist()[-5:] if hist is not None and not hist.empty else []
+    }
+
+
+def download_history_chunked(symbols, **window):
+    """按块批量下载多只股票的日线行情, 返回 {symbol: DataFrame}
+
+    window 为 yf.download 的时间参数 (period=... 或 start=...)
+    """
+    history = {}
+    chunks = [symbols[i:i + CHUNK_SIZE] for i in range(0, len(symbols), CHUNK_SIZE)]
+    for n, chunk in enumerate(chunks, 1):
+        started = time.perf_counter()
+        metrics.count('market.download_requests')
+        try:
+            with metrics.span('market.download_chunk', label=f"{n}/{len(chunks)}"):
+                import yfinance as yf
+                frame = yf.download(
+                    chunk,
+                    interval="1d",
+                    group_by="ticker",
+                    auto_adjust=True,
+                    threads=True,
+                    progress=False,
+                    multi_level_index=True,
+                    **window
+                )
+        except Exception as e:
+            print(f"  ✗ 行情块 {n}/{len(chunks)} 下载失败: {e}")
+            continue
+
+        for symbol in chunk:
+            if frame is None or frame.empty or symbol not in frame.columns.get_level_values(0):
+                continue
+            hist = frame[symbol].dropna(subset=['Close'])
+            if not hist.empty:
+                history[symbol] = hist
+
+        elapsed = time.perf_counter() - started
+        print(f"  ⏱ 行情块 {n}/{len(chunks)}: {len(chunk)} 个代码, "
+              f"{sum(1 for s in chunk if s in history)} 个有效, 耗时 {elapsed:.2f}s")
+    return history
+
+
+def update_price_store(symbols):
+    """按下载窗口分组, 批量下载各组缺失的日线并写入价格库"""
+    groups = {}
+    for symbol in symbols:
+        window = price_store.fetch_window(symbol)
+        groups.setdefault(tuple(sorted(window.items())), []).append(symbol)
+
+    added = 0
+    rebased = []
+    for window, group in groups.items():
+        print(f"  📥 下载行情 {dict(window)}: {len(group)} 个代码")
+        for symbol, hist in download_history_chunked(group, **dict(window)).items():
+            if price_store.rebased(symbol, hist):
+                rebased.append(symbol)
+                continue
+            added += price_store.upsert_bars(symbol, hist)
+
+    # 拆股/分红后已存日线的复权基准过时, 删除分区后整段回填
+    if rebased:
+        print(f"  ↻ 复权基准变化, 重新回填 {len(rebased)} 个代码: {', '.join(rebased[:20])}")
+        for symbol in rebased:
+            price_store.remove(symbol)
+        for symbol, hist in download_history_chunked(rebased, period=price_store.BACKFILL_PERIOD).items():
+            added += price_store.upsert_bars(symbol, hist)
+    metrics.count('market.rebased', len(rebased))
+    metrics.count('market.bars_added', added)
+    print(f"  ✓ 价格库新增 {added} 根日线")
+
+
+def store_history(symbol, history):
+    """serial 模式: history(**窗口参数) 下载日线写入价格库, 复权基准变化时整段回填"""
+    hist = history(**price_store.fetch_window(symbol))
+    if price_store.rebased(symbol, hist):
+        print(f"  ↻ {symbol}: 复权基准变化, 重新回填")
+        price_store.remove(symbol)
+        hist = history(period=price_store.BACKFILL_PERIOD)
+    price_store.upsert_bars(symbol, hist)
+
+
+def recent_history(symbol, n=5):
+    """从价格库读取最近 n 根日线"""
+    bars = price_store.load_bars(symbol)[-n:]
+    return price_store.bars_to_frame(bars) if len(bars) else None
+
+
+def compute_technicals(symbols, spike_multiplier):
+    """从价格库读取 (日期 × 股票) 矩阵, 一次计算所有股票的技术指标"""
+    started = time.perf_counter()
+    start = (datetime.now() - timedelta(days=INDICATOR_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    with metrics.span('market.load_matrix'):
+        matrices = price_store.load_matrix(symbols, start=start, fields=('high', 'low', 'close', 'volume'))
+    with metrics.span('market.indicators'):
+        values = indicators.compute_indicators(
+            matrices['close'], matrices['high'], matrices['low'], matrices['volume'], spike_multiplier
+        )
+        technicals = indicators.latest_values(values)
+    print(f"  ⏱ 技术指标: {matrices['close'].shape[1]} 个代码 × {matrices['close'].shape[0]} 个交易日, "
+          f"耗时 {time.perf_counter() - started:.2f}s")
+    return technicals
+
+
+def fetch_info(ticker):
+    import yfinance as yf
+    metrics.count('market.info_requests')
     try:
-        idx = yf.Ticker(symbol)
-        info = idx.info
-        index_data[name] = {
-            "price": info.get('regularMarketPrice', 'N/A'),
-            "change_percent": info.get('regularMarketChangePercent', 'N/A')
-        }
-        print(f"  ✓ {name}: {index_data[name]['price']}")
+        with metrics.span('market.info', label=ticker):
+            return ticker, yf.Ticker(ticker).info, None
     except Exception as e:
-        index_data[name] = {"error": str(e)}
+        return ticker, None, e
 
-# 保存数据
-output = {
-    "timestamp": datetime.now().isoformat(),
-    "market_data": market_data,
-    "indices": index_data
-}
 
-with open('trades/data/market_snapshot.json', 'w') as f:
-    json.dump(output, f, indent=2)
+def fetch_infos_concurrently(symbols):
+    """使用有界线程池并发获取基本面信息, 返回 {symbol: info 或 Exception}"""
+    started = time.perf_counter()
+    results = {}
+    with metrics.ContextThreadPool(max_workers=INFO_WORKERS) as pool:
+        for ticker, info, error in pool.map(fetch_info, symbols):
+            results[ticker] = info if error is None else error
+    elapsed = time.perf_counter() - started
+    print(f"  ⏱ 基本面信息: {len(symbols)} 个代码, {INFO_WORKERS} 个并发, 耗时 {elapsed:.2f}s")
+    return results
+
+
+def index_entry_from_history(hist):
+    """由最近两根日线计算指数的价格与涨跌幅, 省去逐个指数的 info 请求"""
+    closes = hist['Close'].tolist()
+    entry = {"price": closes[-1], "change_percent": 'N/A'}
+    if len(closes) >= 2 and closes[-2]:
+        entry["change_percent"] = (closes[-1] / closes[-2] - 1) * 100
+    return entry
+
+
+def collect_serial(tickers):
+    """逐只股票获取市场数据, 返回 (market_data, index_data)"""
+    import yfinance as yf
+    market_data, index_data = {}, {}
+    for ticker in tickers:
+        try:
+            with metrics.span('market.ticker', label=ticker):
+                stock = yf.Ticker(ticker)
+                info = stock.info
+                store_history(ticker, stock.history)
+
+            market_data[ticker] = build_ticker_entry(ticker, info, recent_history(ticker))
+            print(f"  ✓ {ticker}: ${market_data[ticker]['price']}")
+        except Exception as e:
+            market_data[ticker] = {"error": str(e)}
+            print(f"  ✗ {ticker}: {e}")
+
+    # 获取主要指数
+    for symbol, name in indices.items():
+        try:
+            idx = yf.Ticker(symbol)
+            info = idx.info
+            store_history(symbol, idx.history)
+            index_data[name] = {
+                "price": info.get('regularMarketPrice', 'N/A'),
+                "change_percent": info.get('regularMarketChangePercent', 'N/A')
+            }
+            print(f"  ✓ {name}: {index_data[name]['price']}")
+        except Exception as e:
+            index_data[name] = {"error": str(e)}
+    return market_data, index_data
+
+
+def collect_batch(tickers):
+    """批量模式: 股票与指数在同一批行情请求中获取, 只下载价格库中缺失的日线"""
+    market_data, index_data = {}, {}
+    update_price_store(tickers + list(indices))
+    history = {symbol: recent_history(symbol) for symbol in tickers + list(indices)}
+    history = {symbol: hist for symbol, hist in history.items() if hist is not None}
+    infos = fetch_infos_concurrently(tickers)
+
+    for ticker in tickers:
+        info = infos.get(ticker)
+        if isinstance(info, Exception) or info is None:
+            market_data[ticker] = {"error": str(info)}
+            print(f"  ✗ {ticker}: {info}")
+            continue
+        market_data[ticker] = build_ticker_entry(ticker, info, history.get(ticker))
+        print(f"  ✓ {ticker}: ${market_data[ticker]['price']}")
+
+    for symbol, name in indices.items():
+        if symbol in history:
+            index_data[name] = index_entry_from_history(history[symbol])
+            print(f"  ✓ {name}: {index_data[name]['price']}")
+        else:
+            index_data[name] = {"error": f"no data for {symbol}"}
+    return market_data, index_data
+
+
+def collect(watchlist=None):
+    """收集监控列表的行情、基本面与技术指标, 返回 market_snapshot.json 的内容"""
+    watchlist = watchlist or load_watchlist() or DEFAULT_WATCHLIST
+    tickers = watchlist.get('tickers', [])
+    print(f"📊 收集市场数据: {len(tickers)} 只股票 ({FETCH_MODE} 模式)")
+
+    if FETCH_MODE == 'serial':
+        market_data, index_data = collect_serial(tickers)
+    else:
+        market_data, index_data = collect_batch(tickers)
+
+    # 计算技术指标并标记成交量异动
+    spike_multiplier = watchlist.get('alert_thresholds', {}).get('volume_spike_multiplier', 2.0)
+    try:
+        for ticker, values in compute_technicals(tickers, spike_multiplier).items():
+            if ticker in market_data and 'error' not in market_data[ticker]:
+                market_data[ticker]['technicals'] = values
+                if values.get('volume_spike'):
+                    print(f"  🔔 {ticker}: 成交量异动 ({values['volume_ratio']}x 均量)")
+    except Exception as e:
+        print(f"  ⚠ 技术指标计算失败: {e}")
+
+    metrics.count('market.tickers_ok', sum(1 for d in market_data.values() if 'error' not in d))
+    metrics.count('market.tickers_failed', sum(1 for d in market_data.values() if 'error' in d))
+
+    # 保存数据
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "market_data": market_data,
+        "indices": index_data
+    }
+    artifacts.save(OUTPUT_PATH, output)
+    print(f"\n✓ 市场数据已保存到 {OUTPUT_PATH}")
+    return output
+
 
-print(f"\n✓ 市场数据已保存到 trades/data/market_snapshot.json")
+if __name__ == '__main__':
+    collect()
@@ -2,46 +2,170 @@
 """
 Polymarket 预测市场数据收集脚本
 获取与金融/经济相关的预测市场赔率
+
+分页遍历全部活跃市场 (每轮并发请求多页, 直到某页不足一整页), 再用一个预编译的正则
+在单次扫描中按关键词 (内置金融关键词 + watchlist.json 的 keywords) 与股票代码筛选。
+每次运行的概率追加到 polymarket_store, 输出中附带 1 日概率变化最大的市场 (movers)。
 """
 
-import json
+import math
 import os
+import re
+import time
 from datetime import datetime
 
-import requests
+import artifacts
+import http_cache
+import metrics
+from settings import load_watchlist
+
+OUTPUT_PATH = 'trades/data/polymarket.json'
 
-os.makedirs('trades/data', exist_ok=True)
+# Polymarket Gamma API
+GAMMA_API = os.environ.get('POLYMARKET_GAMMA_API', "https://gamma-api.polymarket.com")
+MOVERS_LIMIT = int(os.environ.get('POLYMARKET_MOVERS', '10'))
+PAGE_SIZE = int(os.environ.get('POLYMARKET_PAGE_SIZE', '500'))
+PAGE_WORKERS = int(os.environ.get('POLYMARKET_WORKERS', '8'))
+MAX_PAGES = int(os.environ.get('POLYMARKET_MAX_PAGES', '200'))
 
-print("🎰 收集Polymarket预测市场数据...")
+FINANCIAL_KEYWORDS = [
+    'fed', 'rate', 'inflation', 'recession', 'gdp', 'stock',
+    'bitcoin', 'crypto', 'market', 'economy', 'tariff', 'trade'
+]
 
-polymarket_data = []
 
-# Polymarket Gamma API
-GAMMA_API = "https://gamma-api.polymarket.com"
+def build_matcher(keywords, tickers):
+    """把关键词与股票代码编译为一个正则
 
-try:
-    # 获取活跃市场
-    response = requests.get(
+    关键词不区分大小写, 只要求词首边界 (rate 匹配 rates, 但不匹配 corporate);
+    股票代码区分大小写并要求完整单词, 避免 META/AMD 等误匹配普通单词。
+    """
+    words = sorted({k.strip().lower() for k in keywords if k.strip()}, key=len, reverse=True)
+    symbols = sorted({t.strip().upper() for t in tickers if t.strip()}, key=len, reverse=True)
+    alternatives = []
+    if words:
+        alternatives.append(r'(?i:\b(?:' + '|'.join(re.escape(w).replace(r'\ ', r'\s+') for w in words) + '))')
+    if symbols:
+        alternatives.append(r'\$?\b(?:' + '|'.join(re.escape(t) for t in symbols) + r')\b')
+    return re.compile('|'.join(alternatives) or r'(?!)')
+
+
+def fetch_page(offset):
+    response = http_cache.get(
         f"{GAMMA_API}/markets",
-        params={
-            "active": "true",
-            "limit": 50
-        },
-        timeout=10
+        params={"active": "true", "closed": "false", "limit": PAGE_SIZE, "offset": offset},
+        source="polymarket",
+        timeout=15
     )
-    
-    if response.status_code == 200:
-        markets = response.json()
-        
-        # 过滤金融/经济相关市场
-        financial_keywords = [
-            'fed', 'rate', 'inflation', 'recession', 'gdp', 'stock', 
-            'bitcoin', 'crypto', 'market', 'economy', 'tariff', 'trade'
+    if response.status_code != 200:
+        raise RuntimeError(f"offset={offset} 返回状态码 {response.status_code}")
+    metrics.count('polymarket.pages')
+    return response.json()
+
+
+def fetch_all_markets():
+    """每轮并发请求 PAGE_WORKERS 页, 出现不足一整页的页面即停止
+
+    某页请求失败时保留已获取的页面并停止翻页; 一页都没有获取到时抛出该错误。
+    """
+    markets = {}
+    offset = 0
+    error = None
+    with metrics.ContextThreadPool(max_workers=PAGE_WORKERS) as pool:
+        while error is None and offset < MAX_PAGES * PAGE_SIZE:
+            offsets = [offset + i * PAGE_SIZE for i in range(PAGE_WORKERS)]
+            futures = [pool.submit(fetch_page, page_offset) for page_offset in offsets]
+            pages = []
+            for page_offset, future in zip(offsets, futures):
+                try:
+                    pages.append(future.result())
+                except Exception as e:
+                    error = e
+                    metrics.count('polymarket.page_errors')
+                    print(f"  ⚠ Polymarket 分页获取失败 (offset={page_offset}): {e}")
+            for page in pages:
+                for market in page:
+                    markets.setdefault(market.get('id'), market)
+            offset = offsets[-1] + PAGE_SIZE
+            if any(len(page) < PAGE_SIZE for page in pages):
+                break
+    if error is not None and not markets:
+        raise error
+    return list(markets.values())
+
+
+def update_store(polymarket_data):
+    """追加到时间序列存储, 返回概率变化最大的市场; 存储或查询失败时只记录警告"""
+    try:
+        with metrics.span('polymarket.store'):
+            # 存储依赖 numpy/pandas, 只在需要时导入
+            import polymarket_store
+            polymarket_store.append_snapshot(polymarket_data)
+            frame = polymarket_store.top_movers(days=1, limit=MOVERS_LIMIT)
+        movers = [{
+            "id": market_id,
+            "question": row['question'],
+            "price": round(row['price'], 4),
+            "change_1d": round(row['change'], 4),
+            "change_7d": None if math.isnan(row['change_7d']) else round(row['change_7d'], 4),
+            "volume": row['volume'],
+            "since": str(row['base_at']),
+        } for market_id, row in frame.iterrows()]
+    except Exception as e:
+        print(f"  ⚠ Polymarket 时间序列存储失败: {e}")
+        return []
+    for mover in movers:
+        print(f"  📈 {mover['change_1d']:+.1%} {(mover['question'] or '')[:60]}")
+    return movers
+
+
+def collect(watchlist=None):
+    """获取并筛选活跃市场, 返回 polymarket.json 的内容"""
+    print("🎰 收集Polymarket预测市场数据...")
+    # watchlist 中的关键词与股票代码
+    watchlist = watchlist or load_watchlist() or {}
+    polymarket_data = []
+    movers = []
+
+    matcher = build_matcher(FINANCIAL_KEYWORDS + watchlist.get('keywords', []), watchlist.get('tickers', []))
+
+    try:
+        # 获取全部活跃市场
+        started = time.perf_counter()
+        with metrics.span('polymarket.fetch'):
+            markets = fetch_all_markets()
+        print(f"  ⏱ 获取 {len(markets)} 个活跃市场, 耗时 {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"  ⚠ Polymarket API 获取失败: {e}")
+        markets = None
+
+    if markets is None:
+        # 使用模拟数据
+        polymarket_data = [
+            {
+                "id": "sample-1",
+                "question": "Will the Fed cut rates in Q1 2026?",
+                "outcome_prices": {"Yes": 0.65, "No": 0.35},
+                "volume": 1500000,
+                "liquidity": 500000,
+                "category": "Economics"
+            },
+            {
+                "id": "sample-2",
+                "question": "Will Bitcoin reach $150k by end of 2026?",
+                "outcome_prices": {"Yes": 0.42, "No": 0.58},
+                "volume": 3200000,
+                "liquidity": 800000,
+                "category": "Crypto"
+            }
         ]
-        
+    else:
+        # 单次扫描筛选金融/经济与监控列表相关市场
+        started = time.perf_counter()
         for market in markets:
-            question = market.get('question', '').lower()
-            if any(keyword in question for keyword in financial_keywords):
+            question = market.get('question') or ''
+            matched = matcher.findall(question)
+            if matched:
                 polymarket_data.append({
                     "id": market.get('id'),
                     "question": market.get('question'),
@@ -49,44 +173,36 @@ try:
                     "volume": market.get('volume', 0),
                     "liquidity": market.get('liquidity', 0),
                     "end_date": market.get('endDate'),
-                    "category": market.get('category', 'Unknown')
+                    "category": market.get('category', 'Unknown'),
+                    "matched": sorted({m.lower().lstrip('$') for m in matched}),
                 })
-                print(f"  ✓ {market.get('question', '')[:60]}...")
-        
+        print(f"  ⏱ 关键词匹配 {len(markets)} 个市场, 耗时 {time.perf_counter() - started:.3f}s")
+        metrics.count('polymarket.scanned', len(markets))
+
+        # 按成交量降序保存, 提示词按预算截断时保留最活跃的市场
+        polymarket_data.sort(key=lambda m: -float(m.get('volume') or 0))
+        for market in polymarket_data[:10]:
+            print(f"  ✓ {(market['question'] or '')[:60]}...")
+
         print(f"\n  找到 {len(polymarket_data)} 个金融相关市场")
-    else:
-        print(f"  ⚠ Polymarket API 返回状态码: {response.status_code}")
-        
-except Exception as e:
-    print(f"  ⚠ Polymarket API 获取失败: {e}")
-    # 使用模拟数据
-    polymarket_data = [
-        {
-            "id": "sample-1",
-            "question": "Will the Fed cut rates in Q1 2026?",
-            "outcome_prices": {"Yes": 0.65, "No": 0.35},
-            "volume": 1500000,
-            "liquidity": 500000,
-            "category": "Economics"
-        },
-        {
-            "id": "sample-2",
-            "question": "Will Bitcoin reach $150k by end of 2026?",
-            "outcome_prices": {"Yes": 0.42, "No": 0.58},
-            "volume": 3200000,
-            "liquidity": 800000,
-            "category": "Crypto"
-        }
-    ]
-
-# 保存数据
-output = {
-    "timestamp": datetime.now().isoformat(),
-    "markets": polymarket_data,
-    "total_count": len(polymarket_data)
-}
-
-with open('trades/data/polymarket.json', 'w') as f:
-    json.dump(output, f, indent=2)
-
-print(f"\n✓ Polymarket数据已保存: {len(polymarket_data)} 个市场")
+
+        # 追加到时间序列存储, 并计算概率变化最大的市场
+        movers = update_store(polymarket_data)
+
+    metrics.count('polymarket.records', len(polymarket_data))
+
+    # 保存数据
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "markets": polymarket_data,
+        "movers": movers,
+        "total_count": len(polymarket_data)
+    }
+
+    artifacts.save(OUTPUT_PATH, output)
+    print(f"\n✓ Polymarket数据已保存: {len(polymarket_data)} 个市场")
+    return output
+
+
+if __name__ == '__main__':
+    collect()
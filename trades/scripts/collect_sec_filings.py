@@ -2,84 +2,169 @@
 """
 SEC 文件收集脚本
 获取 10-K, 10-Q, 8-K 等重要披露文件
+
+直接请求 SEC EDGAR (见 edgar.py): 按股票代码 → CIK 映射并发获取监控列表的
+submissions JSON, 总速率受令牌桶限制; 每家公司只写入上次见到的 accession 之后的新文件
+(edgar_store), 再从数据库中输出最近 SEC_LOOKBACK_DAYS 天的披露文件 (FORMS; Form 4 由内幕交易
+阶段处理, 不在此输出)。数据库为空时使用示例数据。
+有上次扫描日期时先读取其后的每日索引, 只请求期间提交过文件的公司。
 """
 
-import json
 import os
-import sys
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+import artifacts
+import edgar
+import edgar_store
+import metrics
+from settings import load_settings, load_watchlist
+
+OUTPUT_PATH = 'trades/data/sec_filings.json'
+
+_settings = load_settings('edgar')
+LOOKBACK_DAYS = int(os.environ.get('SEC_LOOKBACK_DAYS', _settings.get('lookback_days', 30)))
+PER_TICKER = int(_settings.get('filings_per_ticker', 10))
+MAX_INDEX_DAYS = int(_settings.get('max_index_days', 30))
+# 输出的表格类型; Form 4 数量远多于其他文件, 不排除会占满每只股票的名额
+FORMS = tuple(_settings.get('forms', [
+    "10-K", "10-K/A", "10-Q", "10-Q/A", "8-K", "8-K/A", "20-F", "6-K",
+    "S-1", "DEF 14A", "SC 13D", "SC 13D/A", "SC 13G", "SC 13G/A",
+]))
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOGL", "NVDA", "TSLA"]
+
 
-os.makedirs('trades/data', exist_ok=True)
+def fetch_new(ticker, cik, last_accession, since=None):
+    """返回 (代码, CIK, 新文件列表, 最新 accession, 错误)"""
+    try:
+        with metrics.span('sec.ticker', label=ticker):
+            data = edgar.submissions(cik)
+        filings = edgar.new_filings(data, ticker, last_accession, since)
+        latest = (data.get('filings', {}).get('recent', {}).get('accessionNumber') or [last_accession])[0]
+        return ticker, cik, filings, latest, None
+    except Exception as e:
+        return ticker, cik, [], last_accession, e
 
-print("📄 收集SEC文件...")
 
-# 读取watchlist
-try:
-    with open('trades/config/watchlist.json', 'r') as f:
-        watchlist = json.load(f)
+def changed_ciks(last_scan):
+    """上次扫描日 (含前一天, 覆盖当晚才发布的索引) 至今每日索引中出现的 CIK; 无法确定时返回 None (全量扫描)"""
+    if not last_scan:
+        return None
+    start = datetime.strptime(last_scan, '%Y-%m-%d') - timedelta(days=1)
+    days = (datetime.now() - start).days
+    if days > MAX_INDEX_DAYS:
+        return None
+    ciks = set()
+    try:
+        with metrics.span('sec.daily_index'):
+            for offset in range(days + 1):
+                ciks |= edgar.daily_index_ciks(start + timedelta(days=offset)) or set()
+    except Exception as e:
+        print(f"  ⚠ 每日索引获取失败, 改为全量扫描: {e}")
+        return None
+    return ciks
+
+
+def collect(watchlist=None):
+    """写入新的 SEC 文件, 返回 sec_filings.json 的内容"""
+    print("📄 收集SEC文件...")
+    watchlist = watchlist or load_watchlist() or {"tickers": DEFAULT_TICKERS}
     tickers = watchlist.get('tickers', [])
-except:
-    tickers = ["AAPL", "MSFT", "GOOGL", "NVDA", "TSLA"]
-
-sec_filings = []
-
-# 尝试使用 Manus API 获取SEC文件
-try:
-    sys.path.append('/opt/.manus/.sandbox-runtime')
-    from data_api import ApiClient
-    
-    client = ApiClient()
-    
-    for ticker in tickers[:5]:  # 限制请求数量
-        try:
-            response = client.call_api('YahooFinance/get_stock_sec_filing', query={
-                'symbol': ticker,
-                'region': 'US',
-                'lang': 'en-US'
-            })
-            
-            if response:
-                filings = response.get('filings', [])
-                for filing in filings[:3]:  # 每只股票取最近3个文件
-                    sec_filings.append({
-                        "ticker": ticker,
-                        "type": filing.get('type', 'Unknown'),
-                        "title": filing.get('title', 'Unknown'),
-                        "date": filing.get('date', 'Unknown'),
-                        "url": filing.get('edgarUrl', '')
-                    })
-                print(f"  ✓ {ticker}: {len(filings)} 个SEC文件")
-        except Exception as e:
-            print(f"  ⚠ {ticker}: {e}")
-            
-except ImportError:
-    print("  ⚠ Manus API 不可用，使用模拟数据")
-    # 使用模拟数据
-    sec_filings = [
-        {
-            "ticker": "AAPL",
-            "type": "10-K",
-            "title": "Annual Report",
-            "date": "2025-10-30",
-            "url": "https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK=0000320193"
-        },
-        {
-            "ticker": "NVDA",
-            "type": "8-K",
-            "title": "Current Report",
-            "date": "2026-01-05",
-            "url": "https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK=0001045810"
-        }
-    ]
-
-# 保存数据
-output = {
-    "timestamp": datetime.now().isoformat(),
-    "filings": sec_filings,
-    "total_count": len(sec_filings)
-}
-
-with open('trades/data/sec_filings.json', 'w') as f:
-    json.dump(output, f, indent=2)
-
-print(f"\n✓ SEC文件数据已保存: {len(sec_filings)} 条记录")
+    sec_filings = []
+    since = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+
+    conn = edgar_store.connect()
+    try:
+        # EDGAR 的代码以 '-' 代替 '.' (如 BRK-B)
+        ciks = edgar.cik_map()
+        known = [(t, ciks[t.upper().replace('.', '-')]) for t in tickers if t.upper().replace('.', '-') in ciks]
+        missing = [t for t in tickers if t.upper().replace('.', '-') not in ciks]
+        if missing:
+            print(f"  ⚠ 找不到 CIK: {', '.join(missing[:20])}{' ...' if len(missing) > 20 else ''}")
+
+        cursors = edgar_store.cursors(conn)
+        started = time.perf_counter()
+        targets = known
+        changed = changed_ciks(edgar_store.get_meta(conn, 'last_scan'))
+        if changed is not None:
+            targets = [(t, cik) for t, cik in known if cik in changed or cik not in cursors]
+            print(f"  ✓ 每日索引: {len(targets)}/{len(known)} 家公司有新文件或尚未扫描")
+
+        added = 0
+        done = 0
+        failed = False
+        with metrics.ContextThreadPool(max_workers=edgar.WORKERS) as pool:
+            results = pool.map(lambda item: fetch_new(item[0], item[1], cursors.get(item[1]), since), targets)
+            for ticker, cik, filings, latest, error in results:
+                metrics.count('sec.api_requests')
+                if error is not None:
+                    metrics.count('sec.api_errors')
+                    print(f"  ⚠ {ticker}: {error}")
+                    failed = True
+                    continue
+                added += edgar_store.save_filings(conn, cik, filings, latest)
+                done += 1
+                # 分批提交: 首次回填被阶段超时中断时, 已完成的公司不必重新请求
+                if done % 100 == 0:
+                    conn.commit()
+        # 有公司获取失败时不推进扫描日期, 下次运行重新覆盖这段时间
+        if not failed:
+            edgar_store.set_meta(conn, 'last_scan', datetime.now().strftime('%Y-%m-%d'))
+        conn.commit()
+        metrics.count('sec.new_filings', added)
+        print(f"  ✓ {len(targets)} 家公司, 新文件 {added} 个, 耗时 {time.perf_counter() - started:.1f}s "
+              f"(限速 {edgar.REQUESTS_PER_SECOND:g} 次/秒)")
+    except Exception as e:
+        print(f"  ⚠ SEC EDGAR 获取失败: {e}")
+
+    store_empty = not edgar_store.count_filings(conn)
+    if not store_empty:
+        stored = edgar_store.query_filings(conn, tickers=tickers, forms=FORMS, since=since, per_ticker=PER_TICKER)
+        sec_filings = [{
+            "ticker": filing['ticker'],
+            "type": filing['form'],
+            "title": filing['description'],
+            "date": filing['filing_date'],
+            "url": filing['url'],
+            "accession": filing['accession'],
+        } for filing in stored]
+        for ticker in sorted({f['ticker'] for f in sec_filings})[:20]:
+            print(f"  ✓ {ticker}: {sum(f['ticker'] == ticker for f in sec_filings)} 个SEC文件")
+    conn.close()
+
+    if store_empty:
+        print("  ⚠ SEC 文件数据库为空，使用示例数据")
+        # 使用模拟数据
+        sec_filings = [
+            {
+                "ticker": "AAPL",
+                "type": "10-K",
+                "title": "Annual Report",
+                "date": "2025-10-30",
+                "url": "https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK=0000320193"
+            },
+            {
+                "ticker": "NVDA",
+                "type": "8-K",
+                "title": "Current Report",
+                "date": "2026-01-05",
+                "url": "https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK=0001045810"
+            }
+        ]
+
+    metrics.count('sec.records', len(sec_filings))
+
+    # 保存数据
+    output = {
+        "timestamp": datetime.now().isoformat(),
+        "filings": sec_filings,
+        "total_count": len(sec_filings)
+    }
+
+    artifacts.save(OUTPUT_PATH, output)
+    print(f"\n✓ SEC文件数据已保存: {len(sec_filings)} 条记录")
+    return output
+
+
+if __name__ == '__main__':
+    collect()
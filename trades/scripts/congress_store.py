@@ -0,0 +1,117 @@
+"""
+国会交易披露存储
+SQLite 数据库 (trades/data/store/congress.db), 保存已处理的披露文件与从中解析出的交易,
+交易按股票代码、议员与交易日期建立索引。filings 表同时记录每个文件的处理状态,
+收集脚本据此只处理新文件。
+"""
+
+import os
+import sqlite3
+
+DB_PATH = 'trades/data/store/congress.db'
+
+# 处理完成的状态; 其余状态 (no_parser / error) 在下次运行时重试
+DONE_STATUSES = ('indexed', 'parsed', 'no_text')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    doc_id TEXT PRIMARY KEY,
+    chamber TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    politician TEXT,
+    state_district TEXT,
+    filing_type TEXT,
+    filing_date TEXT,
+    status TEXT NOT NULL,
+    ingested_at TEXT DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS filings_year ON filings (chamber, year);
+
+CREATE TABLE IF NOT EXISTS trades (
+    doc_id TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    politician TEXT,
+    party TEXT,
+    state TEXT,
+    ticker TEXT,
+    asset_description TEXT,
+    transaction_type TEXT,
+    transaction_date TEXT,
+    disclosure_date TEXT,
+    amount_range TEXT,
+    owner TEXT,
+    PRIMARY KEY (doc_id, row)
+);
+CREATE INDEX IF NOT EXISTS trades_ticker ON trades (ticker, transaction_date);
+CREATE INDEX IF NOT EXISTS trades_politician ON trades (politician, transaction_date);
+CREATE INDEX IF NOT EXISTS trades_date ON trades (transaction_date);
+CREATE INDEX IF NOT EXISTS trades_disclosed ON trades (disclosure_date);
+"""
+
+TRADE_COLUMNS = ('politician', 'party', 'state', 'ticker', 'asset_description', 'transaction_type',
+                 'transaction_date', 'disclosure_date', 'amount_range', 'owner')
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def seen_ids(conn, chamber, year, statuses=DONE_STATUSES):
+    """状态属于 statuses 的文件编号 (默认为已处理完成的文件)"""
+    placeholders = ','.join('?' * len(statuses))
+    rows = conn.execute(f"SELECT doc_id FROM filings WHERE chamber = ? AND year = ? AND status IN ({placeholders})",
+                        (chamber, year, *statuses))
+    return {row['doc_id'] for row in rows}
+
+
+def save_filing(conn, filing, status, trades=()):
+    """写入 (或更新) 一个文件及其交易; 同一文件重复处理时先删除旧的交易行"""
+    conn.execute(
+        "INSERT OR REPLACE INTO filings (doc_id, chamber, year, politician, state_district, filing_type, "
+        "filing_date, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (filing['doc_id'], filing['chamber'], filing['year'], filing['politician'], filing['state_district'],
+         filing['filing_type'], filing['filing_date'], status),
+    )
+    conn.execute("DELETE FROM trades WHERE doc_id = ?", (filing['doc_id'],))
+    conn.executemany(
+        f"INSERT INTO trades (doc_id, row, {', '.join(TRADE_COLUMNS)}) "
+        f"VALUES (?, ?, {', '.join('?' * len(TRADE_COLUMNS))})",
+        [(filing['doc_id'], i, *(trade.get(column) for column in TRADE_COLUMNS)) for i, trade in enumerate(trades)],
+    )
+
+
+def count_filings(conn):
+    return conn.execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+
+
+def query_trades(conn, tickers=None, politicians=None, since=None, until=None, date_field='transaction_date',
+                 limit=None):
+    """按股票代码 / 议员 / 日期区间 (含端点, ISO 日期) 筛选交易, 按日期降序返回字典列表"""
+    if date_field not in ('transaction_date', 'disclosure_date'):
+        raise ValueError(f"未知的日期字段: {date_field}")
+    clauses, params = [], []
+    if tickers is not None:
+        tickers = list(tickers)
+        clauses.append(f"ticker IN ({','.join('?' * len(tickers))})")
+        params.extend(tickers)
+    if politicians is not None:
+        politicians = list(politicians)
+        clauses.append(f"politician IN ({','.join('?' * len(politicians))})")
+        params.extend(politicians)
+    if since:
+        clauses.append(f"{date_field} >= ?")
+        params.append(str(since))
+    if until:
+        clauses.append(f"{date_field} <= ?")
+        params.append(str(until))
+    sql = f"SELECT doc_id, {', '.join(TRADE_COLUMNS)} FROM trades"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {date_field} DESC, doc_id, row"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [dict(row) for row in conn.execute(sql, params)]
@@ -0,0 +1,209 @@
+"""
+深度分析 (map-reduce)
+ANALYSIS_DEPTH=deep 时, 先按股票 (监控列表较大时按板块) 拆分数据, 并发调用模型
+逐个分析 (map), 再把各分项摘要交给最终的简报调用合并 (reduce)。
+
+并发数由 DEEP_CONCURRENCY 限制, 单次调用失败按指数退避重试。总耗时取决于最慢的
+分片, 而不是监控列表的长度; 传入 timeout 时超时未完成的分片记为失败, 已完成的照常返回。FOCUS_TICKER 单独成片, 并使用更大的提示与输出预算。
+"""
+
+import asyncio
+import os
+import random
+import time
+
+import metrics
+from prompt_builder import (
+    PROMPT_TEMPLATE, SYSTEM_PROMPT,
+    backtest_coverage, backtest_rows, congress_rows, estimate_tokens, fit_rows, index_table, insider_rows,
+    market_rows, polymarket_table_rows, sec_rows, table_lines, technical_rows,
+)
+
+CONCURRENCY = int(os.environ.get('DEEP_CONCURRENCY', '8'))
+MAX_RETRIES = int(os.environ.get('DEEP_MAX_RETRIES', '3'))
+BACKOFF_SECONDS = 2.0
+SHARD_TIMEOUT = 120
+
+# 监控列表超过该数量时按板块分片, 避免请求数随股票数增长
+SECTOR_SHARD_THRESHOLD = 30
+
+# (提示预算, 输出 max_tokens)
+SHARD_BUDGET = (800, 600)
+FOCUS_BUDGET = (2500, 1500)
+REDUCE_BUDGET = 6000
+
+SHARD_PROMPT = """
+请分析以下{scope}的数据, 输出不超过 {words} 字的要点摘要, 供后续汇总成每日简报:
+
+- 关键信号 (价格/技术指标/国会交易/内幕交易/SEC 文件)
+- 评级 (BUY/HOLD/SELL/WATCH) 与置信度
+- 主要风险
+
+{sections}
+"""
+
+
+def build_shards(stocks, tickers, focus_ticker=None):
+    """返回 [{"name", "tickers", "focus"}]; 焦点股票总是单独成片"""
+    others = [t for t in tickers if t != focus_ticker]
+    shards = []
+    if focus_ticker:
+        shards.append({"name": focus_ticker, "tickers": [focus_ticker], "focus": True})
+    if len(others) <= SECTOR_SHARD_THRESHOLD:
+        shards.extend({"name": t, "tickers": [t], "focus": False} for t in others)
+        return shards
+
+    sectors = {}
+    for ticker in others:
+        sector = (stocks.get(ticker) or {}).get('sector') or '其他'
+        if sector == 'N/A':
+            sector = '其他'
+        sectors.setdefault(sector, []).append(ticker)
+    shards.extend({"name": sector, "tickers": group, "focus": False}
+                  for sector, group in sorted(sectors.items()))
+    return shards
+
+
+def shard_prompt(shard, market_data, congress_trades, insider_trades, sec_filings, budget):
+    """只包含本分片股票的数据, 各数据段平分预算"""
+    wanted = set(shard['tickers'])
+    focus = shard['tickers'][0] if shard['focus'] else None
+    stocks = {t: d for t, d in market_data.get('market_data', {}).items() if t in wanted}
+    tables = [
+        ("市场数据", market_rows(stocks, focus)),
+        ("技术信号", technical_rows(stocks, focus)),
+        ("国会交易", congress_rows([t for t in congress_trades.get('trades', []) if t.get('ticker') in wanted])),
+        ("内幕交易", insider_rows([t for t in insider_trades.get('trades', []) if t.get('ticker') in wanted])),
+        ("SEC文件", sec_rows([f for f in sec_filings.get('filings', []) if f.get('ticker') in wanted])),
+    ]
+    tables = [(title, columns_rows) for title, columns_rows in tables if columns_rows[1]]
+    share = budget / max(len(tables), 1)
+    sections = [f"## {title}\n{fit_rows(*table_lines(*columns_rows), share)[0]}" for title, columns_rows in tables]
+
+    scope = f"{shard['name']} 板块 ({', '.join(shard['tickers'])})" if len(wanted) > 1 else shard['name']
+    words = 600 if shard['focus'] else 250
+    return SHARD_PROMPT.format(scope=scope, words=words, sections='\n\n'.join(sections) or '暂无数据')
+
+
+def plan(market_data, congress_trades, insider_trades, sec_filings, watchlist, focus_ticker=None):
+    """返回 (分片列表, 各分片的提示); 分片提示即 map 阶段发给模型的完整内容"""
+    stocks = market_data.get('market_data', {})
+    tickers = list(watchlist.get('tickers', []))
+    if focus_ticker and focus_ticker not in tickers:
+        tickers.insert(0, focus_ticker)
+    shards = build_shards(stocks, tickers, focus_ticker)
+    prompts = [
+        shard_prompt(shard, market_data, congress_trades, insider_trades, sec_filings,
+                     (FOCUS_BUDGET if shard['focus'] else SHARD_BUDGET)[0])
+        for shard in shards
+    ]
+    return shards, prompts
+
+
+async def analyze_shard(client, semaphore, shard, prompt, model, max_tokens, temperature):
+    """带并发限制与指数退避重试的单个分片调用; 只在调用期间占用并发名额, 退避等待时释放"""
+    started = None
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                # 从首次获得名额开始计时, 不计排队时间
+                started = started or time.perf_counter()
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=SHARD_TIMEOUT,
+                )
+            return {"name": shard['name'], "summary": response.choices[0].message.content,
+                    "attempts": attempt, "latency": time.perf_counter() - started, "error": None}
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                return {"name": shard['name'], "summary": None, "attempts": attempt,
+                        "latency": time.perf_counter() - started, "error": str(e)}
+            metrics.count('deep.retries')
+            delay = BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            print(f"    ↻ {shard['name']}: 第 {attempt} 次调用失败 ({e}), {delay:.1f}s 后重试")
+            await asyncio.sleep(delay)
+
+
+async def _map(client, shards, prompts, model, temperature, timeout=None):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    started = time.perf_counter()
+
+    async def bounded(shard, prompt):
+        max_tokens = (FOCUS_BUDGET if shard['focus'] else SHARD_BUDGET)[1]
+        try:
+            return await asyncio.wait_for(
+                analyze_shard(client, semaphore, shard, prompt, model, max_tokens, temperature), timeout
+            )
+        except asyncio.TimeoutError:
+            return {"name": shard['name'], "summary": None, "attempts": None,
+                    "latency": time.perf_counter() - started, "error": f"超过截止时间 {timeout:.0f}s"}
+
+    try:
+        return await asyncio.gather(*(bounded(shard, prompt) for shard, prompt in zip(shards, prompts)))
+    finally:
+        await client.close()
+
+
+def map_analyses(client, market_data, congress_trades, insider_trades, sec_filings, watchlist,
+                 focus_ticker=None, model="deepseek-chat", temperature=0.7, timeout=None):
+    """并发分析每个分片, 返回按分片顺序排列的结果列表
+
+    client 为 openai.AsyncOpenAI 实例 (调用结束后关闭); timeout 为整个 map 阶段的时限 (秒)
+    """
+    shards, prompts = plan(market_data, congress_trades, insider_trades, sec_filings, watchlist, focus_ticker)
+
+    print(f"  🔀 深度分析: {len(shards)} 个分片, 并发 {CONCURRENCY}")
+    started = time.perf_counter()
+    results = asyncio.run(_map(client, shards, prompts, model, temperature, timeout))
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        metrics.record_span('deep.shard', result['latency'], label=result['name'])
+        if result['error'] is not None:
+            metrics.count('deep.shard_failures')
+        icon = '✓' if result['error'] is None else '✗'
+        detail = result['error'] or f"{result['attempts']} 次调用"
+        print(f"    {icon} {result['name']}: {result['latency']:.1f}s ({detail})")
+    slowest = max((r['latency'] for r in results), default=0)
+    print(f"  ⏱ map 阶段耗时 {elapsed:.1f}s (最慢分片 {slowest:.1f}s, "
+          f"串行合计 {sum(r['latency'] for r in results):.1f}s)")
+    return results
+
+
+def build_reduce_prompt(results, market_data, polymarket, watchlist, date_text, focus_ticker=None,
+                        budget=REDUCE_BUDGET, log=print, backtest=None):
+    """把各分片摘要合并进标准简报模板, 超出预算的摘要 (焦点股票除外) 按顺序舍弃"""
+    sections = [f"## 主要指数\n{index_table(market_data.get('indices', {}))}"]
+    polymarket_table = fit_rows(*table_lines(*polymarket_table_rows(polymarket)), budget * 0.1)[0]
+    sections.append(f"## Polymarket 预测市场\n{polymarket_table}")
+    if backtest and backtest.get('groups'):
+        backtest_table = fit_rows(*table_lines(*backtest_rows(backtest)), budget * 0.05)[0]
+        sections.append(f"## 信号回测\n{backtest_coverage(backtest)}\n{backtest_table}")
+
+    fixed = PROMPT_TEMPLATE.format(date=date_text, watchlist=', '.join(watchlist.get('tickers', [])),
+                                   sections='\n\n'.join(sections))
+    remaining = budget - estimate_tokens(fixed)
+    summaries = []
+    failed = []
+    for result in results:
+        if result['summary'] is None:
+            failed.append(result['name'])
+            continue
+        text = f"### {result['name']}{' (重点关注)' if result['name'] == focus_ticker else ''}\n{result['summary'].strip()}"
+        cost = estimate_tokens(text)
+        if cost > remaining and result['name'] != focus_ticker:
+            failed.append(result['name'])
+            continue
+        summaries.append(text)
+        remaining -= cost
+    if failed:
+        summaries.append(f"(以下分片未能纳入: {', '.join(failed)})")
+    sections.insert(1, "## 分项分析\n以下为各股票/板块的独立分析摘要, 请据此汇总:\n\n" + '\n\n'.join(summaries))
+
+    prompt = PROMPT_TEMPLATE.format(date=date_text, watchlist=', '.join(watchlist.get('tickers', [])),
+                                    sections='\n\n'.join(sections))
+    log(f"  📏 reduce 提示: ~{estimate_tokens(prompt)} tokens, {len(results) - len(failed)}/{len(results)} 个分片")
+    return prompt
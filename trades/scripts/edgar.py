@@ -0,0 +1,127 @@
+"""
+SEC EDGAR 客户端
+- 股票代码 → CIK 映射: company_tickers.json 缓存在 trades/data/store/edgar/, 超过
+  cik_map_max_age_days 才重新下载 (失败时继续使用旧文件)
+- submissions JSON: 所有请求属于 http_client 的 sec 限额组, 共享一个令牌桶, 速率不超过
+  http_client.limits.sec.requests_per_second (SEC 的公平访问政策为每秒 10 次,
+  且要求 User-Agent 中注明联系方式)
+- 增量: 每家公司的 recent 列表按时间倒序, 只取游标 (上次见到的 accession) 之前的部分;
+  每日索引 (daily-index/master.YYYYMMDD.idx) 列出当天提交文件的全部 CIK, 用于跳过
+  上次运行以来没有新文件的公司
+
+其余参数在 trades/config/settings.json 的 edgar 节中配置。
+"""
+
+import json
+import os
+import time
+
+import http_cache
+import http_client
+from settings import load_settings
+
+_settings = load_settings('edgar')
+# 限额组名: 不论请求发往哪个主机 (包括替身服务), 都计入 SEC 的速率配额
+LIMIT = 'sec'
+REQUESTS_PER_SECOND = http_client.LIMITS[LIMIT].requests_per_second
+WORKERS = int(_settings.get('workers', 8))
+CIK_MAP_MAX_AGE_DAYS = float(_settings.get('cik_map_max_age_days', 7))
+
+SEC_WWW_URL = os.environ.get('SEC_WWW_URL', 'https://www.sec.gov').rstrip('/')
+SEC_DATA_URL = os.environ.get('SEC_DATA_URL', 'https://data.sec.gov').rstrip('/')
+USER_AGENT = os.environ.get('SEC_USER_AGENT') or 'TradingIntelligenceSystem admin@example.com'
+HEADERS = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+
+STORE_DIR = 'trades/data/store/edgar'
+CIK_MAP_PATH = os.path.join(STORE_DIR, 'company_tickers.json')
+
+
+def get(url, source='edgar', **kwargs):
+    """计入 sec 限额组的请求 (缓存命中不消耗令牌)"""
+    return http_cache.get(url, headers=HEADERS, source=source, timeout=20, limit=LIMIT, **kwargs)
+
+
+def cik_map(max_age_days=CIK_MAP_MAX_AGE_DAYS):
+    """返回 {股票代码: CIK}; 本地文件不超过 max_age_days 天时不发送请求"""
+    try:
+        age = time.time() - os.path.getmtime(CIK_MAP_PATH)
+    except OSError:
+        age = None
+    if age is None or age > max_age_days * 86400:
+        try:
+            response = get(f"{SEC_WWW_URL}/files/company_tickers.json", source='edgar_tickers')
+            if response.status_code != 200:
+                raise RuntimeError(f"状态码 {response.status_code}")
+            os.makedirs(STORE_DIR, exist_ok=True)
+            tmp = f"{CIK_MAP_PATH}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp, CIK_MAP_PATH)
+            print("  ✓ 已更新股票代码 → CIK 映射")
+        except Exception as e:
+            if age is None:
+                raise
+            print(f"  ⚠ CIK 映射更新失败, 继续使用本地文件: {e}")
+
+    with open(CIK_MAP_PATH, 'r') as f:
+        entries = json.load(f)
+    # 同一 CIK 可能对应多个代码 (如 GOOGL/GOOG), 按代码各自保留
+    return {entry['ticker'].upper(): int(entry['cik_str']) for entry in entries.values()}
+
+
+def submissions(cik):
+    """公司 submissions JSON (filings.recent 为按时间倒序的列式数组)"""
+    response = get(f"{SEC_DATA_URL}/submissions/CIK{cik:010d}.json")
+    if response.status_code != 200:
+        raise RuntimeError(f"CIK {cik} 返回状态码 {response.status_code}")
+    return response.json()
+
+
+def archive_url(cik, accession, document=''):
+    return f"{SEC_WWW_URL}/Archives/edgar/data/{cik}/{accession.replace('-', '')}/{document}"
+
+
+def new_filings(data, ticker, last_accession=None, since=None):
+    """recent 列表中位于游标之前 (更新) 的文件; 没有游标时取 since 之后的文件"""
+    recent = data.get('filings', {}).get('recent', {})
+    accessions = recent.get('accessionNumber', [])
+    cik = int(data.get('cik') or 0)
+    filings = []
+    for i, accession in enumerate(accessions):
+        if accession == last_accession:
+            break
+        filing_date = recent['filingDate'][i]
+        if last_accession is None and since and filing_date < since:
+            break
+        document = recent.get('primaryDocument', [''] * len(accessions))[i]
+        filings.append({
+            "accession": accession,
+            "cik": cik,
+            "ticker": ticker,
+            "form": recent['form'][i],
+            "filing_date": filing_date,
+            "report_date": recent.get('reportDate', [''] * len(accessions))[i] or None,
+            "primary_document": document,
+            "description": recent.get('primaryDocDescription', [''] * len(accessions))[i] or recent['form'][i],
+            "url": archive_url(cik, accession, document),
+        })
+    return filings
+
+
+def daily_index_ciks(day):
+    """day 当天提交过文件的 CIK 集合; 当天没有索引 (周末、节假日或尚未发布) 时返回 None"""
+    quarter = (day.month - 1) // 3 + 1
+    response = get(f"{SEC_WWW_URL}/Archives/edgar/daily-index/{day.year}/QTR{quarter}/master.{day:%Y%m%d}.idx",
+                   source='edgar_index')
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"{day:%Y-%m-%d} 每日索引返回状态码 {response.status_code}")
+    ciks = set()
+    body = response.text
+    # 表头之后为 CIK|Company Name|Form Type|Date Filed|Filename
+    for line in body[body.find('\n---') + 1:].splitlines()[1:]:
+        cik, _, _ = line.partition('|')
+        if cik.isdigit():
+            ciks.add(int(cik))
+    return ciks
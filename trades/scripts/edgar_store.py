@@ -0,0 +1,221 @@
+"""
+SEC EDGAR 文件存储
+SQLite 数据库 (trades/data/store/edgar.db): filings 表以 accession 编号为主键保存
+已见过的文件, cursors 表记录每家公司最后见到的 accession, 收集脚本据此只写入新文件;
+meta 表保存上次完整扫描的日期等运行状态。
+
+Form 4 (内幕交易): form4_parsed 表以 accession 为主键记录已解析的文件, 每个文件只解析
+一次; 达到阈值的交易写入 form4_transactions, 按股票代码、内部人与交易日期建立索引。
+"""
+
+import os
+import sqlite3
+
+DB_PATH = 'trades/data/store/edgar.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    accession TEXT PRIMARY KEY,
+    cik INTEGER NOT NULL,
+    ticker TEXT,
+    form TEXT,
+    filing_date TEXT,
+    report_date TEXT,
+    primary_document TEXT,
+    description TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS filings_ticker ON filings (ticker, filing_date);
+CREATE INDEX IF NOT EXISTS filings_form ON filings (form, filing_date);
+
+CREATE TABLE IF NOT EXISTS cursors (
+    cik INTEGER PRIMARY KEY,
+    last_accession TEXT,
+    checked_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS form4_parsed (
+    accession TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    transactions INTEGER,
+    kept INTEGER,
+    parsed_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS form4_transactions (
+    accession TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    ticker TEXT,
+    issuer_cik INTEGER,
+    insider_name TEXT,
+    insider_cik INTEGER,
+    relation TEXT,
+    security TEXT,
+    transaction_date TEXT,
+    code TEXT,
+    transaction_type TEXT,
+    shares REAL,
+    price REAL,
+    acquired_disposed TEXT,
+    shares_after REAL,
+    ownership TEXT,
+    derivative INTEGER,
+    PRIMARY KEY (accession, row)
+);
+CREATE INDEX IF NOT EXISTS form4_ticker ON form4_transactions (ticker, transaction_date);
+CREATE INDEX IF NOT EXISTS form4_insider ON form4_transactions (insider_cik, transaction_date);
+CREATE INDEX IF NOT EXISTS form4_date ON form4_transactions (transaction_date);
+"""
+
+# Form 4 处理完成的状态; error 在下次运行时重试
+FORM4_DONE_STATUSES = ('parsed', 'no_xml')
+FORM4_COLUMNS = ('accession', 'row', 'ticker', 'issuer_cik', 'insider_name', 'insider_cik', 'relation', 'security',
+                 'transaction_date', 'code', 'transaction_type', 'shares', 'price', 'acquired_disposed',
+                 'shares_after', 'ownership', 'derivative')
+
+FILING_COLUMNS = ('accession', 'cik', 'ticker', 'form', 'filing_date', 'report_date', 'primary_document',
+                  'description', 'url')
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def cursors(conn):
+    """{cik: 最后见到的 accession}"""
+    return {row['cik']: row['last_accession'] for row in conn.execute("SELECT cik, last_accession FROM cursors")}
+
+
+def save_filings(conn, cik, filings, last_accession):
+    """写入一家公司的新文件并推进游标; 返回实际新增的文件数"""
+    before = conn.total_changes
+    conn.executemany(
+        f"INSERT OR IGNORE INTO filings ({', '.join(FILING_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(FILING_COLUMNS))})",
+        [tuple(filing.get(column) for column in FILING_COLUMNS) for filing in filings],
+    )
+    added = conn.total_changes - before
+    if last_accession:
+        conn.execute("INSERT OR REPLACE INTO cursors (cik, last_accession) VALUES (?, ?)", (cik, last_accession))
+    return added
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row['value'] if row else default
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def count_filings(conn):
+    return conn.execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+
+
+def query_filings(conn, tickers=None, forms=None, since=None, per_ticker=None):
+    """按股票代码 / 表格类型 / 起始日期筛选, 按日期降序; per_ticker 限制每只股票的条数"""
+    clauses, params = [], []
+    if tickers is not None:
+        tickers = list(tickers)
+        clauses.append(f"ticker IN ({','.join('?' * len(tickers))})")
+        params.extend(tickers)
+    if forms is not None:
+        forms = list(forms)
+        clauses.append(f"form IN ({','.join('?' * len(forms))})")
+        params.extend(forms)
+    if since:
+        clauses.append("filing_date >= ?")
+        params.append(str(since))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (f"SELECT {', '.join(FILING_COLUMNS)}, "
+           f"ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY filing_date DESC, accession DESC) AS rank "
+           f"FROM filings {where}")
+    if per_ticker:
+        sql = f"SELECT * FROM ({sql}) WHERE rank <= {int(per_ticker)}"
+    sql += " ORDER BY filing_date DESC, accession DESC"
+    return [{column: row[column] for column in FILING_COLUMNS} for row in conn.execute(sql, params)]
+
+
+def pending_form4(conn, tickers=None, since=None, forms=('4', '4/A'), limit=None):
+    """尚未解析完成的 Form 4 文件, 按提交日期降序 (先处理最新的文件)"""
+    clauses = [f"f.form IN ({','.join('?' * len(forms))})", "p.accession IS NULL"]
+    params = list(forms)
+    if tickers is not None:
+        tickers = list(tickers)
+        clauses.append(f"f.ticker IN ({','.join('?' * len(tickers))})")
+        params.extend(tickers)
+    if since:
+        clauses.append("f.filing_date >= ?")
+        params.append(str(since))
+    sql = (f"SELECT {', '.join('f.' + c for c in FILING_COLUMNS)} FROM filings f "
+           f"LEFT JOIN form4_parsed p ON p.accession = f.accession "
+           f"AND p.status IN ({','.join('?' * len(FORM4_DONE_STATUSES))}) "
+           f"WHERE {' AND '.join(clauses)} ORDER BY f.filing_date DESC, f.accession DESC")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [{column: row[column] for column in FILING_COLUMNS}
+            for row in conn.execute(sql, [*FORM4_DONE_STATUSES, *params])]
+
+
+def save_form4(conn, accession, status, transactions=(), parsed=0):
+    """记录一个 Form 4 文件的处理结果并写入保留的交易; parsed 为过滤前的交易数"""
+    conn.execute("INSERT OR REPLACE INTO form4_parsed (accession, status, transactions, kept) VALUES (?, ?, ?, ?)",
+                 (accession, status, parsed, len(transactions)))
+    conn.execute("DELETE FROM form4_transactions WHERE accession = ?", (accession,))
+    conn.executemany(
+        f"INSERT INTO form4_transactions ({', '.join(FORM4_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(FORM4_COLUMNS))})",
+        [tuple(t.get(column) for column in FORM4_COLUMNS) for t in transactions],
+    )
+
+
+def reset_misattributed_form4(conn):
+    """清除按申报文件所在公司 (而非发行人) 记账的旧交易, 使其重新解析; 返回涉及的文件数"""
+    accessions = [row[0] for row in conn.execute(
+        "SELECT DISTINCT t.accession FROM form4_transactions t JOIN filings f ON f.accession = t.accession "
+        "WHERE t.issuer_cik != 0 AND t.issuer_cik != f.cik AND t.ticker = f.ticker")]
+    for accession in accessions:
+        conn.execute("DELETE FROM form4_transactions WHERE accession = ?", (accession,))
+        conn.execute("DELETE FROM form4_parsed WHERE accession = ?", (accession,))
+    return len(accessions)
+
+
+def count_form4(conn):
+    return conn.execute("SELECT COUNT(*) FROM form4_parsed").fetchone()[0]
+
+
+def query_form4(conn, tickers=None, since=None, limit=None):
+    """按股票代码 / 起始交易日期筛选内幕交易, 按交易日期降序返回字典列表"""
+    clauses, params = [], []
+    if tickers is not None:
+        tickers = list(tickers)
+        clauses.append(f"ticker IN ({','.join('?' * len(tickers))})")
+        params.extend(tickers)
+    if since:
+        clauses.append("transaction_date >= ?")
+        params.append(str(since))
+    sql = f"SELECT {', '.join(FORM4_COLUMNS)} FROM form4_transactions"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY transaction_date DESC, accession DESC, row"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def query_form4_events(conn, codes=('P', 'S')):
+    """公开市场买卖 (非衍生品) 的内幕交易及其所在文件的提交日期, 供事件研究使用"""
+    sql = ("SELECT t.ticker, t.insider_name, t.transaction_type, t.shares, t.transaction_date, f.filing_date "
+           "FROM form4_transactions t LEFT JOIN filings f ON f.accession = t.accession "
+           f"WHERE t.code IN ({','.join('?' * len(codes))}) AND COALESCE(t.derivative, 0) = 0")
+    return [dict(row) for row in conn.execute(sql, list(codes))]
@@ -0,0 +1,152 @@
+"""
+SEC Form 4 解析
+Form 4 报告内部人 (董事、高管、10% 股东) 的证券交易。submissions 中的 primaryDocument
+通常是经 XSL 渲染的路径 (如 xslF345X05/form4.xml), 去掉前缀即为原始 XML:
+    {SEC_WWW_URL}/Archives/edgar/data/{CIK}/{accession 去掉 '-'}/{文件名}.xml
+
+XML 用 iterparse 逐个元素解析, 每笔交易解析完即释放, 内存只与单笔交易相关。
+非衍生品表 (nonDerivativeTable) 与衍生品表 (derivativeTable) 中的交易都会产出,
+后者以 derivative=True 标记。
+
+股票代码与 CIK 一律取自 <issuer>: 关注列表中的公司作为申报人 (如 10% 股东) 申报的其他公司
+交易也会出现在它自己的 submissions 中, 这类交易属于发行人而非申报文件所在的公司。
+"""
+
+import io
+from dataclasses import asdict, dataclass
+from xml.etree import ElementTree
+
+import edgar
+
+FORMS = ('4', '4/A')
+
+# 交易代码 (Form 4 General Instructions 8)
+TRANSACTION_CODES = {
+    'P': 'Purchase', 'S': 'Sale', 'A': 'Award', 'M': 'Option Exercise', 'X': 'Option Exercise',
+    'F': 'Tax Withholding', 'G': 'Gift', 'D': 'Disposition to Issuer', 'C': 'Conversion',
+    'J': 'Other', 'W': 'Inheritance', 'I': 'Discretionary',
+}
+
+
+@dataclass
+class Transaction:
+    accession: str
+    row: int
+    ticker: str
+    issuer_cik: int
+    insider_name: str
+    insider_cik: int
+    relation: str
+    security: str
+    transaction_date: str
+    code: str
+    transaction_type: str
+    shares: float
+    price: float
+    acquired_disposed: str
+    shares_after: float
+    ownership: str
+    derivative: bool
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def document_url(filing):
+    """原始 XML 的地址 (去掉 XSL 渲染目录)"""
+    document = (filing.get('primary_document') or '').rsplit('/', 1)[-1]
+    if not document.lower().endswith('.xml'):
+        return None
+    return edgar.archive_url(filing['cik'], filing['accession'], document)
+
+
+def _value(elem, path):
+    """Form 4 的数值大多包在 <value> 中; 两种写法都兼容"""
+    node = elem.find(path)
+    if node is None:
+        return ''
+    text = node.findtext('value')
+    return (text if text is not None else node.text or '').strip()
+
+
+def _number(text):
+    try:
+        return float(text.replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _relation(owner):
+    relationship = owner.find('reportingOwnerRelationship')
+    if relationship is None:
+        return ''
+    flag = lambda tag: (relationship.findtext(tag) or '').strip().lower() in ('1', 'true')  # noqa: E731
+    parts = []
+    if flag('isOfficer'):
+        parts.append((relationship.findtext('officerTitle') or '').strip() or 'Officer')
+    if flag('isDirector'):
+        parts.append('Director')
+    if flag('isTenPercentOwner'):
+        parts.append('10% Owner')
+    if flag('isOther'):
+        parts.append((relationship.findtext('otherText') or '').strip() or 'Other')
+    return ', '.join(parts)
+
+
+def parse(content, accession):
+    """逐笔产出 Form 4 XML (bytes 或文件对象) 中的交易"""
+    source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    issuer_cik, symbol = 0, ''
+    names, ciks, relations = [], [], []
+    row = 0
+    root = None
+    for event, elem in ElementTree.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end':
+            continue
+        if elem.tag == 'issuer':
+            issuer_cik = int(_number(elem.findtext('issuerCik')) or 0)
+            symbol = (elem.findtext('issuerTradingSymbol') or '').strip().upper()
+            root.clear()
+        elif elem.tag == 'reportingOwner':
+            names.append((elem.findtext('reportingOwnerId/rptOwnerName') or '').strip())
+            ciks.append(int(_number(elem.findtext('reportingOwnerId/rptOwnerCik')) or 0))
+            relations.append(_relation(elem))
+            root.clear()
+        elif elem.tag in ('nonDerivativeTransaction', 'derivativeTransaction'):
+            code = _value(elem, 'transactionCoding/transactionCode')
+            yield Transaction(
+                accession=accession,
+                row=row,
+                ticker=symbol,
+                issuer_cik=issuer_cik,
+                # 多个申报人联名时 (如基金与其管理人) 合并为一条
+                insider_name='; '.join(n for n in names if n),
+                insider_cik=ciks[0] if ciks else 0,
+                relation='; '.join(r for r in dict.fromkeys(relations) if r),
+                security=_value(elem, 'securityTitle'),
+                transaction_date=_value(elem, 'transactionDate')[:10],
+                code=code,
+                transaction_type=TRANSACTION_CODES.get(code, code),
+                shares=_number(_value(elem, 'transactionAmounts/transactionShares')) or 0.0,
+                price=_number(_value(elem, 'transactionAmounts/transactionPricePerShare')),
+                acquired_disposed=_value(elem, 'transactionAmounts/transactionAcquiredDisposedCode'),
+                shares_after=_number(_value(elem, 'postTransactionAmounts/sharesOwnedFollowingTransaction')),
+                ownership=_value(elem, 'ownershipNature/directOrIndirectOwnership'),
+                derivative=elem.tag == 'derivativeTransaction',
+            )
+            row += 1
+            elem.clear()
+            root.clear()
+
+
+def fetch(filing):
+    """下载并解析一个 Form 4 文件, 返回交易列表"""
+    url = document_url(filing)
+    if url is None:
+        raise ValueError(f"{filing['accession']} 没有 XML 正文: {filing.get('primary_document')}")
+    response = edgar.get(url, source='edgar_form4')
+    if response.status_code != 200:
+        raise RuntimeError(f"{filing['accession']} 返回状态码 {response.status_code}")
+    return list(parse(response.content, filing['accession']))
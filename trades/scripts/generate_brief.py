@@ -2,113 +2,313 @@
 """
 交易简报生成脚本
 使用 DeepSeek API 分析收集的数据并生成每日简报
+
+默认以流式方式接收回复并逐块写入 brief_<日期>.md.partial, 流中断或超过
+BRIEF_DEADLINE_SECONDS 时保留已生成的部分。设置 BRIEF_STREAM=0 回退到一次性调用。
+首 token 延迟、生成速度与总耗时记录在 trades/data/brief_metrics.json。
+
+ANALYSIS_DEPTH 控制提示预算与输出长度 (quick/standard/deep); deep 模式先并发
+分析各股票, 再由最终调用合并成简报 (见 deep_analysis.py)。截止时间从生成开始计算,
+map 阶段最多占用其中 DEEP_MAP_SHARE, 最终调用只使用剩余的时间。
+
+简报末尾的 ```signals 块是机器可读的评级 (见 signals.py), 网页构建时汇总进信号表。
 """
 
 import json
 import os
+import threading
+import time
 from datetime import datetime
 
-from openai import OpenAI
-
-os.makedirs('trades/output/briefs', exist_ok=True)
-
-print("🤖 使用 DeepSeek 生成交易简报...")
-
-# 初始化 DeepSeek 客户端
-client = OpenAI(
-    api_key=os.environ.get('DEEPSEEK_API_KEY'),
-    base_url="https://api.deepseek.com"
-)
-
-# 加载所有收集的数据
-def load_json_file(path):
+import artifacts
+import deep_analysis
+import http_client
+import llm_cache
+import metrics
+import signals
+from prompt_builder import DEFAULT_TOKEN_BUDGET, SYSTEM_PROMPT, build_prompt, estimate_tokens
+from settings import load_watchlist
+
+BRIEFS_DIR = 'trades/output/briefs'
+INPUT_PATHS = {
+    "market_data": 'trades/data/market_snapshot.json',
+    "congress_trades": 'trades/data/congress_trades.json',
+    "insider_trades": 'trades/data/insider_trades.json',
+    "sec_filings": 'trades/data/sec_filings.json',
+    "polymarket": 'trades/data/polymarket.json',
+}
+BACKTEST_PATH = 'trades/data/backtest_summary.json'
+
+STREAM = os.environ.get('BRIEF_STREAM', '1') != '0'
+# 整体截止时间, 加上 STALL_SECONDS 后需小于管道中 brief 阶段的超时 (900 秒)
+DEADLINE_SECONDS = float(os.environ.get('BRIEF_DEADLINE_SECONDS', '780'))
+# 单次读取的超时: 流式回复中超过这段时间没有新数据即视为中断
+STALL_SECONDS = float(os.environ.get('BRIEF_STALL_SECONDS', '90'))
+# 一次性调用的重试次数; 各次尝试均分剩余时间
+BLOCKING_RETRIES = min(http_client.RETRIES, 1)
+# deep 模式 map 阶段最多占用的剩余时间比例, 其余留给最终的汇总调用
+DEEP_MAP_SHARE = 0.5
+METRICS_PATH = 'trades/data/brief_metrics.json'
+DEEPSEEK_BASE_URL = os.environ.get('DEEPSEEK_BASE_URL', "https://api.deepseek.com")
+METRICS_HISTORY = 60
+MODEL = "deepseek-chat"
+
+# 分析深度: 提示预算与输出上限
+DEPTH_PRESETS = {
+    "quick": {"prompt_budget": DEFAULT_TOKEN_BUDGET // 2, "max_tokens": 2000},
+    "standard": {"prompt_budget": DEFAULT_TOKEN_BUDGET, "max_tokens": 4000},
+    "deep": {"prompt_budget": DEFAULT_TOKEN_BUDGET, "max_tokens": 4000},
+}
+ANALYSIS_DEPTH = os.environ.get('ANALYSIS_DEPTH', 'standard').strip().lower()
+
+
+def stream_completion(client, messages, partial_path, deadline, params):
+    """流式接收回复并逐块追加到 partial_path
+
+    返回 (正文, 指标, 是否完整)。流中断或超过截止时间时返回已收到的部分。
+    流式调用不重试 (重试会丢弃已收到的部分); 到达截止时间时由看门狗线程关闭连接,
+    读取最迟在 STALL_SECONDS 后结束。
+    """
+    started = time.perf_counter()
+    parts = []
+    first_token_at = None
+    usage = None
+    complete = False
+    error = None
+    stream = None
+    expired = threading.Event()
+
+    def watchdog():
+        expired.set()
+        if stream is not None:
+            stream.close()
+
+    timer = threading.Timer(deadline, watchdog)
+    timer.daemon = True
+    timer.start()
+    with open(partial_path, 'w') as partial:
+        try:
+            stream = client.with_options(max_retries=0).chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=min(deadline, STALL_SECONDS),
+                **params
+            )
+            for chunk in stream:
+                if expired.is_set():
+                    break
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        print(f"  ⏱ 首 token: {first_token_at - started:.2f}s")
+                    parts.append(delta)
+                    partial.write(delta)
+                    partial.flush()
+            complete = not expired.is_set()
+        except Exception as e:
+            error = e
+        finally:
+            timer.cancel()
+            if stream is not None:
+                stream.close()
+    if not complete and expired.is_set():
+        # 看门狗关闭连接后, 读取可能以任意异常或静默结束, 统一记为超时
+        error = TimeoutError(f"超过截止时间 {deadline:.0f}s")
+
+    content = ''.join(parts)
+    finished = time.perf_counter()
+    completion_tokens = usage.completion_tokens if usage is not None else estimate_tokens(content)
+    generating = finished - first_token_at if first_token_at is not None else None
+    generation = {
+        "mode": "stream",
+        "complete": complete,
+        "time_to_first_token": round(first_token_at - started, 3) if first_token_at is not None else None,
+        "total_latency": round(finished - started, 3),
+        "completion_tokens": completion_tokens,
+        "tokens_per_second": round(completion_tokens / generating, 1) if generating else None,
+        "error": str(error) if error else None,
+    }
+    if error is not None and not content:
+        os.remove(partial_path)
+        raise error
+    return content, generation, complete
+
+
+def record_metrics(generation):
+    """追加本次生成的指标, 只保留最近 METRICS_HISTORY 次"""
     try:
-        with open(path, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
-
-market_data = load_json_file('trades/data/market_snapshot.json')
-congress_trades = load_json_file('trades/data/congress_trades.json')
-insider_trades = load_json_file('trades/data/insider_trades.json')
-sec_filings = load_json_file('trades/data/sec_filings.json')
-polymarket = load_json_file('trades/data/polymarket.json')
-
-# 读取watchlist
-try:
-    with open('trades/config/watchlist.json', 'r') as f:
-        watchlist = json.load(f)
-except:
-    watchlist = {"tickers": []}
-
-# 构建分析提示
-analysis_prompt = f"""
-你是一位专业的投资分析师。请基于以下数据生成一份详细的每日交易简报。
-
-## 今日日期
-{datetime.now().strftime("%Y年%m月%d日")}
-
-## 监控列表
-{json.dumps(watchlist.get('tickers', []), ensure_ascii=False)}
-
-## 市场数据
-{json.dumps(market_data.get('market_data', {}), indent=2, ensure_ascii=False)[:3000]}
-
-## 主要指数
-{json.dumps(market_data.get('indices', {}), indent=2, ensure_ascii=False)}
-
-## 国会交易
-{json.dumps(congress_trades.get('trades', []), indent=2, ensure_ascii=False)}
-
-## 内幕交易
-{json.dumps(insider_trades.get('trades', []), indent=2, ensure_ascii=False)}
-
-## SEC文件
-{json.dumps(sec_filings.get('filings', []), indent=2, ensure_ascii=False)}
-
-## Polymarket 预测市场
-{json.dumps(polymarket.get('markets', [])[:5], indent=2, ensure_ascii=False)}
-
----
-
-请生成一份结构化的交易简报，包含以下部分：
-
-1. **执行摘要** - 今日最重要的3-5个发现
-2. **市场概览** - 主要指数表现和市场情绪
-3. **信号分析** - 分析国会交易、内幕交易等信号的含义
-4. **具体建议** - 针对监控列表中的股票给出具体建议（BUY/HOLD/SELL/WATCH）
-5. **风险警示** - 需要关注的风险因素
-6. **预测市场洞察** - Polymarket数据的解读
-7. **明日关注** - 明天需要关注的事件和数据
-
-请使用Markdown格式，确保分析专业、客观、有数据支撑。
-"""
+        with open(METRICS_PATH, 'r') as f:
+            history = json.load(f).get('history', [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        history = []
+    entry = {"timestamp": datetime.now().isoformat(), **generation}
+    history = (history + [entry])[-METRICS_HISTORY:]
+    with open(METRICS_PATH, 'w') as f:
+        json.dump({"latest": entry, "history": history}, f, indent=2)
+
+
+def generate(watchlist=None, **inputs):
+    """生成当日简报并写入 brief_<日期>.md 与 latest.md, 返回 {"path", "content", "signals"}
+
+    inputs 为各收集阶段的输出 (market_data, congress_trades, insider_trades, sec_filings,
+    polymarket) 与回测汇总 (backtest); 未传入的从 trades/data/ 中读取。
+    """
+    # openai SDK 导入较慢, 只在生成简报时加载
+    import openai
+
+    depth = ANALYSIS_DEPTH
+    if depth not in DEPTH_PRESETS:
+        print(f"  ⚠ 未知的分析深度 {depth!r}, 使用 standard")
+        depth = 'standard'
+    print(f"🤖 使用 DeepSeek 生成交易简报 ({depth})...")
+    deadline = time.monotonic() + DEADLINE_SECONDS
+
+    def remaining():
+        return max(deadline - time.monotonic(), 0.0)
+
+    os.makedirs(BRIEFS_DIR, exist_ok=True)
+
+    # 初始化 DeepSeek 客户端 (SDK 自带退避重试并遵循 Retry-After; 次数受截止时间限制, 流式调用不重试)
+    client = openai.OpenAI(
+        api_key=os.environ.get('DEEPSEEK_API_KEY'),
+        base_url=DEEPSEEK_BASE_URL,
+        max_retries=BLOCKING_RETRIES
+    )
 
-# 调用 DeepSeek API
-print("  正在分析数据...")
-try:
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {
-                "role": "system",
-                "content": "你是一位专业的投资分析师，擅长分析市场数据、内幕交易信号和预测市场。你的分析应该客观、专业、有数据支撑。"
-            },
-            {
-                "role": "user",
-                "content": analysis_prompt
-            }
-        ],
-        max_tokens=4000,
-        temperature=0.7
+    # 加载所有收集的数据
+    market_data, congress_trades, insider_trades, sec_filings, polymarket = (
+        inputs[name] if inputs.get(name) is not None else artifacts.load(path, {})
+        for name, path in INPUT_PATHS.items()
     )
-    
-    brief_content = response.choices[0].message.content
-    print("  ✓ DeepSeek 分析完成")
-    
-except Exception as e:
-    print(f"  ✗ DeepSeek API 调用失败: {e}")
-    brief_content = f"""
+    backtest = inputs.get('backtest') or artifacts.load(BACKTEST_PATH, {})
+    watchlist = watchlist or load_watchlist() or {"tickers": []}
+
+    # 构建分析提示 (在 token 预算内渲染为紧凑表格)
+    focus_ticker = (os.environ.get('FOCUS_TICKER') or '').strip().upper() or None
+    date_text = datetime.now().strftime("%Y年%m月%d日")
+    preset = DEPTH_PRESETS[depth]
+    with metrics.span('brief.prompt'):
+        analysis_prompt, prompt_stats = build_prompt(
+            market_data, congress_trades, insider_trades, sec_filings, polymarket, watchlist,
+            date_text=date_text,
+            focus_ticker=focus_ticker,
+            budget=preset['prompt_budget'],
+            backtest=backtest,
+        )
+
+    model_params = {"max_tokens": preset['max_tokens'], "temperature": 0.7}
+
+    # 发给模型的最终提示 (已经过 prompt_builder 的排序与截断)、模型与参数都未变化时复用已生成的简报;
+    # deep 模式再加上各分片提示、预算与不含分片摘要的 reduce 提示 (摘要在 map 阶段之后才有)
+    prompts = {"depth": depth, "analysis": analysis_prompt}
+    if depth == 'deep':
+        shards, shard_prompts = deep_analysis.plan(
+            market_data, congress_trades, insider_trades, sec_filings, watchlist, focus_ticker
+        )
+        prompts.update({
+            "shards": [[shard['name'], shard['focus'], prompt] for shard, prompt in zip(shards, shard_prompts)],
+            "budgets": [deep_analysis.SHARD_BUDGET, deep_analysis.FOCUS_BUDGET, deep_analysis.REDUCE_BUDGET],
+            "reduce": deep_analysis.build_reduce_prompt(
+                [], market_data, polymarket, watchlist, date_text, focus_ticker,
+                log=lambda *args: None, backtest=backtest,
+            ),
+        })
+    cache_key = llm_cache.cache_key(inputs=prompts, template=SYSTEM_PROMPT, model=MODEL, params=model_params)
+    cached = llm_cache.lookup(cache_key)
+
+    # 调用 DeepSeek API
+    if cached is not None:
+        metrics.count('brief.cache_hits')
+        brief_content = cached['content']
+        age_minutes = (time.time() - cached['stored_at']) / 60
+        print(f"  💾 简报缓存命中 ({cache_key[:12]}, {age_minutes:.0f} 分钟前生成), 跳过 API 调用")
+    else:
+        metrics.count('brief.cache_misses')
+        print(f"  💾 简报缓存未命中 ({cache_key[:12]}{', 强制刷新' if llm_cache.REFRESH else ''})")
+
+        # deep 模式: 先并发分析各分片, 再以分项摘要替换原始数据表作为最终提示
+        if depth == 'deep':
+            try:
+                with metrics.span('brief.deep_map'):
+                    shard_results = deep_analysis.map_analyses(
+                        openai.AsyncOpenAI(
+                            api_key=os.environ.get('DEEPSEEK_API_KEY'),
+                            base_url=DEEPSEEK_BASE_URL,
+                            max_retries=0
+                        ),
+                        market_data, congress_trades, insider_trades, sec_filings, watchlist,
+                        focus_ticker=focus_ticker, model=MODEL, temperature=model_params['temperature'],
+                        timeout=remaining() * DEEP_MAP_SHARE,
+                    )
+                if any(r['summary'] for r in shard_results):
+                    analysis_prompt = deep_analysis.build_reduce_prompt(
+                        shard_results, market_data, polymarket, watchlist, date_text, focus_ticker,
+                        backtest=backtest,
+                    )
+                else:
+                    print("  ⚠ 所有分片均失败, 改用标准提示")
+            except Exception as e:
+                print(f"  ⚠ 深度分析失败, 改用标准提示: {e}")
+
+        print("  正在分析数据...")
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": analysis_prompt},
+        ]
+        partial_path = f"{BRIEFS_DIR}/brief_{datetime.now().strftime('%Y-%m-%d')}.md.partial"
+        try:
+            if STREAM:
+                brief_content, generation, complete = stream_completion(
+                    client, messages, partial_path, remaining(), model_params
+                )
+            else:
+                started = time.perf_counter()
+                # 每次尝试的超时均分剩余时间, 全部重试都在截止时间内结束
+                response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    timeout=remaining() / (BLOCKING_RETRIES + 1),
+                    **model_params
+                )
+                brief_content = response.choices[0].message.content
+                elapsed = time.perf_counter() - started
+                tokens = response.usage.completion_tokens if response.usage else estimate_tokens(brief_content)
+                generation = {
+                    "mode": "blocking",
+                    "complete": True,
+                    "time_to_first_token": None,
+                    "total_latency": round(elapsed, 3),
+                    "completion_tokens": tokens,
+                    "tokens_per_second": round(tokens / elapsed, 1) if elapsed else None,
+                    "error": None,
+                }
+                complete = True
+
+            record_metrics(generation)
+            metrics.record_span('brief.llm', generation['total_latency'])
+            metrics.count('brief.completion_tokens', generation['completion_tokens'])
+            print(f"  ⏱ 生成耗时 {generation['total_latency']:.1f}s, {generation['completion_tokens']} tokens, "
+                  f"{generation['tokens_per_second'] or '-'} tokens/s")
+            if complete:
+                print("  ✓ DeepSeek 分析完成")
+                llm_cache.store(cache_key, brief_content, MODEL, model_params)
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            else:
+                # 保留已生成的部分, 并注明中断原因 (不写入缓存)
+                metrics.count('brief.incomplete')
+                print(f"  ⚠ 生成中断, 保留已生成的部分: {generation['error']}")
+                brief_content += f"\n\n---\n\n> ⚠️ 简报生成中断 ({generation['error']})，以上为已生成的部分内容。\n"
+
+        except Exception as e:
+            metrics.count('brief.api_failures')
+            print(f"  ✗ DeepSeek API 调用失败: {e}")
+            brief_content = f"""
 # 每日交易简报
 
 **日期**: {datetime.now().strftime("%Y年%m月%d日")}
@@ -141,9 +341,9 @@ DeepSeek API 调用失败，无法生成完整分析。
 *请检查 API 密钥配置并重新运行。*
 """
 
-# 添加元数据头
-today = datetime.now().strftime("%Y-%m-%d")
-full_brief = f"""---
+    # 添加元数据头
+    today = datetime.now().strftime("%Y-%m-%d")
+    full_brief = f"""---
 title: 每日交易简报
 date: {today}
 generated_at: {datetime.now().isoformat()}
@@ -164,13 +364,24 @@ data_sources:
 *生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} UTC*
 """
 
-# 保存简报
-brief_path = f'trades/output/briefs/brief_{today}.md'
-with open(brief_path, 'w') as f:
-    f.write(full_brief)
+    # 保存简报
+    brief_path = f'{BRIEFS_DIR}/brief_{today}.md'
+    with open(brief_path, 'w') as f:
+        f.write(full_brief)
+
+    # 同时保存为 latest.md
+    with open(f'{BRIEFS_DIR}/latest.md', 'w') as f:
+        f.write(full_brief)
+
+    # 机器可读的评级; 模型遗漏 signals 块时按评级文本解析
+    brief_signals = signals.extract(full_brief)
+    metrics.count('brief.signals', len(brief_signals))
+    source = 'signals 块' if signals.parse_block(brief_content) is not None else '评级文本 (未找到 signals 块)'
+    print(f"  📡 评级信号: {len(brief_signals)} 条, 来自 {source}")
+
+    print(f"\n✓ 交易简报已保存: {brief_path}")
+    return {"path": brief_path, "content": full_brief, "signals": brief_signals}
 
-# 同时保存为 latest.md
-with open('trades/output/briefs/latest.md', 'w') as f:
-    f.write(full_brief)
 
-print(f"\n✓ 交易简报已保存: {brief_path}")
+if __name__ == '__main__':
+    generate()
@@ -2,18 +2,66 @@
 """
 GitHub Pages 生成脚本
 将交易简报转换为美观的网页
+
+简报页面增量构建: trades/data/pages_manifest.json 记录每份简报的内容哈希与模板版本,
+只有输入变化的页面才会重新渲染, 源简报已删除的页面会被移除。
+使用 --full 强制重新渲染全部页面。
+
+需要渲染的页面按块分配到进程池 (--jobs 控制进程数, 1 为串行),
+每个页面先写入临时文件再原子替换; --verify 会在构建后串行重新渲染并逐字节比对。
+
+首页的"管道健康"面板读取 trades/data/metrics/ 中最近的运行指标, 展示各阶段耗时趋势,
+耗时明显高于历史中位数的阶段会被标红。"信号追踪"面板由信号表 trades/data/signals.json
+(见 signals.py) 生成, 展示各评级与股票的命中率及最新一份简报的评级。
 """
 
+import argparse
+import glob
+import hashlib
+import inspect
 import json
+import multiprocessing
 import os
-import glob
+import statistics
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-os.makedirs('docs', exist_ok=True)
-os.makedirs('docs/briefs', exist_ok=True)
-os.makedirs('docs/css', exist_ok=True)
-
-print("🌐 生成 GitHub Pages...")
+import artifacts
+import markdown_render
+import metrics
+import search_index
+import signals
+from markdown_render import render_markdown
+
+MANIFEST_PATH = 'trades/data/pages_manifest.json'
+BRIEFS_SOURCE_GLOB = 'trades/output/briefs/brief_*.md'
+BRIEFS_OUTPUT_DIR = 'docs/briefs'
+CSS_PATH = 'docs/css/style.css'
+
+# 并行渲染: 少于该数量的页面直接串行渲染, 避免进程池的启动开销
+PARALLEL_MIN_PAGES = 16
+
+# 管道健康面板: 展示的运行次数, 以及 (阶段名, 单独运行时的脚本名)
+HEALTH_RUNS = 14
+HEALTH_STAGES = [
+    ('market_data', 'collect_market_data'),
+    ('congress_trades', 'collect_congress_trades'),
+    ('insider_trades', 'collect_insider_trades'),
+    ('sec_filings', 'collect_sec_filings'),
+    ('polymarket', 'collect_polymarket'),
+    ('backtest', 'backtest'),
+    ('brief', 'generate_brief'),
+    ('pages', 'generate_pages'),
+    ('notify', 'send_notifications'),
+]
+# 最近一次耗时超过历史中位数的该倍数 (且至少多 1 秒) 时视为回退
+REGRESSION_RATIO = 1.5
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+# 信号追踪面板: 按信号数列出的股票数
+SIGNAL_TICKERS = 10
 
 # CSS 样式
 css_content = """
@@ -168,6 +216,17 @@ header .subtitle {
     color: var(--accent-blue);
 }
 
+.brief-content ul ul, .brief-content ol ul, .brief-content ul ol, .brief-content ol ol {
+    margin-top: 8px;
+    margin-bottom: 0;
+}
+
+.brief-content hr {
+    border: none;
+    border-top: 1px solid var(--border-color);
+    margin: 24px 0;
+}
+
 .brief-content blockquote {
     border-left: 3px solid var(--accent-blue);
     padding-left: 16px;
@@ -226,75 +285,356 @@ footer {
 .tag.hold { background: rgba(210, 153, 34, 0.2); color: var(--accent-yellow); }
 .tag.watch { background: rgba(88, 166, 255, 0.2); color: var(--accent-blue); }
 
+.health, .signals {
+    margin-top: 30px;
+    background: var(--bg-secondary);
+    border: 1px solid var(--border-color);
+    border-radius: 8px;
+    padding: 20px;
+    overflow-x: auto;
+}
+
+.health h2, .signals h2 {
+    margin-bottom: 15px;
+}
+
+.health table, .signals table {
+    width: 100%;
+    border-collapse: collapse;
+    font-size: 0.9rem;
+}
+
+.health th, .health td, .signals th, .signals td {
+    padding: 6px 10px;
+    border-bottom: 1px solid var(--border-color);
+    text-align: left;
+}
+
+.health th, .signals th {
+    color: var(--text-secondary);
+    font-weight: 500;
+}
+
+.health .spark {
+    font-family: monospace;
+    letter-spacing: 1px;
+    color: var(--accent-blue);
+}
+
+.health .regression { color: var(--accent-red); font-weight: 600; }
+
+.health .summary, .signals .summary {
+    margin-top: 12px;
+    color: var(--text-secondary);
+    font-size: 0.85rem;
+}
+
+.search input {
+    width: 100%;
+    padding: 10px 12px;
+    background: var(--bg-primary);
+    border: 1px solid var(--border-color);
+    border-radius: 6px;
+    color: var(--text-primary);
+    font-size: 1rem;
+}
+
+.search .status {
+    margin: 8px 0;
+    color: var(--text-secondary);
+    font-size: 0.85rem;
+}
+
+.archive-list .tag { margin-left: 6px; }
+
+.signals .latest { margin-bottom: 15px; }
+
+.signals .latest .tag { margin: 0 6px 6px 0; }
+
+.signals h3 {
+    margin: 15px 0 8px;
+    color: var(--text-secondary);
+    font-size: 0.95rem;
+    font-weight: 500;
+}
+
 @media (max-width: 768px) {
     .container { padding: 15px; }
     .brief-content { padding: 20px; }
 }
 """
 
-# 保存CSS
-with open('docs/css/style.css', 'w') as f:
-    f.write(css_content)
-
-# 读取最新简报
-try:
-    with open('trades/output/briefs/latest.md', 'r') as f:
-        latest_brief = f.read()
-except:
-    latest_brief = "# 暂无简报\n\n请等待系统生成第一份简报。"
-
-# 读取市场数据
-try:
-    with open('trades/data/market_snapshot.json', 'r') as f:
-        market_data = json.load(f)
-except:
-    market_data = {"indices": {}, "market_data": {}}
-
-# 简单的 Markdown 转 HTML
-def md_to_html(md_text):
-    import re
-    
-    # 移除 YAML front matter
-    md_text = re.sub(r'^---\n.*?\n---\n', '', md_text, flags=re.DOTALL)
-    
-    html = md_text
-    
-    # 标题
-    html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-    
-    # 粗体和斜体
-    html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'\*(.+?)\*', r'<em>\1</em>', html)
-    
-    # 代码块
-    html = re.sub(r'```(\w*)\n(.*?)```', r'<pre><code>\2</code></pre>', html, flags=re.DOTALL)
-    html = re.sub(r'`(.+?)`', r'<code>\1</code>', html)
-    
-    # 列表
-    html = re.sub(r'^- (.+)$', r'<li>\1</li>', html, flags=re.MULTILINE)
-    html = re.sub(r'(<li>.*</li>\n)+', r'<ul>\g<0></ul>', html)
+
+BRIEF_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>交易简报 - {date}</title>
+    <link rel="stylesheet" href="../css/style.css">
+</head>
+<body>
+    <header>
+        <div class="container">
+            <h1>📊 交易简报 - {date}</h1>
+            <p class="subtitle"><a href="../index.html" style="color: var(--accent-blue);">← 返回首页</a></p>
+        </div>
+    </header>
     
-    # 段落
-    paragraphs = html.split('\n\n')
-    processed = []
-    for p in paragraphs:
-        p = p.strip()
-        if p and not p.startswith('<'):
-            p = f'<p>{p}</p>'
-        processed.append(p)
-    html = '\n'.join(processed)
+    <main class="container">
+        <section class="brief-content">
+            {body}
+        </section>
+    </main>
     
-    return html
+    <footer>
+        <div class="container">
+            <p>🤖 由 DeepSeek AI 驱动</p>
+        </div>
+    </footer>
+</body>
+</html>
+"""
 
-# 生成首页
-indices = market_data.get('indices', {})
-sp500 = indices.get('S&P 500', {})
-nasdaq = indices.get('NASDAQ', {})
-vix = indices.get('VIX', {})
+# 模板版本: 页面模板或 Markdown 渲染逻辑变化时, 所有简报页面都需要重新渲染
+TEMPLATE_VERSION = hashlib.sha256(
+    (BRIEF_PAGE_TEMPLATE + inspect.getsource(markdown_render) + inspect.getsource(signals.strip_block)
+     + signals.BLOCK.pattern).encode()
+).hexdigest()[:16]
+
+
+def brief_date(brief_file):
+    return os.path.basename(brief_file).replace('brief_', '').replace('.md', '')
+
+
+def render_brief_page(date, content):
+    return BRIEF_PAGE_TEMPLATE.format(date=date, body=render_markdown(signals.strip_block(content)))
+
+
+def write_if_changed(path, content):
+    """内容不变时不写文件, 避免无意义的修改时间与 git diff; 写入经临时文件原子替换"""
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return True
+
+
+def render_pages_chunk(items):
+    """渲染一块页面 [(date, 源文件, 输出文件)], 串行与并行构建共用此函数"""
+    for date, brief_file, output_path in items:
+        with open(brief_file, 'r') as f:
+            write_if_changed(output_path, render_brief_page(date, f.read()))
+    return len(items)
+
+
+def render_pages(items, jobs):
+    """按块渲染页面; jobs > 1 且页面足够多时使用进程池"""
+    if jobs <= 1 or len(items) < PARALLEL_MIN_PAGES:
+        return render_pages_chunk(items)
+    chunk_size = max(1, -(-len(items) // (jobs * 4)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    # 在管道的单进程模式中其他阶段的线程仍在运行, fork 出的子进程可能继承被占用的锁,
+    # 此时改由 forkserver 启动工作进程
+    context = None
+    if threading.active_count() > 1 and 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        return sum(pool.map(render_pages_chunk, chunks))
+
+
+def verify_pages(brief_files):
+    """串行重新渲染全部页面并与磁盘上的输出逐字节比对, 返回不一致的日期"""
+    mismatched = []
+    for brief_file in brief_files:
+        date = brief_date(brief_file)
+        with open(brief_file, 'r') as f:
+            expected = render_brief_page(date, f.read()).encode()
+        try:
+            with open(os.path.join(BRIEFS_OUTPUT_DIR, f'{date}.html'), 'rb') as f:
+                actual = f.read()
+        except FileNotFoundError:
+            actual = None
+        if actual != expected:
+            mismatched.append(date)
+    return mismatched
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    write_if_changed(MANIFEST_PATH, json.dumps(manifest, indent=2, ensure_ascii=False) + '\n')
+
+
+def build_brief_pages(brief_files, full=False, jobs=1):
+    """增量渲染简报页面, 返回 (构建数, 跳过数, 删除数)"""
+    manifest = load_manifest()
+    previous = manifest.get('pages', {}) if manifest.get('template_version') == TEMPLATE_VERSION else {}
+    pages = {}
+    pending = []
+    skipped = 0
+
+    for brief_file in brief_files:
+        date = brief_date(brief_file)
+        with open(brief_file, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        output_path = os.path.join(BRIEFS_OUTPUT_DIR, f'{date}.html')
+        pages[date] = {"source": brief_file, "hash": digest}
+
+        if not full and previous.get(date, {}).get('hash') == digest and os.path.exists(output_path):
+            skipped += 1
+            continue
+        pending.append((date, brief_file, output_path))
+
+    built = render_pages(pending, jobs)
+
+    # 移除源简报已不存在的页面
+    removed = 0
+    for output_path in glob.glob(os.path.join(BRIEFS_OUTPUT_DIR, '*.html')):
+        if os.path.basename(output_path)[:-len('.html')] not in pages:
+            os.remove(output_path)
+            removed += 1
+
+    save_manifest({"template_version": TEMPLATE_VERSION, "pages": pages})
+    return built, skipped, removed
+
+
+def stage_duration(run, stage, script):
+    """阶段运行时长; 单独运行的脚本以脚本名记录"""
+    entry = run['stages'].get(stage) or run['stages'].get(script)
+    return entry.get('wall') if entry else None
+
+
+def sparkline(values):
+    present = [v for v in values if v is not None]
+    if not present:
+        return ''
+    low, high = min(present), max(present)
+    scale = (len(SPARK_CHARS) - 1) / (high - low) if high > low else 0
+    return ''.join(' ' if v is None else SPARK_CHARS[int((v - low) * scale)] for v in values)
+
+
+def run_counters(run):
+    """汇总一次运行中所有阶段的计数器"""
+    totals = {}
+    for entry in run['stages'].values():
+        for name, value in entry.get('counters', {}).items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def build_health_panel(runs):
+    """管道健康面板: 各阶段最近几次运行的耗时趋势与关键计数器"""
+    if not runs:
+        return ''
+    rows = []
+    for stage, script in HEALTH_STAGES:
+        durations = [stage_duration(run, stage, script) for run in runs]
+        latest = durations[-1]
+        history = [d for d in durations[:-1] if d is not None]
+        if latest is None and not history:
+            continue
+        median = statistics.median(history) if history else None
+        regressed = (latest is not None and median is not None and len(history) >= 3
+                     and latest > median * REGRESSION_RATIO and latest - median > 1)
+        latest_cell = '-' if latest is None else f"{latest:.1f}s"
+        median_cell = '-' if median is None else f"{median:.1f}s"
+        css_class = ' class="regression"' if regressed else ''
+        rows.append(f'<tr><td>{stage}</td><td class="spark">{sparkline(durations)}</td>'
+                    f'<td{css_class}>{latest_cell}</td><td>{median_cell}</td></tr>')
+
+    counters = run_counters(runs[-1])
+    lookups = counters.get('http.cache_hits', 0) + counters.get('http.cache_misses', 0)
+    hit_rate = f"{counters.get('http.cache_hits', 0) / lookups:.0%}" if lookups else '-'
+    retries = sum(v for k, v in counters.items() if k.endswith('retries'))
+    errors = sum(v for k, v in counters.items() if k.endswith(('errors', 'failures')))
+    summary = (f"最近一次运行 ({runs[-1].get('date', '')}): HTTP 请求 {counters.get('http.requests', 0)} 次, "
+               f"传输 {counters.get('http.bytes', 0) / 1024:.0f} KB, 缓存命中率 {hit_rate}, "
+               f"重试 {retries} 次, 错误 {errors} 次")
+
+    return f"""
+        <section class="health">
+            <h2>🩺 管道健康</h2>
+            <table>
+                <thead><tr><th>阶段</th><th>最近 {len(runs)} 次耗时</th><th>最近一次</th><th>历史中位数</th></tr></thead>
+                <tbody>
+                {(chr(10) + ' ' * 16).join(rows)}
+                </tbody>
+            </table>
+            <p class="summary">{summary}</p>
+        </section>
+"""
 
-index_html = f"""<!DOCTYPE html>
+
+def _pct(value, signed=False):
+    if value is None:
+        return '-'
+    return f"{value:+.2%}" if signed else f"{value:.0%}"
+
+
+def signal_rows(records):
+    return [f'<tr><td>{r["key"]}</td><td>{r["signals"]}</td><td>{r["evaluated"]}</td>'
+            f'<td>{_pct(r["hit_rate"])}</td><td>{_pct(r["avg_return"], signed=True)}</td>'
+            f'<td>{_pct(r["avg_confidence"])}</td></tr>' for r in records]
+
+
+def build_signals_panel(summary):
+    """信号追踪面板: 最新简报的评级, 以及按评级与股票统计的远期收益命中率"""
+    if not summary or not summary.get('signals'):
+        return ''
+    latest = summary['latest']
+    tags = []
+    for signal in latest['signals']:
+        confidence = '' if signal['confidence'] is None else f" {signal['confidence']:.0%}"
+        tags.append(f'<span class="tag {signal["action"].lower()}">'
+                    f'{signal["ticker"]} {signal["action"]}{confidence}</span>')
+    horizon = summary['horizon_days']
+    columns = f'<th>信号数</th><th>已评估</th><th>命中率</th><th>平均 {horizon} 日收益</th><th>平均置信度</th>'
+    indent = chr(10) + ' ' * 16
+    return f"""
+        <section class="signals">
+            <h2>📡 信号追踪</h2>
+            <p class="latest">{latest['date']}: {''.join(tags)}</p>
+            <h3>按评级</h3>
+            <table>
+                <thead><tr><th>评级</th>{columns}</tr></thead>
+                <tbody>
+                {indent.join(signal_rows(summary['by_action']))}
+                </tbody>
+            </table>
+            <h3>按股票 (信号最多的 {SIGNAL_TICKERS} 只)</h3>
+            <table>
+                <thead><tr><th>股票</th>{columns}</tr></thead>
+                <tbody>
+                {indent.join(signal_rows(summary['by_ticker'][:SIGNAL_TICKERS]))}
+                </tbody>
+            </table>
+            <p class="summary">共 {summary['signals']} 条信号; 入场价为简报当天收盘价, BUY/SELL 的 {horizon} 日收益方向与评级一致视为命中, HOLD/WATCH 只统计收益</p>
+        </section>
+"""
+
+
+def build_index(latest_brief, market_data, brief_files, runs=(), signal_summary=None):
+    indices = market_data.get('indices', {})
+    sp500 = indices.get('S&P 500', {})
+    nasdaq = indices.get('NASDAQ', {})
+    vix = indices.get('VIX', {})
+
+    index_html = f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -339,21 +679,30 @@ index_html = f"""<!DOCTYPE html>
         </section>
         
         <section class="brief-content">
-            {md_to_html(latest_brief)}
+            {render_markdown(signals.strip_block(latest_brief))}
         </section>
         
+        {build_signals_panel(signal_summary)}
+        {build_health_panel(list(runs))}
+
+        <section class="archive search">
+            <h2>🔍 搜索简报存档</h2>
+            <input id="search-input" type="search" placeholder="股票代码、关键词或评级, 如: AMD SELL" autocomplete="off">
+            <p id="search-status" class="status"></p>
+            <ul id="search-results" class="archive-list"></ul>
+        </section>
+
         <section class="archive">
             <h2>📁 历史简报</h2>
             <ul class="archive-list">
 """
 
-# 获取所有历史简报
-brief_files = sorted(glob.glob('trades/output/briefs/brief_*.md'), reverse=True)
-for brief_file in brief_files[:10]:  # 最近10份
-    date = os.path.basename(brief_file).replace('brief_', '').replace('.md', '')
-    index_html += f'                <li><a href="briefs/{date}.html">📄 {date} 交易简报</a></li>\n'
+    # 最近10份历史简报
+    for brief_file in brief_files[:10]:
+        date = brief_date(brief_file)
+        index_html += f'                <li><a href="briefs/{date}.html">📄 {date} 交易简报</a></li>\n'
 
-index_html += """
+    index_html += """
             </ul>
         </section>
     </main>
@@ -364,52 +713,98 @@ index_html += """
             <p>⚠️ 本系统仅供参考，不构成投资建议</p>
         </div>
     </footer>
+    <script src="search/search.js" defer></script>
 </body>
 </html>
 """
-
-with open('docs/index.html', 'w') as f:
-    f.write(index_html)
-
-# 为每份简报生成独立页面
-for brief_file in brief_files:
-    date = os.path.basename(brief_file).replace('brief_', '').replace('.md', '')
-    with open(brief_file, 'r') as f:
-        content = f.read()
-    
-    brief_html = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>交易简报 - {date}</title>
-    <link rel="stylesheet" href="../css/style.css">
-</head>
-<body>
-    <header>
-        <div class="container">
-            <h1>📊 交易简报 - {date}</h1>
-            <p class="subtitle"><a href="../index.html" style="color: var(--accent-blue);">← 返回首页</a></p>
-        </div>
-    </header>
-    
-    <main class="container">
-        <section class="brief-content">
-            {md_to_html(content)}
-        </section>
-    </main>
-    
-    <footer>
-        <div class="container">
-            <p>🤖 由 DeepSeek AI 驱动</p>
-        </div>
-    </footer>
-</body>
-</html>
-"""
-    
-    with open(f'docs/briefs/{date}.html', 'w') as f:
-        f.write(brief_html)
-
-print(f"✓ GitHub Pages 已生成: docs/index.html")
-print(f"✓ 生成了 {len(brief_files)} 份简报页面")
+    return index_html
+
+
+def default_jobs():
+    return int(os.environ.get('PAGES_JOBS', os.cpu_count() or 1))
+
+
+def generate(brief=None, market_data=None, full=False, jobs=None, verify=False):
+    """生成首页与简报页面, 返回构建统计 {"built", "skipped", "removed", "mismatched"}
+
+    brief 为 generate_brief 的输出 ({"path", "content", ...}), market_data 为市场数据;
+    未传入时从磁盘读取。verify=True 时 mismatched 为与串行渲染结果不一致的日期。
+    """
+    jobs = jobs or default_jobs()
+    os.makedirs('docs', exist_ok=True)
+    os.makedirs(BRIEFS_OUTPUT_DIR, exist_ok=True)
+    os.makedirs('docs/css', exist_ok=True)
+
+    print("🌐 生成 GitHub Pages...")
+
+    # 保存CSS (内容不变时不重写)
+    write_if_changed(CSS_PATH, css_content)
+
+    # 读取最新简报
+    if brief is not None:
+        latest_brief = brief['content']
+    else:
+        try:
+            with open('trades/output/briefs/latest.md', 'r') as f:
+                latest_brief = f.read()
+        except:
+            latest_brief = "# 暂无简报\n\n请等待系统生成第一份简报。"
+
+    # 读取市场数据
+    if market_data is None:
+        market_data = artifacts.load('trades/data/market_snapshot.json', {"indices": {}, "market_data": {}})
+
+    # 获取所有历史简报
+    brief_files = sorted(glob.glob(BRIEFS_SOURCE_GLOB), reverse=True)
+
+    # 评级信号表 (增量), 供首页的信号追踪面板使用
+    with metrics.span('pages.signals'):
+        parsed, _, signal_count = signals.update(brief_files, brief_date)
+        signal_summary = signals.summary()
+    metrics.count('pages.signals_parsed', parsed)
+
+    with metrics.span('pages.index'):
+        runs = metrics.load_runs(limit=HEALTH_RUNS)
+        write_if_changed('docs/index.html', build_index(latest_brief, market_data, brief_files, runs, signal_summary))
+
+    # 为每份简报生成独立页面 (增量)
+    with metrics.span('pages.briefs'):
+        built, skipped, removed = build_brief_pages(brief_files, full=full, jobs=jobs)
+    metrics.count('pages.built', built)
+    metrics.count('pages.skipped', skipped)
+    metrics.count('pages.removed', removed)
+
+    # 存档搜索索引 (增量)
+    with metrics.span('pages.search'):
+        indexed, unindexed, shards = search_index.update(brief_files, brief_date)
+        write_if_changed(os.path.join(search_index.SEARCH_DIR, 'search.js'), search_index.SEARCH_JS)
+    metrics.count('pages.search_indexed', indexed)
+
+    print(f"✓ GitHub Pages 已生成: docs/index.html")
+    print(f"✓ 简报页面: 构建 {built} 份, 跳过 {skipped} 份, 删除 {removed} 份 ({jobs} 个进程)")
+    print(f"✓ 信号表: 重新解析 {parsed} 份简报, 共 {signal_count} 条信号")
+    print(f"✓ 搜索索引: 重新索引 {indexed} 份, 移除 {unindexed} 份, 重写 {shards}/{search_index.SHARDS} 个分片")
+
+    result = {"built": built, "skipped": skipped, "removed": removed, "mismatched": []}
+    if verify:
+        result['mismatched'] = mismatched = verify_pages(brief_files)
+        if mismatched:
+            print(f"✗ {len(mismatched)} 份页面与串行渲染结果不一致: {', '.join(mismatched[:10])}")
+        else:
+            print(f"✓ {len(brief_files)} 份页面与串行渲染结果逐字节一致")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成 GitHub Pages")
+    parser.add_argument('--full', action='store_true', help="忽略构建清单, 重新渲染全部简报页面")
+    parser.add_argument('--jobs', type=int, default=default_jobs(),
+                        help="渲染进程数, 1 为串行 (默认: PAGES_JOBS 或 CPU 核数)")
+    parser.add_argument('--verify', action='store_true', help="构建后串行重新渲染并逐字节比对输出")
+    args = parser.parse_args(argv)
+    result = generate(full=args.full, jobs=args.jobs, verify=args.verify)
+    return 1 if result['mismatched'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+众议院财务披露批量文件
+众议院书记官办公室每年发布 {年份}FD.zip, 其中的 XML 索引列出当年所有披露文件
+(议员、类型、日期、DocID)。定期交易报告 (PTR, FilingType=P) 的正文是单独的 PDF:
+    {HOUSE_DISCLOSURES_URL}/financial-pdfs/{年份}FD.zip
+    {HOUSE_DISCLOSURES_URL}/ptr-pdfs/{年份}/{DocID}.pdf
+
+压缩包以流式方式下载到磁盘, 条件请求 (If-Modified-Since) 避免重复下载; 索引用
+iterparse 逐条解析, 不把整个文件读入内存。PTR 正文的文字提取依赖可选的 pypdf,
+未安装时只记录索引 (交易在安装后的运行中补齐); 扫描件 PDF 没有可提取的文字。
+
+设置 CONGRESS_ARCHIVE_DIR 时从本地目录读取 (离线测试):
+    <目录>/{年份}FD.zip
+    <目录>/ptr/{年份}/{DocID}.txt 或 .pdf
+"""
+
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+from xml.etree import ElementTree
+
+import http_cache
+import http_client
+import metrics
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+HOUSE_URL = os.environ.get('HOUSE_DISCLOSURES_URL',
+                           'https://disclosures-clerk.house.gov/public_disc').rstrip('/')
+ARCHIVE_DIR = os.environ.get('CONGRESS_ARCHIVE_DIR')
+DOWNLOAD_DIR = 'trades/data/cache/congress'
+CHUNK_BYTES = 1 << 16
+
+TRANSACTION_TYPES = {'P': 'Purchase', 'S': 'Sale', 'S (partial)': 'Sale (Partial)', 'E': 'Exchange'}
+
+# PTR 正文中的一笔交易, 例如:
+#   SP Apple Inc. - Common Stock (AAPL) [ST] P 01/10/2024 01/11/2024 $1,001 - $15,000
+PTR_TRANSACTION = re.compile(
+    r'(?:\b(?P<owner>SP|JT|DC)\s+)?'
+    r'(?P<asset>[A-Z0-9][^()$:]{2,160}?)\s*\((?P<ticker>[A-Z][A-Z0-9.\-]{0,6})\)\s*'
+    r'(?:\[(?P<kind>[A-Z]{2})\]\s*)?'
+    r'(?P<type>S \(partial\)|P|S|E)\s+'
+    r'(?P<traded>\d{1,2}/\d{1,2}/\d{4})\s+(?P<notified>\d{1,2}/\d{1,2}/\d{4})\s+'
+    r'(?P<amount>\$[\d,]+\s*-\s*\$[\d,]+|Over \$[\d,]+|\$[\d,]+\s*\+?)'
+)
+# 上一笔交易之后的 "F S: New" 等注记会留在资产名称开头
+ASSET_PREFIX = re.compile(r'^(?:.*\b(?P<owner>SP|JT|DC)\s+|(?:New|Amended)\s+)')
+
+
+def iso_date(text):
+    """M/D/YYYY -> YYYY-MM-DD; 无法解析时原样返回"""
+    try:
+        return datetime.strptime(text.strip(), '%m/%d/%Y').strftime('%Y-%m-%d')
+    except (AttributeError, ValueError):
+        return text
+
+
+def _download(url, path):
+    """流式下载到 path; 服务器返回 304 时沿用已有文件。返回 path, 不存在时返回 None"""
+    meta_path = path + '.json'
+    headers = {}
+    if os.path.exists(path):
+        try:
+            with open(meta_path, 'r') as f:
+                last_modified = json.load(f).get('Last-Modified')
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = 0
+    with http_client.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            metrics.count('http.not_modified')
+            return path
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp, path)
+        with open(meta_path, 'w') as f:
+            json.dump({"url": url, "Last-Modified": response.headers.get('Last-Modified')}, f)
+    metrics.count('http.bytes', size)
+    return path
+
+
+def fetch_archive(year):
+    """返回 {年份}FD.zip 的本地路径; 该年份没有文件时返回 None"""
+    if ARCHIVE_DIR:
+        path = os.path.join(ARCHIVE_DIR, f"{year}FD.zip")
+        return path if os.path.exists(path) else None
+    return _download(f"{HOUSE_URL}/financial-pdfs/{year}FD.zip", os.path.join(DOWNLOAD_DIR, f"{year}FD.zip"))
+
+
+def _field_reader(elem):
+    return lambda tag: (elem.findtext(tag) or '').strip()
+
+
+def iter_filings(path):
+    """逐条产出压缩包 XML 索引中的披露文件; 解析完的元素随即释放"""
+    with zipfile.ZipFile(path) as archive:
+        name = next((n for n in archive.namelist() if n.lower().endswith('.xml')), None)
+        if name is None:
+            return
+        with archive.open(name) as f:
+            root = None
+            for event, elem in ElementTree.iterparse(f, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                if event != 'end' or elem.tag != 'Member':
+                    continue
+                field = _field_reader(elem)
+                doc_id = field('DocID')
+                if doc_id:
+                    yield {
+                        "doc_id": doc_id,
+                        "chamber": "house",
+                        "year": int(field('Year') or 0),
+                        "politician": ' '.join(p for p in (field('First'), field('Last'), field('Suffix')) if p),
+                        "state_district": field('StateDst'),
+                        "filing_type": field('FilingType'),
+                        "filing_date": iso_date(field('FilingDate')),
+                    }
+                root.clear()
+
+
+def ptr_text(filing):
+    """PTR 正文文字; 无法提取时返回 None (未安装 pypdf 时不下载)"""
+    year, doc_id = filing['year'], filing['doc_id']
+    if ARCHIVE_DIR:
+        base = os.path.join(ARCHIVE_DIR, 'ptr', str(year), doc_id)
+        if os.path.exists(base + '.txt'):
+            with open(base + '.txt', 'r', encoding='utf-8') as f:
+                return f.read()
+        if not os.path.exists(base + '.pdf') or PdfReader is None:
+            return None
+        with open(base + '.pdf', 'rb') as f:
+            return '\n'.join(page.extract_text() or '' for page in PdfReader(f).pages)
+
+    if PdfReader is None:
+        return None
+    response = http_cache.get(f"{HOUSE_URL}/ptr-pdfs/{year}/{doc_id}.pdf", source='house', timeout=30)
+    if response.status_code != 200:
+        raise RuntimeError(f"{doc_id}.pdf 返回状态码 {response.status_code}")
+    return '\n'.join(page.extract_text() or '' for page in PdfReader(io.BytesIO(response.content)).pages)
+
+
+def parse_ptr(text, filing):
+    """从 PTR 正文中尽量提取带股票代码的交易; 合并换行后按单一正则扫描"""
+    flat = ' '.join(text.split())
+    state = filing['state_district'][:2]
+    trades = []
+    for match in PTR_TRANSACTION.finditer(flat):
+        prefix = ASSET_PREFIX.match(match['asset'])
+        asset = match['asset'][prefix.end():] if prefix else match['asset']
+        owner = match['owner'] or (prefix and prefix['owner']) or 'Self'
+        trades.append({
+            "politician": filing['politician'],
+            "party": "",
+            "state": state,
+            "ticker": match['ticker'],
+            "asset_description": asset.strip(),
+            "transaction_type": TRANSACTION_TYPES.get(match['type'], match['type']),
+            "transaction_date": iso_date(match['traded']),
+            "disclosure_date": filing['filing_date'],
+            "amount_range": ' '.join(match['amount'].split()),
+            "owner": owner,
+        })
+    return trades
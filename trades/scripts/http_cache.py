@@ -0,0 +1,229 @@
+"""
+HTTP 响应缓存
+按 URL 与参数缓存到磁盘, 支持按数据源配置 TTL、ETag/If-Modified-Since 条件请求、
+按总大小的 LRU 淘汰, 以及录制/回放模式
+
+HTTP_CACHE_MODE:
+    normal  - 默认, TTL 内直接使用缓存, 过期后发送条件请求
+    refresh - 忽略 TTL, 总是发送 (条件) 请求
+    off     - 不读写缓存
+    record  - 总是请求网络, 并把响应录制到 HTTP_FIXTURES_DIR
+    replay  - 只从 HTTP_FIXTURES_DIR 回放, 不访问网络
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+import metrics
+from settings import load_settings
+
+MODE = os.environ.get('HTTP_CACHE_MODE', 'normal')
+CACHE_DIR = os.environ.get('HTTP_CACHE_DIR', 'trades/data/cache/http')
+FIXTURES_DIR = os.environ.get('HTTP_FIXTURES_DIR', 'trades/fixtures/http')
+
+_settings = load_settings('http_cache')
+MAX_BYTES = _settings.get('max_bytes', 50 * 1024 * 1024)
+TTL_SECONDS = {"default": 600, **_settings.get('ttl_seconds', {})}
+
+# 随响应保存的头部 (用于回放与条件请求)
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class ReplayMiss(Exception):
+    """回放模式下找不到录制的响应"""
+
+
+class CachedResponse:
+    """与 requests.Response 常用接口兼容的响应对象"""
+
+    def __init__(self, status_code, content, headers, url, from_cache=False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.url = url
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def cache_key(method, url, params=None):
+    normalized = json.dumps([method.upper(), url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _paths(directory, key):
+    base = os.path.join(directory, key[:2], key)
+    return base + '.json', base + '.body'
+
+
+def _read_entry(directory, key):
+    meta_path, body_path = _paths(directory, key)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None, None
+    return meta, body
+
+
+def _write_entry(directory, key, meta, body):
+    meta_path, body_path = _paths(directory, key)
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta, indent=2), 'w')):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def _touch(directory, key):
+    """更新访问时间, 作为 LRU 依据"""
+    meta_path, _ = _paths(directory, key)
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+
+
+def evict(directory=CACHE_DIR, max_bytes=MAX_BYTES):
+    """总大小超过上限时, 按最近访问时间从旧到新删除条目"""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(root, name)
+            body_path = meta_path[:-5] + '.body'
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                entries.append((os.path.getmtime(meta_path), size, meta_path, body_path))
+            except OSError:
+                continue
+            total += size
+
+    removed = 0
+    for _, size, meta_path, body_path in sorted(entries):
+        if total <= max_bytes:
+            break
+        for path in (meta_path, body_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+# 自上次淘汰以来写入的字节数; 超过上限的 1/10 时才扫描缓存目录, 进程退出时再检查一次
+_written_since_evict = 0
+
+
+def _maybe_evict(size):
+    global _written_since_evict
+    _written_since_evict += size
+    if _written_since_evict > MAX_BYTES / 10:
+        _written_since_evict = 0
+        evict()
+
+
+atexit.register(lambda: _written_since_evict and evict())
+
+
+def _response_from_entry(meta, body, from_cache=True):
+    return CachedResponse(meta['status_code'], body, meta.get('headers', {}), meta['url'], from_cache)
+
+
+def _store(directory, key, method, url, params, source, response):
+    headers = {h: response.headers[h] for h in KEPT_HEADERS if h in response.headers}
+    meta = {
+        "method": method,
+        "url": url,
+        "params": params or {},
+        "source": source,
+        "status_code": response.status_code,
+        "headers": headers,
+        "stored_at": time.time(),
+    }
+    _write_entry(directory, key, meta, response.content)
+    return meta
+
+
+def _send(method, url, params, headers, timeout, limit=None, **kwargs):
+    """经共享客户端发送网络请求 (连接复用、重试与限额, 耗时与字节数由其记录); 缓存命中不占用限额"""
+    return http_client.request(method, url, params=params, headers=headers, timeout=timeout, limit=limit, **kwargs)
+
+
+def request(method, url, params=None, headers=None, source='default', timeout=10, limit=None, **kwargs):
+    """带缓存的 HTTP 请求, 只缓存 GET 的 200 响应"""
+    key = cache_key(method, url, params)
+
+    if MODE == 'replay':
+        meta, body = _read_entry(FIXTURES_DIR, key)
+        if meta is None:
+            metrics.count('http.replay_misses')
+            raise ReplayMiss(f"{method} {url} {params or ''} 没有录制的响应")
+        metrics.count('http.cache_hits')
+        return _response_from_entry(meta, body)
+
+    if MODE in ('off', 'record') or method.upper() != 'GET':
+        response = _send(method, url, params, headers, timeout, limit, **kwargs)
+        if MODE == 'record':
+            _store(FIXTURES_DIR, key, method, url, params, source, response)
+        return CachedResponse(response.status_code, response.content, response.headers, response.url)
+
+    meta, body = _read_entry(CACHE_DIR, key)
+    ttl = TTL_SECONDS.get(source, TTL_SECONDS['default'])
+    if meta is not None and MODE != 'refresh' and time.time() - meta['stored_at'] < ttl:
+        _touch(CACHE_DIR, key)
+        metrics.count('http.cache_hits')
+        return _response_from_entry(meta, body)
+
+    # 过期条目: 使用 ETag / Last-Modified 发送条件请求
+    headers = dict(headers or {})
+    if meta is not None:
+        cached_headers = CaseInsensitiveDict(meta.get('headers', {}))
+        if 'ETag' in cached_headers:
+            headers['If-None-Match'] = cached_headers['ETag']
+        if 'Last-Modified' in cached_headers:
+            headers['If-Modified-Since'] = cached_headers['Last-Modified']
+
+    metrics.count('http.cache_misses')
+    try:
+        response = _send(method, url, params, headers, timeout, limit, **kwargs)
+    except requests.RequestException:
+        if meta is None:
+            raise
+        print(f"  ⚠ 请求失败, 使用过期缓存: {url}")
+        metrics.count('http.stale_fallbacks')
+        return _response_from_entry(meta, body)
+
+    if response.status_code == 304 and meta is not None:
+        metrics.count('http.not_modified')
+        meta['stored_at'] = time.time()
+        _write_entry(CACHE_DIR, key, meta, body)
+        return _response_from_entry(meta, body)
+
+    if response.status_code == 200:
+        _store(CACHE_DIR, key, method, url, params, source, response)
+        _maybe_evict(len(response.content))
+    return CachedResponse(response.status_code, response.content, response.headers, response.url)
+
+
+def get(url, params=None, headers=None, source='default', timeout=10, limit=None, **kwargs):
+    return request('GET', url, params=params, headers=headers, source=source, timeout=timeout, limit=limit, **kwargs)
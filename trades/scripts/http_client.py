@@ -0,0 +1,212 @@
+"""
+共享 HTTP 客户端
+所有脚本的网络请求都经过这里 (http_cache 在缓存未命中时也调用本模块):
+
+- 进程内共享一个 requests.Session, 按主机复用 keep-alive 连接
+- 连接错误、超时与 429/5xx 按指数退避重试 (带随机抖动), 响应带 Retry-After 时按其等待;
+  非幂等请求 (POST 等) 只在 429 或连接尚未建立 (连接超时、被拒绝、DNS 失败) 时重试, 避免重复发送通知
+- 按限额组限制并发数与速率 (令牌桶); 主机到限额组的映射与各组参数在
+  trades/config/settings.json 的 http_client 节中配置, 调用方也可用 limit= 指定组名
+  (例如 SEC 的速率上限对 www.sec.gov 与 data.sec.gov 合计)
+- 每个主机的请求延迟计入 metrics 直方图 http.latency
+"""
+
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+import metrics
+from settings import load_settings
+
+_settings = load_settings('http_client')
+TIMEOUT = float(_settings.get('timeout_seconds', 20))
+RETRIES = int(_settings.get('retries', 3))
+BACKOFF_SECONDS = float(_settings.get('backoff_seconds', 0.5))
+MAX_BACKOFF_SECONDS = float(_settings.get('max_backoff_seconds', 30))
+POOL_SIZE = int(_settings.get('pool_size', 32))
+RETRY_STATUSES = frozenset(_settings.get('retry_statuses', [429, 500, 502, 503, 504]))
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class TokenBucket:
+    """线程安全的令牌桶: 平均速率 rate 次/秒, 最多积攒 capacity 个令牌"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """预订一个令牌, 返回需要等待的秒数 (令牌可以透支, 等待时间随排队长度增加)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            metrics.count('http.throttled')
+            time.sleep(wait)
+
+
+class Limit:
+    """一个限额组: 并发上限 (信号量) 与速率上限 (令牌桶), 未配置的一项不限制"""
+
+    def __init__(self, name, concurrency=None, requests_per_second=None):
+        self.name = name
+        self.concurrency = int(concurrency) if concurrency else None
+        self.requests_per_second = float(requests_per_second) if requests_per_second else None
+        self.semaphore = threading.BoundedSemaphore(self.concurrency) if self.concurrency else None
+        self.bucket = TokenBucket(self.requests_per_second) if self.requests_per_second else None
+
+    def __enter__(self):
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+
+# SEC 的公平访问政策是硬性要求, 配置缺失时也保留
+DEFAULT_LIMITS = {"sec": {"hosts": ["www.sec.gov", "data.sec.gov"], "requests_per_second": 8, "concurrency": 8}}
+_limits = {**DEFAULT_LIMITS, **_settings.get('limits', {})}
+LIMITS = {name: Limit(name, conf.get('concurrency'), conf.get('requests_per_second')) for name, conf in _limits.items()}
+HOST_LIMITS = {host: name for name, conf in _limits.items() for host in conf.get('hosts', [])}
+UNLIMITED = Limit('unlimited')
+
+
+def limit_for(url, name=None):
+    """URL 对应的限额组; name 优先, 其次按主机名查找"""
+    name = name or HOST_LIMITS.get(urlsplit(url).hostname or '')
+    return LIMITS.get(name, UNLIMITED) if name else UNLIMITED
+
+
+def retry_after(headers):
+    """Retry-After 头 (秒数或 HTTP 日期) 对应的等待秒数; 没有或无法解析时返回 None"""
+    value = (headers or {}).get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, headers=None):
+    """第 attempt 次失败后的等待秒数: 优先 Retry-After, 否则为带抖动的指数退避, 均不超过上限"""
+    delay = retry_after(headers)
+    if delay is None:
+        delay = BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+    return min(delay, MAX_BACKOFF_SECONDS)
+
+
+def not_sent(error):
+    """连接尚未建立的错误 (连接超时、连接被拒绝、DNS 解析失败), 请求没有到达服务器"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def should_retry(method, status_code):
+    if status_code not in RETRY_STATUSES:
+        return False
+    return method.upper() in IDEMPOTENT_METHODS or status_code == 429
+
+
+_session_lock = threading.Lock()
+_session = None
+
+
+def session():
+    """进程内共享的 Session (连接池按主机复用连接)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def _note_retry(host, attempt, reason, delay):
+    metrics.count('http.retries')
+    print(f"    ↻ {host}: 第 {attempt} 次请求失败 ({reason}), {delay:.1f}s 后重试")
+
+
+def request(method, url, params=None, headers=None, timeout=None, limit=None, retries=None, stream=False,
+            **kwargs):
+    """发送请求并按策略重试, 返回 requests.Response (最后一次的响应, 可能仍为 429/5xx)
+
+    stream=True 时在收到响应头后即返回 (并发名额随之释放), 由调用方读取正文并关闭响应。
+    重试用尽仍连接失败时抛出 requests.RequestException。
+    """
+    host = urlsplit(url).netloc
+    group = limit_for(url, limit)
+    retries = RETRIES if retries is None else retries
+    timeout = TIMEOUT if timeout is None else timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        error = None
+        with group:
+            started = time.perf_counter()
+            try:
+                with metrics.span('http.request', label=host):
+                    response = session().request(method, url, params=params, headers=headers, timeout=timeout,
+                                                 stream=stream, **kwargs)
+                    if not stream:
+                        # 读取正文也计入延迟与并发名额
+                        response.content
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            metrics.observe('http.latency', time.perf_counter() - started, host)
+
+        if error is not None:
+            metrics.count('http.errors')
+            # 非幂等请求只在连接尚未建立时重试
+            retryable = method.upper() in IDEMPOTENT_METHODS or not_sent(error)
+            if attempt > retries or not retryable:
+                raise error
+            delay = backoff_delay(attempt)
+            _note_retry(host, attempt, type(error).__name__, delay)
+            time.sleep(delay)
+            continue
+
+        metrics.count('http.requests')
+        if not stream:
+            metrics.count('http.bytes', len(response.content))
+        if attempt > retries or not should_retry(method, response.status_code):
+            return response
+        delay = backoff_delay(attempt, response.headers)
+        _note_retry(host, attempt, f"状态码 {response.status_code}", delay)
+        response.close()
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -0,0 +1,92 @@
+"""
+技术指标引擎
+所有指标都以 (日期 × 股票) 矩阵为输入, 一次计算整个监控列表, 不逐只股票循环
+"""
+
+import numpy as np
+import pandas as pd
+
+RETURN_WINDOWS = (1, 5, 20, 60)
+
+
+def rsi(close, period=14):
+    """Wilder RSI"""
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    return 100 - 100 / (1 + gain / loss)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """返回 (MACD 线, 信号线, 柱状图)"""
+    line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, num_std=2.0):
+    """返回 (上轨, 中轨, 下轨, %B)"""
+    mid = close.rolling(window).mean()
+    std = close.rolling(window).std(ddof=0)
+    upper = mid + num_std * std
+    lower = mid - num_std * std
+    return upper, mid, lower, (close - lower) / (upper - lower)
+
+
+def atr(high, low, close, period=14):
+    """Wilder ATR"""
+    prev_close = close.shift(1).to_numpy()
+    true_range = np.fmax.reduce([
+        (high - low).to_numpy(),
+        np.abs(high.to_numpy() - prev_close),
+        np.abs(low.to_numpy() - prev_close),
+    ])
+    true_range = pd.DataFrame(true_range, index=close.index, columns=close.columns)
+    return true_range.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+
+
+def volume_ratio(volume, window=20):
+    """当日成交量相对前 window 日均量的倍数"""
+    return volume / volume.rolling(window).mean().shift(1)
+
+
+def compute_indicators(close, high, low, volume, spike_multiplier=2.0):
+    """计算全部指标, 返回 {指标名: DataFrame(日期 × 股票)}"""
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_upper, _, bb_lower, bb_pct_b = bollinger(close)
+    vol_ratio = volume_ratio(volume)
+
+    result = {
+        "rsi_14": rsi(close),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_hist,
+        "bb_upper": bb_upper,
+        "bb_lower": bb_lower,
+        "bb_pct_b": bb_pct_b,
+        "atr_14": atr(high, low, close),
+        "volume_ratio": vol_ratio,
+        "volume_spike": (vol_ratio >= spike_multiplier).where(vol_ratio.notna()),
+    }
+    for n in RETURN_WINDOWS:
+        result[f"return_{n}d"] = close.pct_change(n, fill_method=None)
+    return result
+
+
+def latest_values(indicators, max_stale=5):
+    """取每个指标在最近一个有效日期的值, 返回 {ticker: {指标名: 值}}
+
+    最后几天缺失的数据 (停牌等) 最多向前填充 max_stale 天。
+    """
+    frame = pd.DataFrame({
+        name: values.iloc[-(max_stale + 1):].ffill().iloc[-1]
+        for name, values in indicators.items()
+        if len(values)
+    }).astype(float).round(4)
+    spike = frame.pop('volume_spike') if 'volume_spike' in frame else None
+
+    latest = frame.astype(object).where(frame.notna(), None).to_dict('index')
+    if spike is not None:
+        for ticker, value in spike.items():
+            latest[ticker]['volume_spike'] = bool(value) if value == value else None
+    return latest
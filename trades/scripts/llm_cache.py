@@ -0,0 +1,69 @@
+"""
+LLM 结果缓存
+以规范化输入 (generate_brief.py 传入最终的提示)、模板、模型与调用参数的哈希作为键,
+把生成的简报正文保存到磁盘。提示未变化时重新运行 generate_brief.py 直接复用已生成的简报, 不再调用 API。
+
+BRIEF_CACHE_TTL_HOURS - 覆盖 settings.json 中的 llm_cache.ttl_hours
+BRIEF_CACHE_REFRESH=1 - 忽略已有缓存, 强制重新生成 (结果仍会写入缓存)
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from settings import load_settings
+
+CACHE_DIR = os.environ.get('BRIEF_CACHE_DIR', 'trades/data/cache/llm')
+
+_settings = load_settings('llm_cache')
+TTL_HOURS = float(os.environ.get('BRIEF_CACHE_TTL_HOURS', _settings.get('ttl_hours', 24)))
+REFRESH = os.environ.get('BRIEF_CACHE_REFRESH', '') not in ('', '0')
+
+# 每次收集都会变化、但不影响分析内容的字段
+VOLATILE_KEYS = frozenset(('timestamp', 'generated_at', 'fetched_at'))
+
+
+def normalize(data):
+    """去掉易变字段并固定键顺序, 使相同内容得到相同的序列化结果"""
+    if isinstance(data, dict):
+        return {k: normalize(v) for k, v in sorted(data.items()) if k not in VOLATILE_KEYS}
+    if isinstance(data, list):
+        return [normalize(v) for v in data]
+    return data
+
+
+def cache_key(inputs, template, model, params):
+    payload = json.dumps(
+        {"inputs": normalize(inputs), "template": template, "model": model, "params": params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, key[:2], key + '.json')
+
+
+def lookup(key, ttl_hours=TTL_HOURS):
+    """返回未过期的缓存正文, 没有则返回 None"""
+    if REFRESH:
+        return None
+    try:
+        with open(_path(key), 'r') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if time.time() - entry.get('stored_at', 0) > ttl_hours * 3600:
+        return None
+    return entry
+
+
+def store(key, content, model, params):
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = {"stored_at": time.time(), "model": model, "params": params, "content": content}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(entry, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
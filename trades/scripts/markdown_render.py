@@ -0,0 +1,251 @@
+"""
+Markdown 渲染器
+逐行单遍解析简报中实际使用的语法: YAML front matter、标题、段落、分隔线、
+引用块、代码块、管道表格、有序/无序嵌套列表, 以及行内粗体/斜体/代码/链接。
+所有正则在导入时预编译。
+"""
+
+import html
+import re
+
+FRONT_MATTER = re.compile(r'\A---\n(.*?)\n---\n', re.DOTALL)
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+HR = re.compile(r'^\s{0,3}([-*_])(?:\s*\1){2,}\s*$')
+FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})\s*([\w+-]*)')
+BLOCKQUOTE = re.compile(r'^\s{0,3}> ?')
+LIST_ITEM = re.compile(r'^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$')
+TABLE_SEP = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+
+# 行内语法: 代码 | 粗体 | 斜体 | 链接, 一次扫描完成
+INLINE = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\*\*(?P<strong>.+?)\*\*'
+    r'|__(?P<strong2>.+?)__'
+    r'|\*(?P<em>[^*\s](?:[^*]*[^*\s])?)\*'
+    r'|\[(?P<text>[^\]]+)\]\((?P<href>[^)\s]+)\)'
+)
+
+
+def split_front_matter(md_text):
+    """返回 (front matter 中的顶层键值, 正文)"""
+    match = FRONT_MATTER.match(md_text)
+    if not match:
+        return {}, md_text
+    meta = {}
+    for line in match.group(1).splitlines():
+        if line and not line[0].isspace() and ':' in line:
+            key, _, value = line.partition(':')
+            meta[key.strip()] = value.strip()
+    return meta, md_text[match.end():]
+
+
+def _escape(text):
+    if '&' in text or '<' in text or '>' in text:
+        return html.escape(text, quote=False)
+    return text
+
+
+def render_inline(text):
+    if '*' not in text and '`' not in text and '_' not in text and '[' not in text:
+        return _escape(text)
+    out = []
+    pos = 0
+    for match in INLINE.finditer(text):
+        out.append(_escape(text[pos:match.start()]))
+        kind = match.lastgroup
+        if kind == 'code':
+            out.append(f'<code>{_escape(match.group("code"))}</code>')
+        elif kind in ('strong', 'strong2'):
+            out.append(f'<strong>{render_inline(match.group(kind))}</strong>')
+        elif kind == 'em':
+            out.append(f'<em>{render_inline(match.group("em"))}</em>')
+        else:
+            out.append(f'<a href="{html.escape(match.group("href"))}">{render_inline(match.group("text"))}</a>')
+        pos = match.end()
+    out.append(_escape(text[pos:]))
+    return ''.join(out)
+
+
+def _split_row(line):
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|'):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split('|')]
+
+
+def _render_table(lines):
+    header = _split_row(lines[0])
+    aligns = []
+    for cell in _split_row(lines[1]):
+        if cell.startswith(':') and cell.endswith(':'):
+            aligns.append('center')
+        elif cell.endswith(':'):
+            aligns.append('right')
+        elif cell.startswith(':'):
+            aligns.append('left')
+        else:
+            aligns.append(None)
+
+    def row(cells, tag):
+        parts = []
+        for i in range(len(header)):
+            cell = cells[i] if i < len(cells) else ''
+            align = aligns[i] if i < len(aligns) else None
+            style = f' style="text-align: {align}"' if align else ''
+            parts.append(f'<{tag}{style}>{render_inline(cell)}</{tag}>')
+        return '<tr>' + ''.join(parts) + '</tr>'
+
+    body = [row(_split_row(line), 'td') for line in lines[2:]]
+    return ('<table>\n<thead>\n' + row(header, 'th') + '\n</thead>\n'
+            + ('<tbody>\n' + '\n'.join(body) + '\n</tbody>\n' if body else '') + '</table>')
+
+
+def _render_list(lines):
+    """按缩进构建嵌套列表; 非列表项的缩进行并入当前列表项"""
+    out = []
+    stack = []  # [(缩进, 标签)]
+    for line in lines:
+        match = LIST_ITEM.match(line)
+        if not match:
+            if line.strip():
+                out.append(render_inline(line.strip()))
+            continue
+        indent = len(match.group(1).expandtabs(4))
+        marker, text = match.group(2), match.group(3)
+        tag = 'ul' if marker in '-*+' else 'ol'
+
+        if stack and indent < stack[-1][0]:
+            while len(stack) > 1 and indent < stack[-1][0]:
+                out[-1] += '</li>'
+                out.append(f'</{stack.pop()[1]}>')
+            # 缩进落在两层之间 (2/4 空格混用) 时, 作为最近一层不深于它的列表的同级项
+            indent = stack[-1][0]
+        if stack and indent == stack[-1][0]:
+            out[-1] += '</li>'
+            if stack[-1][1] != tag:
+                out.append(f'</{stack.pop()[1]}>')
+        if not stack or indent > stack[-1][0]:
+            start = int(marker[:-1]) if tag == 'ol' else 1
+            out.append(f'<{tag}>' if start == 1 else f'<{tag} start="{start}">')
+            stack.append((indent, tag))
+        out.append(f'<li>{render_inline(text)}')
+
+    while stack:
+        out[-1] += '</li>'
+        out.append(f'</{stack.pop()[1]}>')
+    return '\n'.join(out)
+
+
+# 块级语法的首字符, 用于在调用正则之前快速分派
+BLOCK_CHARS = frozenset('#`~>-*_+0123456789')
+
+
+def _is_table_start(lines, i):
+    return '|' in lines[i] and i + 1 < len(lines) and TABLE_SEP.match(lines[i + 1]) is not None
+
+
+def _starts_block(lines, i):
+    line = lines[i]
+    if line.lstrip()[:1] in BLOCK_CHARS and (
+            HEADING.match(line) or HR.match(line) or FENCE.match(line) or BLOCKQUOTE.match(line)
+            or LIST_ITEM.match(line)):
+        return True
+    return _is_table_start(lines, i)
+
+
+def _collect_table(lines, i):
+    table = [lines[i], lines[i + 1]]
+    i += 2
+    while i < len(lines) and '|' in lines[i] and lines[i].strip():
+        table.append(lines[i])
+        i += 1
+    return _render_table(table), i
+
+
+def _collect_paragraph(lines, i):
+    paragraph = [lines[i].strip()]
+    i += 1
+    while i < len(lines) and lines[i].strip() and not _starts_block(lines, i):
+        paragraph.append(lines[i].strip())
+        i += 1
+    return f'<p>{render_inline(chr(10).join(paragraph))}</p>', i
+
+
+def _collect_list(lines, i):
+    items = []
+    n = len(lines)
+    while i < n:
+        current = lines[i]
+        if LIST_ITEM.match(current) or (current.strip() and current[0] in ' \t'):
+            items.append(current)
+            i += 1
+        elif not current.strip() and i + 1 < n and (
+                LIST_ITEM.match(lines[i + 1]) or lines[i + 1][:1] in (' ', '\t')):
+            i += 1
+        else:
+            break
+    return _render_list(items), i
+
+
+def _collect_fence(lines, i, marker, lang):
+    i += 1
+    code = []
+    while i < len(lines) and not lines[i].lstrip().startswith(marker):
+        code.append(lines[i])
+        i += 1
+    cls = f' class="language-{lang}"' if lang else ''
+    return f'<pre><code{cls}>{html.escape(chr(10).join(code), quote=False)}</code></pre>', i + 1
+
+
+def _collect_blockquote(lines, i):
+    quoted = []
+    while i < len(lines) and BLOCKQUOTE.match(lines[i]):
+        quoted.append(BLOCKQUOTE.sub('', lines[i], count=1))
+        i += 1
+    return '<blockquote>\n' + render_blocks(quoted) + '\n</blockquote>', i
+
+
+def render_blocks(lines):
+    out = []
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        first = line.lstrip()[:1]
+        if not first:
+            i += 1
+            continue
+
+        # 普通文本行只可能是表格或段落, 无需逐个尝试块级正则
+        if first not in BLOCK_CHARS:
+            block, i = _collect_table(lines, i) if _is_table_start(lines, i) else _collect_paragraph(lines, i)
+            out.append(block)
+            continue
+
+        fence = FENCE.match(line)
+        heading = HEADING.match(line) if not fence else None
+        if fence:
+            block, i = _collect_fence(lines, i, fence.group(1), fence.group(2))
+        elif heading:
+            level = len(heading.group(1))
+            block, i = f'<h{level}>{render_inline(heading.group(2))}</h{level}>', i + 1
+        elif HR.match(line):
+            block, i = '<hr>', i + 1
+        elif BLOCKQUOTE.match(line):
+            block, i = _collect_blockquote(lines, i)
+        elif _is_table_start(lines, i):
+            block, i = _collect_table(lines, i)
+        elif LIST_ITEM.match(line):
+            block, i = _collect_list(lines, i)
+        else:
+            block, i = _collect_paragraph(lines, i)
+        out.append(block)
+
+    return '\n'.join(out)
+
+
+def render_markdown(md_text):
+    """将简报 Markdown 渲染为 HTML 片段 (front matter 不输出)"""
+    _, body = split_front_matter(md_text.replace('\r\n', '\n'))
+    return render_blocks(body.split('\n'))
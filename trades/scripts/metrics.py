@@ -0,0 +1,212 @@
+"""
+运行指标
+各脚本用 span() 记录耗时 (阶段 / 单只股票 / 单个 HTTP 请求), 用 count() 记录计数器
+(请求数、传输字节、重试、缓存命中等), 用 observe() 把耗时计入分桶直方图 (如按主机的
+HTTP 延迟)。进程退出时把本阶段的指标合并写入
+trades/data/metrics/run_<日期>.json; 并发运行的多个阶段通过文件锁串行合并。
+
+阶段名取环境变量 PIPELINE_STAGE (由管道设置), 否则为脚本文件名。管道同时传入
+阶段启动时间与运行日期, 使阶段耗时包含解释器启动, 且跨午夜的运行仍写入同一个文件。
+在同一进程中运行多个阶段时, 用 stage() 划定各阶段, 线程池使用 ContextThreadPool,
+指标即按阶段分别记录与写出。
+"""
+
+import atexit
+import bisect
+import concurrent.futures
+import contextvars
+import fcntl
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = 'trades/data/metrics'
+STAGE = os.environ.get('PIPELINE_STAGE') or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+
+# 每个 span 名保留的最慢实例数 (带标签, 如股票代码或主机名)
+SLOWEST_KEPT = 10
+
+# 延迟直方图的桶上界 (秒); 最后一个桶计入更慢的观测值
+HISTOGRAM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_started_epoch = float(os.environ.get('PIPELINE_STAGE_STARTED') or time.time())
+_started_at = datetime.fromtimestamp(_started_epoch)
+RUN_DATE = os.environ.get('PIPELINE_RUN_DATE') or _started_at.strftime('%Y-%m-%d')
+
+# 进程内运行多个阶段时 (管道的 --in-process 模式), 指标按当前上下文的阶段分别记录
+_current_stage = contextvars.ContextVar('metrics_stage', default=None)
+_stages = {}
+
+
+def _new_record(started_epoch):
+    return {"started": started_epoch, "ended": None, "spans": {}, "counters": {}, "histograms": {}}
+
+
+def _record():
+    """当前阶段的指标记录 (调用方持有 _lock)"""
+    name = _current_stage.get() or STAGE
+    record = _stages.get(name)
+    if record is None:
+        record = _stages[name] = _new_record(_started_epoch)
+    return record
+
+
+@contextmanager
+def stage(name):
+    """在代码块 (及其通过 ContextThreadPool 提交的任务) 中把指标记入阶段 name"""
+    with _lock:
+        _stages[name] = _new_record(time.time())
+    token = _current_stage.set(name)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+        with _lock:
+            _stages[name]["ended"] = time.time()
+
+
+class ContextThreadPool(concurrent.futures.ThreadPoolExecutor):
+    """任务在提交者的上下文中运行的线程池, 工作线程中的指标与输出仍计入提交者所在的阶段"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def record_span(name, seconds, label=None):
+    with _lock:
+        entry = _record()["spans"].setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "slowest": []})
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        if label is not None:
+            slowest = entry["slowest"]
+            slowest.append([str(label), round(seconds, 4)])
+            slowest.sort(key=lambda item: -item[1])
+            del slowest[SLOWEST_KEPT:]
+
+
+@contextmanager
+def span(name, label=None):
+    """记录代码块耗时; 异常时同样记录, 并计入 <name>.errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        count(f"{name}.errors")
+        raise
+    finally:
+        record_span(name, time.perf_counter() - started, label)
+
+
+def count(name, value=1):
+    with _lock:
+        counters = _record()["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+
+def observe(name, seconds, label=None):
+    """把一次耗时计入直方图 name 中标签为 label 的序列"""
+    with _lock:
+        entry = _record()["histograms"].setdefault(name, {}).setdefault(
+            str(label), {"count": 0, "sum": 0.0, "buckets": [0] * (len(HISTOGRAM_BUCKETS) + 1)})
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["buckets"][bisect.bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+
+
+def quantile(entry, q):
+    """由直方图估计分位数 (返回所在桶的上界; 落在最后一个桶时返回 None)"""
+    target = q * entry["count"]
+    seen = 0
+    for bound, n in zip(HISTOGRAM_BUCKETS, entry["buckets"]):
+        seen += n
+        if n and seen >= target:
+            return bound
+    return None
+
+
+def snapshot(name=None):
+    """阶段 name (默认为当前阶段) 目前为止的指标"""
+    with _lock:
+        record = _stages.get(name) if name else _record()
+        record = record or _new_record(_started_epoch)
+        spans = {
+            span_name: {**entry, "total": round(entry["total"], 4), "max": round(entry["max"], 4),
+                        "slowest": [list(item) for item in entry["slowest"]]}
+            for span_name, entry in record["spans"].items()
+        }
+        counters = dict(record["counters"])
+        histograms = {
+            hist_name: {label: {**entry, "sum": round(entry["sum"], 4), "buckets": list(entry["buckets"])}
+                        for label, entry in series.items()}
+            for hist_name, series in record["histograms"].items()
+        }
+        started, ended = record["started"], record["ended"]
+    return {
+        "started_at": datetime.fromtimestamp(started).isoformat(),
+        "wall": round((ended or time.time()) - started, 4),
+        "spans": spans,
+        "counters": counters,
+        "histograms": histograms,
+        "histogram_bounds": list(HISTOGRAM_BUCKETS),
+    }
+
+
+def run_path(date=None, directory=METRICS_DIR):
+    return os.path.join(directory, f"run_{date or RUN_DATE}.json")
+
+
+def merge(stage, data, path=None):
+    """把一个阶段的指标合并进当天的运行文件 (同一阶段重复运行时以最近一次为准)"""
+    path = path or run_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path, 'r') as f:
+                run = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            run = {"date": os.path.basename(path)[4:-5], "stages": {}}
+        run["stages"][stage] = data
+        run["updated_at"] = datetime.now().isoformat()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(run, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def flush(path=None):
+    """把本进程记录过指标的各阶段合并进运行文件"""
+    with _lock:
+        names = [name for name, record in _stages.items()
+                 if record["spans"] or record["counters"] or record["histograms"]]
+    for name in names:
+        merge(name, snapshot(name), path)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except OSError as e:
+        print(f"  ⚠ 指标写入失败: {e}")
+
+
+atexit.register(_flush_at_exit)
+
+
+def load_runs(limit=30, directory=METRICS_DIR):
+    """按日期升序返回最近 limit 次运行的指标"""
+    runs = []
+    for path in sorted(glob.glob(os.path.join(directory, 'run_*.json')))[-limit:]:
+        try:
+            with open(path, 'r') as f:
+                runs.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return runs
@@ -0,0 +1,190 @@
+"""
+Polymarket 概率时间序列存储
+每次运行把各市场的首个结果价格 (通常为 Yes 的概率)、成交量与流动性作为定长记录
+追加到 trades/data/store/polymarket/snapshots.bin; 市场 id 到整数编号的映射与问题文本
+保存在同目录的 markets.json。记录按写入时间升序, 读取时使用内存映射, 只访问查询窗口。
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'trades/data/store/polymarket'
+
+SNAPSHOT_DTYPE = np.dtype([
+    ('ts', '<M8[s]'),
+    ('market', '<u4'),
+    ('price', '<f4'),
+    ('volume', '<f4'),
+    ('liquidity', '<f4'),
+])
+
+# n 日变化的截止时刻向后放宽 n 日的这一比例, 定时任务启动时间的抖动不会让基准多退一次运行
+CUTOFF_SLACK = 0.1
+
+
+def _snapshots_path(store_dir):
+    return os.path.join(store_dir, 'snapshots.bin')
+
+
+def _markets_path(store_dir):
+    return os.path.join(store_dir, 'markets.json')
+
+
+def load_markets(store_dir=STORE_DIR):
+    """返回 {市场 id: {"index", "question", "end_date"}}"""
+    try:
+        with open(_markets_path(store_dir), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def first_price(prices):
+    """Gamma API 的 outcomePrices 可能是 JSON 字符串、列表或字典; 取 Yes (或第一个) 结果的价格"""
+    if isinstance(prices, str):
+        try:
+            prices = json.loads(prices)
+        except json.JSONDecodeError:
+            return np.nan
+    if isinstance(prices, dict):
+        prices = [prices['Yes']] if 'Yes' in prices else list(prices.values())
+    try:
+        return float(prices[0])
+    except (TypeError, ValueError, IndexError, KeyError):
+        return np.nan
+
+
+def _open_snapshots(store_dir=STORE_DIR):
+    """以只读内存映射打开快照; 忽略未写完整的尾部记录"""
+    path = _snapshots_path(store_dir)
+    try:
+        count = os.path.getsize(path) // SNAPSHOT_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.empty(0, dtype=SNAPSHOT_DTYPE)
+    return np.memmap(path, dtype=SNAPSHOT_DTYPE, mode='r', shape=(count,))
+
+
+def append_snapshot(markets, timestamp=None, store_dir=STORE_DIR):
+    """追加一次运行的市场快照, 返回写入的记录数
+
+    markets 为 collect_polymarket.py 输出的市场列表; 新市场分配递增编号。
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    known = load_markets(store_dir)
+    ts = np.datetime64(pd.Timestamp(timestamp or pd.Timestamp.now()).floor('s'), 's')
+
+    records = np.empty(len(markets), dtype=SNAPSHOT_DTYPE)
+    kept = 0
+    for market in markets:
+        market_id = str(market.get('id') or '')
+        price = first_price(market.get('outcome_prices'))
+        if not market_id or np.isnan(price):
+            continue
+        entry = known.setdefault(market_id, {"index": len(known)})
+        entry["question"] = market.get('question')
+        entry["end_date"] = market.get('end_date')
+        records[kept] = (ts, entry["index"], price,
+                         float(market.get('volume') or 0), float(market.get('liquidity') or 0))
+        kept += 1
+
+    with open(_snapshots_path(store_dir), 'ab') as f:
+        records[:kept].tofile(f)
+    tmp = f"{_markets_path(store_dir)}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(known, f, ensure_ascii=False)
+    os.replace(tmp, _markets_path(store_dir))
+    return kept
+
+
+def load_snapshots(start=None, end=None, store_dir=STORE_DIR):
+    """返回 [start, end] 时间区间内的快照记录 (内存映射切片)"""
+    snapshots = _open_snapshots(store_dir)
+    lo = np.searchsorted(snapshots['ts'], np.datetime64(pd.Timestamp(start), 's'), 'left') if start else 0
+    hi = np.searchsorted(snapshots['ts'], np.datetime64(pd.Timestamp(end), 's'), 'right') if end else len(snapshots)
+    return snapshots[lo:hi]
+
+
+def history(market_id, start=None, end=None, store_dir=STORE_DIR):
+    """单个市场的时间序列 DataFrame (price / volume / liquidity)"""
+    entry = load_markets(store_dir).get(str(market_id))
+    if entry is None:
+        return pd.DataFrame(columns=['price', 'volume', 'liquidity'])
+    snapshots = load_snapshots(start, end, store_dir)
+    rows = snapshots[snapshots['market'] == entry['index']]
+    return pd.DataFrame({field: np.asarray(rows[field], dtype='f8') for field in ('price', 'volume', 'liquidity')},
+                        index=pd.DatetimeIndex(rows['ts'], name='ts'))
+
+
+def _last_rows(snapshots, offset=0):
+    """每个市场在 snapshots 中的最后一条记录, 返回 (市场编号, 记录下标 + offset), 按编号升序"""
+    markets, reversed_index = np.unique(np.asarray(snapshots['market'])[::-1], return_index=True)
+    return markets.astype('int64'), offset + len(snapshots) - 1 - reversed_index
+
+
+def deltas(days, now=None, store_dir=STORE_DIR):
+    """各市场最新价格相对 days 天前的变化, 返回以市场 id 为索引的 DataFrame
+
+    只包含截止时刻 (now - days, 放宽 CUTOFF_SLACK) 之后仍有记录的市场; 基准取截止时刻及之前
+    的最后一条记录, 没有这么早的记录时基准与变化为 NaN。基准从截止时刻起向前按倍增的窗口
+    查找, 找齐所有市场即停止, 通常只读取最近一段记录。
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now())
+    window = pd.Timedelta(days=days)
+    cutoff = now - window * (1 - CUTOFF_SLACK)
+    snapshots = _open_snapshots(store_dir)
+    times = snapshots['ts']
+    split = np.searchsorted(times, np.datetime64(cutoff.floor('s'), 's'), 'right')
+    end = np.searchsorted(times, np.datetime64(now.floor('s'), 's'), 'right')
+    columns = ['question', 'price', 'base_price', 'change', 'volume', 'liquidity', 'observed_at', 'base_at']
+    if end <= split:
+        return pd.DataFrame(columns=columns)
+
+    groups, last = _last_rows(snapshots[split:end], split)
+    base = np.full(len(groups), -1)
+    hi, span = split, window
+    while hi > 0 and (base < 0).any():
+        lo = np.searchsorted(times, np.datetime64((cutoff - span).floor('s'), 's'), 'left')
+        found, rows = _last_rows(snapshots[lo:hi], lo)
+        if len(found):
+            position = np.minimum(np.searchsorted(found, groups), len(found) - 1)
+            hit = (base < 0) & (found[position] == groups)
+            base[hit] = rows[position[hit]]
+        hi, span = lo, span * 2
+
+    by_index = {entry['index']: (market_id, entry.get('question')) for market_id, entry in
+                load_markets(store_dir).items()}
+    names = [by_index.get(int(i), (str(i), None)) for i in groups]
+    has_base = base >= 0
+    base = np.where(has_base, base, 0)
+    price = np.asarray(snapshots['price'][last], dtype='f8')
+    base_price = np.where(has_base, np.asarray(snapshots['price'][base], dtype='f8'), np.nan)
+    return pd.DataFrame({
+        'question': [question for _, question in names],
+        'price': price,
+        'base_price': base_price,
+        'change': price - base_price,
+        'volume': np.asarray(snapshots['volume'][last], dtype='f8'),
+        'liquidity': np.asarray(snapshots['liquidity'][last], dtype='f8'),
+        'observed_at': np.asarray(snapshots['ts'][last]),
+        'base_at': np.where(has_base, np.asarray(snapshots['ts'][base]), np.datetime64('NaT')),
+    }, index=pd.Index([market_id for market_id, _ in names], name='id'))
+
+
+def top_movers(days=1, limit=10, min_volume=0.0, now=None, store_dir=STORE_DIR):
+    """按 days 天内概率变化绝对值降序的前 limit 个市场 (同时附上 7 天变化)"""
+    frame = deltas(days, now, store_dir)
+    frame = frame[(frame['volume'] >= min_volume) & (frame['base_at'] < frame['observed_at'])
+                  & (frame['change'].abs() > 0)]
+    if frame.empty:
+        return frame
+    frame = frame.iloc[np.argsort(-frame['change'].abs().to_numpy(), kind='stable')[:limit]]
+    if days != 7:
+        frame = frame.assign(change_7d=deltas(7, now, store_dir)['change'].reindex(frame.index))
+    else:
+        frame = frame.assign(change_7d=frame['change'])
+    return frame
@@ -0,0 +1,153 @@
+"""
+价格历史存储
+每只股票一个定长记录的二进制分区 (trades/data/store/prices/<TICKER>.bin),
+记录按日期升序追加; 读取时使用内存映射, 只访问所需日期区间
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = 'trades/data/store/prices'
+BACKFILL_PERIOD = os.environ.get('MARKET_BACKFILL_PERIOD', '2y')
+# 重叠日线的收盘价相对误差超过此值时视为复权基准变化
+REBASE_TOLERANCE = 1e-4
+
+BAR_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+FRAME_COLUMNS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+
+def _path(ticker, store_dir):
+    return os.path.join(store_dir, f"{ticker}.bin")
+
+
+def _open_bars(ticker, store_dir=STORE_DIR):
+    """以只读内存映射打开分区; 忽略未写完整的尾部记录"""
+    path = _path(ticker, store_dir)
+    try:
+        count = os.path.getsize(path) // BAR_DTYPE.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    return np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,))
+
+
+def load_bars(ticker, start=None, end=None, store_dir=STORE_DIR):
+    """返回 [start, end] 区间内的日线记录 (内存映射切片, 不读取整段历史)"""
+    bars = _open_bars(ticker, store_dir)
+    lo = np.searchsorted(bars['date'], np.datetime64(start, 'D'), 'left') if start else 0
+    hi = np.searchsorted(bars['date'], np.datetime64(end, 'D'), 'right') if end else len(bars)
+    return bars[lo:hi]
+
+
+def last_date(ticker, store_dir=STORE_DIR):
+    bars = _open_bars(ticker, store_dir)
+    return bars['date'][-1] if len(bars) else None
+
+
+def fetch_window(ticker, store_dir=STORE_DIR):
+    """返回下载参数: 无历史时整段回填, 否则从倒数第二根日线开始只取增量
+
+    最后一根日线会被重新获取, 以覆盖盘中写入的未收盘数据; 倒数第二根已收盘,
+    用于核对复权基准 (见 rebased)。
+    """
+    dates = _open_bars(ticker, store_dir)['date'][-2:]
+    if not len(dates):
+        return {"period": BACKFILL_PERIOD}
+    return {"start": str(dates[0])}
+
+
+def frame_to_bars(frame):
+    """将 yfinance 的 OHLCV DataFrame 转为结构化记录"""
+    frame = frame.dropna(subset=['Close'])
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    bars['date'] = np.array(frame.index.strftime('%Y-%m-%d'), dtype='datetime64[D]')
+    for field, column in FRAME_COLUMNS.items():
+        bars[field] = frame[column].to_numpy(dtype='f8') if column in frame else np.nan
+    return np.sort(bars, order='date')
+
+
+def bars_to_frame(bars):
+    """将结构化记录转为与 yfinance 相同列名的 DataFrame"""
+    index = pd.DatetimeIndex(bars['date'], name='Date')
+    return pd.DataFrame({column: np.asarray(bars[field]) for field, column in FRAME_COLUMNS.items()},
+                        index=index)
+
+
+def upsert_bars(ticker, frame, store_dir=STORE_DIR):
+    """写入新下载的日线, 返回新增日线数
+
+    从新数据的第一天起截断旧分区再追加, 只改写分区尾部。
+    """
+    bars = frame_to_bars(frame)
+    if not len(bars):
+        return 0
+    os.makedirs(store_dir, exist_ok=True)
+
+    existing = _open_bars(ticker, store_dir)
+    cut = int(np.searchsorted(existing['date'], bars['date'][0], 'left'))
+    added = len(bars) - (len(existing) - cut)
+    del existing
+
+    path = _path(ticker, store_dir)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(cut * BAR_DTYPE.itemsize)
+        f.truncate()
+        bars.tofile(f)
+    return max(added, 0)
+
+
+def rebased(ticker, frame, store_dir=STORE_DIR):
+    """新下载的复权日线与已存日线在重叠日期上的收盘价是否不一致
+
+    拆股或分红后 Yahoo 会按新基准重新复权全部历史, 只追加增量会在序列中留下虚假的跳变,
+    此时需要删除分区并整段回填。不比较最后一根已存日线 (可能是盘中写入的未收盘数据)。
+    """
+    bars = frame_to_bars(frame)
+    existing = _open_bars(ticker, store_dir)[:-1]
+    _, new, old = np.intersect1d(bars['date'], existing['date'], return_indices=True)
+    if not len(new):
+        return False
+    return not np.allclose(bars['close'][new], existing['close'][old], rtol=REBASE_TOLERANCE, equal_nan=True)
+
+
+def remove(ticker, store_dir=STORE_DIR):
+    """删除一只股票的分区 (下次按 fetch_window 整段回填)"""
+    try:
+        os.remove(_path(ticker, store_dir))
+    except FileNotFoundError:
+        pass
+
+
+def load_matrix(tickers, start=None, end=None, fields=('close', 'volume'), store_dir=STORE_DIR):
+    """返回 {field: DataFrame(日期 × 股票)}, 按日期并集对齐, 缺失值为 NaN"""
+    columns = {field: {} for field in fields}
+    for ticker in tickers:
+        bars = load_bars(ticker, start, end, store_dir)
+        if not len(bars):
+            continue
+        index = pd.DatetimeIndex(bars['date'])
+        for field in fields:
+            columns[field][ticker] = pd.Series(np.asarray(bars[field]), index=index)
+
+    matrices = {}
+    for field in fields:
+        frame = pd.concat(columns[field], axis=1) if columns[field] else pd.DataFrame()
+        matrices[field] = frame.reindex(columns=list(tickers)).sort_index()
+    return matrices
+
+
+def load_close_volume(tickers, start=None, end=None, store_dir=STORE_DIR):
+    """返回对齐后的 (收盘价矩阵, 成交量矩阵)"""
+    matrices = load_matrix(tickers, start, end, ('close', 'volume'), store_dir)
+    return matrices['close'], matrices['volume']
@@ -0,0 +1,375 @@
+"""
+简报提示构建
+在明确的 token 预算内把收集到的数据渲染为紧凑的 Markdown 表格:
+每个数据段按相关性排序, 只保留完整的行, 超出预算的行整行舍弃并注明数量
+"""
+
+import json
+import os
+import re
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('BRIEF_PROMPT_TOKEN_BUDGET', '6000'))
+
+# 各数据段的预算权重; 未用完的预算会再分配给被截断的数据段
+SECTION_WEIGHTS = {
+    "market": 0.3,
+    "technicals": 0.15,
+    "congress": 0.15,
+    "insider": 0.1,
+    "sec": 0.1,
+    "polymarket": 0.15,
+    "backtest": 0.05,
+}
+
+SYSTEM_PROMPT = "你是一位专业的投资分析师，擅长分析市场数据、内幕交易信号和预测市场。你的分析应该客观、专业、有数据支撑。"
+
+PROMPT_TEMPLATE = """
+你是一位专业的投资分析师。请基于以下数据生成一份详细的每日交易简报。
+
+## 今日日期
+{date}
+
+## 监控列表
+{watchlist}
+
+{sections}
+
+---
+
+请生成一份结构化的交易简报，包含以下部分：
+
+1. **执行摘要** - 今日最重要的3-5个发现
+2. **市场概览** - 主要指数表现和市场情绪
+3. **信号分析** - 分析国会交易、内幕交易、技术指标等信号的含义，并引用"信号回测"中同类历史事件的超额收益 (注明覆盖率)
+4. **具体建议** - 针对监控列表中的股票给出具体建议（BUY/HOLD/SELL/WATCH）
+5. **风险警示** - 需要关注的风险因素
+6. **预测市场洞察** - Polymarket数据的解读
+7. **明日关注** - 明天需要关注的事件和数据
+
+请使用Markdown格式，确保分析专业、客观、有数据支撑。
+
+最后，请在简报末尾附上机器可读的评级块，覆盖"具体建议"中的每只股票，每行一个 JSON 对象
+（action 为 BUY/HOLD/SELL/WATCH，confidence 为 0 到 1 的置信度），块内不要添加其他内容：
+
+```signals
+{{"ticker": "NVDA", "action": "BUY", "confidence": 0.85}}
+```
+"""
+
+CJK = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+AMOUNT = re.compile(r'\$?([\d,]+)')
+
+# SEC 文件类型的重要性 (越小越重要); Form 4 由内幕交易部分覆盖, 不在此排序, 与未知类型一起排在最后
+FORM_PRIORITY = {"8-K": 0, "SC 13D": 1, "10-Q": 2, "10-K": 2, "S-1": 3, "DEF 14A": 4}
+
+
+def estimate_tokens(text):
+    """粗略估计 token 数: 中日韩字符约 0.6 token/字, 其余约 4 字符/token"""
+    cjk = len(CJK.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) / 4) + 1
+
+
+def _num(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def fmt_number(value, digits=2):
+    value = _num(value)
+    if value is None:
+        return '-'
+    for threshold, suffix in ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if abs(value) >= threshold:
+            return f"{value / threshold:.{digits}f}{suffix}"
+    return f"{value:.{digits}f}"
+
+
+def fmt_pct(value, scale=1):
+    value = _num(value)
+    return '-' if value is None else f"{value * scale:+.2f}%"
+
+
+def fmt_points(value):
+    """概率变化, 以百分点表示"""
+    value = _num(value)
+    return '-' if value is None else f"{value * 100:+.1f}pp"
+
+
+def fmt_outcomes(prices):
+    """Gamma API 的 outcomePrices 可能是 JSON 字符串、列表或字典"""
+    if isinstance(prices, str):
+        try:
+            prices = json.loads(prices)
+        except json.JSONDecodeError:
+            return prices
+    try:
+        if isinstance(prices, dict):
+            return ' / '.join(f"{k} {float(v):.2f}" for k, v in prices.items())
+        return ' / '.join(f"{float(v):.2f}" for v in prices)
+    except (TypeError, ValueError):
+        return str(prices)
+
+
+def _cell(value):
+    text = '-' if value is None or value == '' else str(value)
+    return text.replace('|', '/').replace('\n', ' ')
+
+
+def table_lines(columns, rows):
+    """返回 (表头行, 数据行列表)"""
+    header = '| ' + ' | '.join(columns) + ' |\n|' + '---|' * len(columns)
+    return header, ['| ' + ' | '.join(_cell(v) for v in row) + ' |' for row in rows]
+
+
+def fit_rows(header, rows, budget):
+    """在预算内按顺序保留完整的行, 返回 (文本, 保留行数)"""
+    lines = [header]
+    used = estimate_tokens(header)
+    kept = 0
+    for row in rows:
+        cost = estimate_tokens(row) + 1
+        if used + cost > budget:
+            break
+        lines.append(row)
+        used += cost
+        kept += 1
+    if kept < len(rows):
+        lines.append(f"\n(另有 {len(rows) - kept} 条未列出)")
+    return '\n'.join(lines), kept
+
+
+def amount_upper_bound(amount_range):
+    """'$1,000,001 - $5,000,000' -> 5000000"""
+    values = [int(v.replace(',', '')) for v in AMOUNT.findall(amount_range or '') if v.replace(',', '')]
+    return max(values) if values else 0
+
+
+# ---------- 各数据段: 排序并转为表格行 ----------
+
+def market_rows(stocks, focus_ticker=None):
+    def relevance(item):
+        ticker, data = item
+        tech = data.get('technicals') or {}
+        return (
+            ticker != focus_ticker,
+            not tech.get('volume_spike'),
+            -abs(_num(data.get('change_percent')) or 0),
+            -abs(_num(tech.get('return_20d')) or 0),
+        )
+
+    rows = []
+    for ticker, data in sorted(((t, d) for t, d in stocks.items() if 'error' not in d), key=relevance):
+        rows.append([
+            ticker,
+            fmt_number(data.get('price')),
+            fmt_pct(data.get('change_percent')),
+            fmt_number(data.get('volume'), 1),
+            fmt_number(data.get('avg_volume'), 1),
+            fmt_number(data.get('market_cap'), 1),
+            fmt_number(data.get('pe_ratio'), 1),
+            fmt_number(data.get('50d_avg')),
+            fmt_number(data.get('200d_avg')),
+            f"{fmt_number(data.get('52w_low'))}-{fmt_number(data.get('52w_high'))}",
+            data.get('sector'),
+        ])
+    return ['代码', '价格', '涨跌', '成交量', '均量', '市值', 'PE', '50日均线', '200日均线', '52周区间', '板块'], rows
+
+
+def technical_rows(stocks, focus_ticker=None):
+    def notes(tech):
+        flags = []
+        rsi = _num(tech.get('rsi_14'))
+        if rsi is not None and rsi >= 70:
+            flags.append('超买')
+        elif rsi is not None and rsi <= 30:
+            flags.append('超卖')
+        pct_b = _num(tech.get('bb_pct_b'))
+        if pct_b is not None and pct_b > 1:
+            flags.append('突破上轨')
+        elif pct_b is not None and pct_b < 0:
+            flags.append('跌破下轨')
+        if tech.get('volume_spike'):
+            flags.append('成交量异动')
+        return flags
+
+    items = [(t, d['technicals']) for t, d in stocks.items() if isinstance(d, dict) and d.get('technicals')]
+    items.sort(key=lambda item: (item[0] != focus_ticker, -len(notes(item[1])),
+                                 -abs(_num(item[1].get('return_20d')) or 0)))
+    rows = []
+    for ticker, tech in items:
+        rows.append([
+            ticker,
+            fmt_number(tech.get('rsi_14'), 1),
+            fmt_number(tech.get('macd_hist')),
+            fmt_number(tech.get('bb_pct_b')),
+            fmt_number(tech.get('atr_14')),
+            fmt_pct(tech.get('return_5d'), 100),
+            fmt_pct(tech.get('return_20d'), 100),
+            fmt_pct(tech.get('return_60d'), 100),
+            fmt_number(tech.get('volume_ratio')),
+            '、'.join(notes(tech)),
+        ])
+    return ['代码', 'RSI14', 'MACD柱', '%B', 'ATR14', '5日', '20日', '60日', '量比', '信号'], rows
+
+
+def congress_rows(trades, politicians=(), focus_ticker=None):
+    watched = set(politicians)
+    ordered = sorted(trades, key=lambda t: (t.get('ticker') != focus_ticker,
+                                           t.get('politician') not in watched,
+                                           -amount_upper_bound(t.get('amount_range'))))
+    rows = [[
+        t.get('politician'),
+        '-'.join(filter(None, (t.get('party'), t.get('state')))),
+        t.get('ticker'),
+        t.get('transaction_type'),
+        t.get('amount_range'),
+        t.get('transaction_date'),
+        t.get('disclosure_date'),
+    ] for t in ordered]
+    return ['议员', '党派', '代码', '类型', '金额', '交易日', '披露日'], rows
+
+
+def insider_rows(trades, focus_ticker=None):
+    ordered = sorted(trades, key=lambda t: (t.get('ticker') != focus_ticker, -(_num(t.get('shares')) or 0)))
+    rows = [[
+        t.get('ticker'),
+        t.get('insider_name'),
+        t.get('relation'),
+        t.get('transaction_type'),
+        fmt_number(t.get('shares'), 1),
+        t.get('latest_trans_date'),
+    ] for t in ordered]
+    return ['代码', '内部人', '职位', '类型', '股数', '日期'], rows
+
+
+def sec_rows(filings, focus_ticker=None):
+    ordered = sorted(filings, key=lambda f: str(f.get('date', '')), reverse=True)
+    ordered.sort(key=lambda f: (f.get('ticker') != focus_ticker, FORM_PRIORITY.get(f.get('type'), 9)))
+    rows = [[f.get('ticker'), f.get('type'), f.get('title'), f.get('date')] for f in ordered]
+    return ['代码', '类型', '标题', '日期'], rows
+
+
+def polymarket_rows(markets):
+    ordered = sorted(markets, key=lambda m: -(float(m.get('volume') or 0)))
+    rows = [[
+        m.get('question'),
+        fmt_outcomes(m.get('outcome_prices')),
+        fmt_number(float(m.get('volume') or 0), 1),
+        fmt_number(float(m.get('liquidity') or 0), 1),
+        (m.get('end_date') or '')[:10],
+    ] for m in ordered]
+    return ['问题', '结果价格', '成交量', '流动性', '截止'], rows
+
+
+def mover_rows(movers):
+    rows = [[
+        m.get('question'),
+        f"{float(m.get('price') or 0):.2f}",
+        fmt_points(m.get('change_1d')),
+        fmt_points(m.get('change_7d')),
+        fmt_number(float(m.get('volume') or 0), 1),
+    ] for m in movers]
+    return ['问题', '当前概率', '1日变化', '7日变化', '成交量'], rows
+
+
+def polymarket_table_rows(polymarket):
+    """有历史快照时只列出概率变化最大的市场, 首次运行时按成交量列出"""
+    if polymarket.get('movers'):
+        return mover_rows(polymarket['movers'])
+    return polymarket_rows(polymarket.get('markets', []))
+
+
+def backtest_rows(summary):
+    """事件研究汇总 (backtest.py): 按 t 值绝对值排序, 统计上最显著的分组在前"""
+    groups = sorted(summary.get('groups', []), key=lambda g: -abs(_num(g.get('t_stat')) or 0))
+    sides = {'buy': '买入', 'sell': '卖出'}
+    sources = {'congress': '国会', 'insider': '内幕'}
+    rows = [[
+        sources.get(g.get('source'), g.get('source')),
+        sides.get(g.get('side'), g.get('side')),
+        f"{g.get('horizon')}日",
+        g.get('events'),
+        fmt_pct(g.get('mean_return'), 100),
+        fmt_pct(g.get('mean_abnormal'), 100),
+        '-' if _num(g.get('hit_rate')) is None else f"{g['hit_rate']:.0%}",
+        fmt_number(g.get('t_stat')),
+    ] for g in groups]
+    return ['来源', '方向', '期限', '事件数', '平均收益', f"超额收益 (vs {summary.get('benchmark', '^GSPC')})",
+            '胜率', 't值'], rows
+
+
+def backtest_coverage(summary):
+    """事件覆盖率: 只有价格库中有行情的股票计入统计, 简报引用时需要知道样本范围"""
+    total = sum((summary.get('events') or {}).values())
+    if not total:
+        return ''
+    evaluated = summary.get('evaluated') or 0
+    text = f"覆盖: {evaluated}/{total} 个事件 ({evaluated / total:.0%}) 有价格历史并计入统计"
+    if summary.get('price_range'):
+        text += f", 价格区间 {summary['price_range'][0]} ~ {summary['price_range'][1]}"
+    return text
+
+
+def index_table(indices):
+    rows = [[name, fmt_number(d.get('price')), fmt_pct(d.get('change_percent'))]
+            for name, d in indices.items() if 'error' not in d]
+    header, lines = table_lines(['指数', '点位', '涨跌'], rows)
+    return '\n'.join([header] + lines) if rows else '暂无数据'
+
+
+def build_prompt(market_data, congress_trades, insider_trades, sec_filings, polymarket, watchlist,
+                 date_text, focus_ticker=None, budget=DEFAULT_TOKEN_BUDGET, log=print, backtest=None):
+    """构建分析提示, 返回 (提示文本, {数据段: 估计 token 数})
+
+    backtest 为 backtest.py 的事件研究汇总, 缺失时该数据段显示为暂无数据。
+    """
+    stocks = market_data.get('market_data', {})
+    tables = {
+        "market": ("市场数据", market_rows(stocks, focus_ticker)),
+        "technicals": ("技术信号", technical_rows(stocks, focus_ticker)),
+        "congress": ("国会交易", congress_rows(congress_trades.get('trades', []),
+                                              watchlist.get('politicians_to_watch', []), focus_ticker)),
+        "insider": ("内幕交易", insider_rows(insider_trades.get('trades', []), focus_ticker)),
+        "sec": ("SEC文件", sec_rows(sec_filings.get('filings', []), focus_ticker)),
+        "polymarket": ("Polymarket 预测市场", polymarket_table_rows(polymarket)),
+        "backtest": ("信号回测", backtest_rows(backtest or {})),
+    }
+    lines = {name: table_lines(*columns_rows) for name, (_, columns_rows) in tables.items()}
+    notes = {"backtest": backtest_coverage(backtest or {})}
+
+    fixed = PROMPT_TEMPLATE.format(
+        date=date_text,
+        watchlist=', '.join(watchlist.get('tickers', [])),
+        sections=f"## 主要指数\n{index_table(market_data.get('indices', {}))}",
+    )
+    available = max(budget - estimate_tokens(fixed), 0)
+
+    # 第一轮按权重分配; 第二轮把剩余预算按权重分给被截断的数据段
+    shares = {name: available * weight for name, weight in SECTION_WEIGHTS.items()}
+    rendered = {name: fit_rows(header, rows, shares[name]) for name, (header, rows) in lines.items()}
+    leftover = available - sum(estimate_tokens(text) for text, _ in rendered.values())
+    truncated = [name for name, (_, kept) in rendered.items() if kept < len(lines[name][1])]
+    if leftover > 0 and truncated:
+        total_weight = sum(SECTION_WEIGHTS[name] for name in truncated)
+        for name in truncated:
+            extra = leftover * SECTION_WEIGHTS[name] / total_weight
+            rendered[name] = fit_rows(*lines[name], shares[name] + extra)
+
+    sections = [f"## 主要指数\n{index_table(market_data.get('indices', {}))}"]
+    stats = {"主要指数": estimate_tokens(sections[0])}
+    for name, (title, _) in tables.items():
+        text, kept = rendered[name]
+        total = len(lines[name][1])
+        body = text if total else '暂无数据'
+        if notes.get(name):
+            body = f"{notes[name]}\n{body}"
+        sections.append(f"## {title}\n{body}")
+        stats[title] = estimate_tokens(sections[-1])
+        log(f"  📏 {title}: ~{stats[title]} tokens ({kept}/{total} 行)")
+
+    prompt = PROMPT_TEMPLATE.format(
+        date=date_text,
+        watchlist=', '.join(watchlist.get('tickers', [])),
+        sections='\n\n'.join(sections),
+    )
+    log(f"  📏 提示合计: ~{estimate_tokens(prompt)} tokens (预算 {budget})")
+    return prompt, stats
@@ -0,0 +1,308 @@
+"""
+简报存档搜索索引
+网页构建时为全部简报生成倒排索引, 写入 docs/search/, 由首页的搜索框在浏览器中按需加载:
+
+- docs.json: 索引版本、分片数, 以及每份简报的内容哈希与评级标签 (如 NVDA:BUY)
+- shard_XX.json: {词项: 文档列表}; 词项按 FNV-1a 哈希分到 SHARDS 个分片, 查询只下载
+  所含词项所在的分片。文档以 2000-01-01 起的天数编号 (即简报日期), 列表升序并差分编码
+
+词项: 英文单词与股票代码 (小写)、中文按相邻两字切分 (bigram)、各股票的评级
+(由 signals.py 解析; 代码:评级, 如 amd:sell, 以及单独的 sell)。signals 块本身不参与分词。
+
+更新是增量的: 只有内容哈希变化的简报会重新切词, 其旧的倒排项从各分片中移除;
+分片内容不变时不重写文件。分词或分片方式变化时 (VERSION 变化) 全量重建。
+"""
+
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+from datetime import date, timedelta
+
+import signals
+
+SEARCH_DIR = 'docs/search'
+SHARDS = 16
+EPOCH = date(2000, 1, 1)
+
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or',
+    'the', 'to', 'with', 'md', 'html', 'https', 'http', 'www', 'com',
+))
+# 评级 (含中文写法) → 小写词项
+RATINGS = {name: action.lower() for name, action in signals.ACTIONS.items()}
+
+_FRONT_MATTER = re.compile(r'^---\n.*?\n---\n', re.DOTALL)
+_WORD = re.compile(r'[A-Za-z][A-Za-z0-9]*|[一-鿿]+')
+
+
+def shard_of(term, shards=SHARDS):
+    """FNV-1a (32 位) 哈希取模; search.js 中的实现与此一致"""
+    h = 0x811c9dc5
+    for byte in term.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h % shards
+
+
+def tokenize(text):
+    """文本中的词项 (去重前); 查询在浏览器中以相同规则切分"""
+    terms = []
+    for word in _WORD.findall(text):
+        if word.isascii():
+            word = word.lower()
+            if len(word) > 1 and word not in STOPWORDS:
+                terms.append(word)
+        elif len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+
+def rating_tags(text):
+    """各股票的评级, 返回 [(代码, 评级)]; 优先使用 signals 块, 否则解析"具体建议"中的评级文本"""
+    return [(signal['ticker'], signal['action'].lower()) for signal in signals.extract(text)]
+
+
+def document_terms(content):
+    """一份简报的词项集合与评级标签"""
+    body = signals.strip_block(_FRONT_MATTER.sub('', content, count=1))
+    tags = rating_tags(content)
+    terms = set(tokenize(body))
+    for ticker, rating in tags:
+        terms.update((f"{ticker.lower()}:{rating}", rating))
+    return terms, [f"{ticker}:{rating.upper()}" for ticker, rating in tags]
+
+
+# 分词、评级解析或分片方式变化时全量重建
+VERSION = hashlib.sha256(
+    (inspect.getsource(tokenize) + inspect.getsource(rating_tags) + inspect.getsource(shard_of) + signals.VERSION
+     + repr(sorted(STOPWORDS)) + repr(RATINGS) + str(SHARDS)).encode()
+).hexdigest()[:16]
+
+
+def doc_id(day):
+    """简报日期 (YYYY-MM-DD) → 文档编号"""
+    return (date.fromisoformat(day) - EPOCH).days
+
+
+def encode_postings(ids):
+    ids = sorted(ids)
+    return [ids[0]] + [b - a for a, b in zip(ids, ids[1:])] if ids else []
+
+
+def decode_postings(deltas):
+    ids, total = [], 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
+
+
+def _shard_path(n, search_dir):
+    return os.path.join(search_dir, f'shard_{n:02d}.json')
+
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def _write_if_changed(path, data):
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    try:
+        with open(path, 'r') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def update(brief_files, date_of, search_dir=SEARCH_DIR):
+    """按简报内容哈希增量更新索引, 返回 (重新索引数, 移除数, 重写的分片数)
+
+    date_of(文件) 返回简报日期 (YYYY-MM-DD)。
+    """
+    os.makedirs(search_dir, exist_ok=True)
+    meta = _load_json(os.path.join(search_dir, 'docs.json'), {})
+    previous = meta.get('docs', {}) if meta.get('version') == VERSION and meta.get('shards') == SHARDS else {}
+
+    docs, changed = {}, {}
+    for brief_file in brief_files:
+        with open(brief_file, 'rb') as f:
+            raw = f.read()
+        key = str(doc_id(date_of(brief_file)))
+        digest = hashlib.sha256(raw).hexdigest()[:16]
+        if previous.get(key, {}).get('hash') == digest:
+            docs[key] = previous[key]
+            continue
+        terms, tags = document_terms(raw.decode('utf-8', errors='replace'))
+        docs[key] = {"date": date_of(brief_file), "hash": digest, "tags": tags}
+        changed[key] = terms
+    stale = {int(key) for key in previous if key not in docs or key in changed}
+    removed = sum(1 for key in previous if key not in docs)
+
+    # 新增的倒排项按分片分组
+    additions = [{} for _ in range(SHARDS)]
+    for key, terms in changed.items():
+        for term in terms:
+            additions[shard_of(term)].setdefault(term, []).append(int(key))
+
+    rewritten = 0
+    for n in range(SHARDS):
+        path = _shard_path(n, search_dir)
+        if not stale and not additions[n] and os.path.exists(path):
+            continue
+        shard = _load_json(path, {}) if previous else {}
+        postings = {}
+        for term, deltas in shard.items():
+            ids = [i for i in decode_postings(deltas) if i not in stale]
+            if ids:
+                postings[term] = ids
+        for term, ids in additions[n].items():
+            postings.setdefault(term, []).extend(ids)
+        if _write_if_changed(path, {term: encode_postings(ids) for term, ids in postings.items()}):
+            rewritten += 1
+
+    for path in glob.glob(os.path.join(search_dir, 'shard_*.json')):
+        if int(os.path.basename(path)[6:-5]) >= SHARDS:
+            os.remove(path)
+    _write_if_changed(os.path.join(search_dir, 'docs.json'), {"version": VERSION, "shards": SHARDS, "docs": docs})
+    return len(changed), removed, rewritten
+
+
+def search(query, search_dir=SEARCH_DIR):
+    """与浏览器端相同的查询 (供命令行与校验使用), 返回按日期降序的简报日期"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    meta = _load_json(os.path.join(search_dir, 'docs.json'), {})
+    result = None
+    for term in terms:
+        shard = _load_json(_shard_path(shard_of(term, meta.get('shards', SHARDS)), search_dir), {})
+        ids = set(decode_postings(shard.get(term, [])))
+        result = ids if result is None else result & ids
+    return sorted(((EPOCH + timedelta(days=i)).isoformat() for i in result), reverse=True)
+
+
+def query_terms(query):
+    """查询的词项: 同时出现股票代码与评级时合并为 代码:评级"""
+    terms = list(dict.fromkeys(tokenize(query)))
+    ratings = [t for t in terms if t in RATINGS.values()]
+    tickers = [t for t in terms if t.isascii() and t.isalnum() and t not in RATINGS.values() and len(t) <= 5]
+    if len(ratings) == 1 and tickers:
+        terms = [t for t in terms if t != ratings[0] and t not in tickers]
+        terms += [f"{ticker}:{ratings[0]}" for ticker in tickers]
+    return terms
+
+
+SEARCH_JS = r"""// 简报搜索: 按需加载 docs.json 与查询词项所在的分片 (分词与分片规则见 search_index.py)
+(function () {
+  const RATINGS = {BUY: 'buy', SELL: 'sell', HOLD: 'hold', WATCH: 'watch',
+                   '买入': 'buy', '卖出': 'sell', '持有': 'hold', '观望': 'watch'};
+  const STOPWORDS = new Set(%(stopwords)s);
+  const EPOCH = Date.UTC(2000, 0, 1);
+  const cache = {};
+  let meta = null;
+
+  function load(path) {
+    if (!cache[path]) {
+      cache[path] = fetch('search/' + path).then(r => r.ok ? r.json() : {});
+    }
+    return cache[path];
+  }
+
+  function shardOf(term, shards) {
+    let h = 0x811c9dc5;
+    for (const b of new TextEncoder().encode(term)) {
+      h = Math.imul(h ^ b, 0x01000193) >>> 0;
+    }
+    return h %% shards;
+  }
+
+  function tokenize(text) {
+    const terms = [];
+    for (const word of text.match(/[A-Za-z][A-Za-z0-9]*|[一-鿿]+/g) || []) {
+      if (/^[\x00-\x7f]+$/.test(word)) {
+        const w = word.toLowerCase();
+        if (w.length > 1 && !STOPWORDS.has(w)) terms.push(w);
+      } else if (word.length === 1) {
+        terms.push(word);
+      } else {
+        for (let i = 0; i < word.length - 1; i++) terms.push(word.slice(i, i + 2));
+      }
+    }
+    return terms;
+  }
+
+  function queryTerms(query) {
+    let terms = [...new Set(tokenize(query))];
+    const ratingValues = new Set(Object.values(RATINGS));
+    const ratings = terms.filter(t => ratingValues.has(t));
+    const tickers = terms.filter(t => /^[a-z0-9]{1,5}$/.test(t) && !ratingValues.has(t));
+    if (ratings.length === 1 && tickers.length) {
+      terms = terms.filter(t => t !== ratings[0] && !tickers.includes(t));
+      terms = terms.concat(tickers.map(t => t + ':' + ratings[0]));
+    }
+    return terms;
+  }
+
+  function decode(deltas) {
+    let total = 0;
+    return deltas.map(d => (total += d));
+  }
+
+  async function search(query) {
+    const terms = queryTerms(query);
+    if (!terms.length) return [];
+    meta = meta || await load('docs.json');
+    let result = null;
+    for (const term of terms) {
+      const shard = await load('shard_' + String(shardOf(term, meta.shards)).padStart(2, '0') + '.json');
+      const ids = new Set(decode(shard[term] || []));
+      result = result === null ? ids : new Set([...result].filter(i => ids.has(i)));
+    }
+    return [...result].sort((a, b) => b - a);
+  }
+
+  function render(ids, query, list, status) {
+    const wanted = queryTerms(query).filter(t => t.includes(':')).map(t => t.toUpperCase());
+    list.innerHTML = '';
+    for (const id of ids.slice(0, 50)) {
+      const doc = meta.docs[id] || {};
+      const day = doc.date || new Date(EPOCH + id * 86400000).toISOString().slice(0, 10);
+      const tags = (doc.tags || []).filter(t => !wanted.length || wanted.includes(t));
+      const li = document.createElement('li');
+      li.innerHTML = '<a href="briefs/' + day + '.html">📄 ' + day + ' 交易简报</a>' +
+        tags.map(t => ' <span class="tag ' + t.split(':')[1].toLowerCase() + '">' + t + '</span>').join('');
+      list.appendChild(li);
+    }
+    status.textContent = query.trim() ? '找到 ' + ids.length + ' 份简报' : '';
+  }
+
+  document.addEventListener('DOMContentLoaded', () => {
+    const input = document.getElementById('search-input');
+    const list = document.getElementById('search-results');
+    const status = document.getElementById('search-status');
+    if (!input) return;
+    input.addEventListener('focus', () => load('docs.json'), {once: true});
+    let latest = 0;
+    input.addEventListener('input', async () => {
+      const query = input.value;
+      const ticket = ++latest;
+      const ids = await search(query);
+      if (ticket === latest) render(ids, query, list, status);
+    });
+  });
+})();
+""" % {"stopwords": json.dumps(sorted(STOPWORDS))}
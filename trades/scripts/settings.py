@@ -0,0 +1,30 @@
+"""
+运行参数读取
+trades/config/settings.json 按模块分节, 文件缺失或损坏时各模块使用内置默认值;
+load_watchlist() 读取监控列表 trades/config/watchlist.json
+"""
+
+import json
+
+SETTINGS_PATH = 'trades/config/settings.json'
+
+
+def load_settings(section=None, path=SETTINGS_PATH):
+    try:
+        with open(path, 'r') as f:
+            settings = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        settings = {}
+    return settings.get(section, {}) if section else settings
+
+
+WATCHLIST_PATH = 'trades/config/watchlist.json'
+
+
+def load_watchlist(path=WATCHLIST_PATH):
+    """监控列表; 文件缺失或损坏时返回 None, 由调用方使用各自的默认值"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+简报评级信号表
+generate_brief.py 要求模型在简报末尾附上机器可读的 ```signals 块 (每行一个 JSON 对象:
+ticker / action / confidence); 没有该块的旧简报按"具体建议"中的评级与置信度文本解析。
+
+全部简报的信号保存为列式表 trades/data/signals.json:
+{"version", "briefs": {日期: 内容哈希}, "columns": {"date", "ticker", "action", "confidence"}},
+按简报内容哈希增量更新, 解析规则变化时 (VERSION 变化) 全量重新解析。
+
+查询在 pandas 中向量化进行: 每条信号的 N 日远期收益通过 searchsorted 在收盘价矩阵
+(price_store) 中一次定位 (与 backtest.py 共用), 再按股票或评级分组统计命中率。
+BUY/SELL 在远期收益与方向一致时视为命中; HOLD/WATCH 没有方向, 只统计收益。
+
+用法:
+    python trades/scripts/signals.py                 # 回填全部简报并输出命中率
+    python trades/scripts/signals.py --horizon 20 --ticker NVDA
+"""
+
+import argparse
+import glob
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+
+SIGNALS_PATH = 'trades/data/signals.json'
+BRIEFS_GLOB = 'trades/output/briefs/brief_*.md'
+COLUMNS = ('date', 'ticker', 'action', 'confidence')
+
+ACTIONS = {'BUY': 'BUY', 'SELL': 'SELL', 'HOLD': 'HOLD', 'WATCH': 'WATCH',
+           '买入': 'BUY', '卖出': 'SELL', '持有': 'HOLD', '观望': 'WATCH'}
+DIRECTION = {'BUY': 1, 'SELL': -1, 'HOLD': 0, 'WATCH': 0}
+HORIZON_DAYS = 5
+
+BLOCK = re.compile(r'^```signals[ \t]*\n(.*?)^```[ \t]*(?:\n|\Z)', re.DOTALL | re.MULTILINE)
+_FRONT_MATTER = re.compile(r'^---\n.*?\n---\n', re.DOTALL)
+_HEADING_TICKER = re.compile(r'^#{2,4}\s+\$?([A-Z][A-Z0-9]{0,4}(?:[.-][A-Z])?)\b')
+_RATING = re.compile(r'评级.*?(' + '|'.join(ACTIONS) + ')')
+_CONFIDENCE = re.compile(r'置信度\D*?(\d+(?:\.\d+)?)\s*(%?)')
+
+
+def normalize_confidence(value):
+    """85 / "85%" / 0.85 → 0.85; 无法解析时返回 None"""
+    if isinstance(value, str):
+        value = value.strip().rstrip('%')
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if value != value or value < 0:
+        return None
+    return round(min(value / 100 if value > 1 else value, 1.0), 4)
+
+
+def _signal(ticker, action, confidence=None):
+    ticker = str(ticker or '').strip().lstrip('$').upper()
+    action = ACTIONS.get(str(action or '').strip().upper()) or ACTIONS.get(str(action or '').strip())
+    if not ticker or not action:
+        return None
+    return {"ticker": ticker, "action": action, "confidence": normalize_confidence(confidence)}
+
+
+def parse_block(text):
+    """解析 ```signals 块, 返回信号列表; 简报中没有该块时返回 None
+
+    块内每行一个 JSON 对象, 也接受单个 JSON 数组; 无法解析的行被跳过。
+    """
+    match = BLOCK.search(text)
+    if not match:
+        return None
+    body = match.group(1).strip()
+    try:
+        items = json.loads(body) if body.startswith('[') else None
+    except json.JSONDecodeError:
+        items = None
+    if items is None:
+        items = []
+        for line in body.splitlines():
+            try:
+                items.append(json.loads(line.strip().rstrip(',')))
+            except json.JSONDecodeError:
+                continue
+    signals = [_signal(item.get('ticker'), item.get('action'), item.get('confidence'))
+               for item in items if isinstance(item, dict)]
+    return [s for s in signals if s]
+
+
+def parse_legacy(text):
+    """从"具体建议"的文本中解析: 评级与置信度行归属于其上方最近的股票标题"""
+    signals = []
+    ticker = current = None
+    for line in text.splitlines():
+        if line.startswith('#'):
+            heading = _HEADING_TICKER.match(line)
+            ticker = heading.group(1) if heading else None
+            current = None
+            continue
+        if not ticker:
+            continue
+        rating = _RATING.search(line) if current is None else None
+        if rating:
+            current = _signal(ticker, rating.group(1))
+            signals.append(current)
+        confidence = _CONFIDENCE.search(line)
+        if current is not None and confidence and current['confidence'] is None:
+            value = float(confidence.group(1))
+            current['confidence'] = normalize_confidence(value / 100 if confidence.group(2) else value)
+    return signals
+
+
+def extract(content):
+    """一份简报的信号 [{"ticker", "action", "confidence"}]: 优先使用 signals 块, 否则解析评级文本
+
+    同一股票出现多次时保留第一条。
+    """
+    body = _FRONT_MATTER.sub('', content, count=1)
+    signals = parse_block(body)
+    if signals is None:
+        signals = parse_legacy(body)
+    seen = set()
+    unique = []
+    for signal in signals:
+        if signal['ticker'] not in seen:
+            seen.add(signal['ticker'])
+            unique.append(signal)
+    return unique
+
+
+def strip_block(content):
+    """去掉 signals 块 (网页与搜索索引只使用正文)"""
+    return BLOCK.sub('', content)
+
+
+# 解析规则变化时全量重新解析
+VERSION = hashlib.sha256(
+    ''.join(inspect.getsource(f) for f in (normalize_confidence, _signal, parse_block, parse_legacy, extract))
+    .encode() + repr((BLOCK.pattern, _HEADING_TICKER.pattern, _RATING.pattern, _CONFIDENCE.pattern,
+                      sorted(ACTIONS.items()))).encode()
+).hexdigest()[:16]
+
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def _write_if_changed(path, data):
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    try:
+        with open(path, 'r') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def update(brief_files, date_of, path=SIGNALS_PATH):
+    """按简报内容哈希增量更新信号表, 返回 (重新解析数, 移除数, 信号总数)
+
+    date_of(文件) 返回简报日期 (YYYY-MM-DD)。
+    """
+    table = _load_json(path, {})
+    previous = table.get('briefs', {}) if table.get('version') == VERSION else {}
+    columns = table.get('columns', {}) if previous else {}
+
+    briefs, parsed = {}, {}
+    for brief_file in brief_files:
+        with open(brief_file, 'rb') as f:
+            raw = f.read()
+        day = date_of(brief_file)
+        digest = hashlib.sha256(raw).hexdigest()[:16]
+        briefs[day] = digest
+        if previous.get(day) != digest:
+            parsed[day] = extract(raw.decode('utf-8', errors='replace'))
+    dropped = {day for day in previous if day not in briefs} | set(parsed)
+
+    rows = [row for row in zip(*(columns.get(c, []) for c in COLUMNS)) if row[0] not in dropped]
+    for day, signals in parsed.items():
+        rows.extend((day, s['ticker'], s['action'], s['confidence']) for s in signals)
+    rows.sort(key=lambda row: (row[0], row[1]))
+
+    _write_if_changed(path, {
+        "version": VERSION,
+        "briefs": briefs,
+        "columns": {c: [row[i] for row in rows] for i, c in enumerate(COLUMNS)},
+    })
+    return len(parsed), sum(1 for day in previous if day not in briefs), len(rows)
+
+
+def load_frame(path=SIGNALS_PATH):
+    """信号表 → DataFrame (date 为日期, ticker/action 为分类, confidence 缺失为 NaN)"""
+    import pandas as pd
+    columns = _load_json(path, {}).get('columns', {})
+    frame = pd.DataFrame({c: columns.get(c, []) for c in COLUMNS})
+    frame['date'] = pd.to_datetime(frame['date'])
+    frame['ticker'] = frame['ticker'].astype('category')
+    frame['action'] = pd.Categorical(frame['action'], categories=list(DIRECTION))
+    frame['confidence'] = pd.to_numeric(frame['confidence'], errors='coerce')
+    return frame
+
+
+def forward_returns(frame, horizon=HORIZON_DAYS, closes=None):
+    """每条信号的 horizon 个交易日远期收益 (Series, 与 frame 对齐; 价格不足时为 NaN)
+
+    入场价为简报日期当天或之后的第一个收盘价 (简报在开盘前生成)。closes 为 日期 × 股票
+    的收盘价矩阵, 未传入时从 price_store 读取。
+    """
+    import pandas as pd
+    import backtest
+    if closes is None:
+        import price_store
+        tickers = sorted(frame['ticker'].astype(str).unique())
+        start = frame['date'].min().strftime('%Y-%m-%d') if len(frame) else None
+        closes = price_store.load_matrix(tickers, start=start, fields=('close',))['close'] if tickers else pd.DataFrame()
+    result = backtest.forward_returns(closes, frame['date'].to_numpy(), frame['ticker'].astype(str).to_numpy(),
+                                      (horizon,), side='left')
+    return pd.Series(result[:, 0], index=frame.index)
+
+
+def hit_rates(frame, returns, by='action'):
+    """按 by (action 或 ticker) 分组: 信号数、已评估数、命中率、平均远期收益与平均置信度"""
+    import numpy as np
+    import pandas as pd
+    direction = frame['action'].map(DIRECTION).astype(float)
+    evaluated = returns.notna() & (direction != 0)
+    hits = (np.sign(returns) == direction).astype(float).where(evaluated)
+    data = pd.DataFrame({
+        'key': frame[by].astype(str),
+        'evaluated': evaluated,
+        'hit': hits,
+        'return': returns,
+        'confidence': frame['confidence'],
+    })
+    return data.groupby('key', sort=True).agg(
+        signals=('key', 'size'),
+        evaluated=('evaluated', 'sum'),
+        hit_rate=('hit', 'mean'),
+        avg_return=('return', 'mean'),
+        avg_confidence=('confidence', 'mean'),
+    )
+
+
+def _records(table):
+    records = []
+    for key, row in table.iterrows():
+        record = {"key": key}
+        for name, value in row.items():
+            record[name] = None if value != value else (int(value) if name in ('signals', 'evaluated') else
+                                                        round(float(value), 4))
+        records.append(record)
+    return records
+
+
+def summary(path=SIGNALS_PATH, horizon=HORIZON_DAYS, closes=None):
+    """首页信号面板的数据: 按评级与股票的命中率, 以及最新一份简报的信号"""
+    frame = load_frame(path)
+    if frame.empty:
+        return {"horizon_days": horizon, "signals": 0, "by_action": [], "by_ticker": [], "latest": None}
+    returns = forward_returns(frame, horizon, closes)
+    by_ticker = hit_rates(frame, returns, 'ticker').sort_values(['signals', 'evaluated'], ascending=False)
+    latest_date = frame['date'].max()
+    latest = frame[frame['date'] == latest_date]
+    return {
+        "horizon_days": horizon,
+        "signals": len(frame),
+        "by_action": [r for r in _records(hit_rates(frame, returns, 'action')) if r['signals']],
+        "by_ticker": _records(by_ticker),
+        "latest": {
+            "date": latest_date.strftime('%Y-%m-%d'),
+            "signals": [{"ticker": str(t), "action": str(a), "confidence": None if c != c else float(c)}
+                        for t, a, c in zip(latest['ticker'], latest['action'], latest['confidence'])],
+        },
+    }
+
+
+def _print_table(title, table):
+    print(f"\n{title}")
+    print(f"  {'':<8}{'信号':>6}{'已评估':>8}{'命中率':>8}{'平均收益':>10}{'平均置信度':>10}")
+    for key, row in table.iterrows():
+        hit = '-' if row['hit_rate'] != row['hit_rate'] else f"{row['hit_rate']:.0%}"
+        ret = '-' if row['avg_return'] != row['avg_return'] else f"{row['avg_return']:+.2%}"
+        conf = '-' if row['avg_confidence'] != row['avg_confidence'] else f"{row['avg_confidence']:.0%}"
+        print(f"  {key:<8}{int(row['signals']):>6}{int(row['evaluated']):>8}{hit:>8}{ret:>10}{conf:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="从简报存档回填评级信号表并统计命中率")
+    parser.add_argument('--horizon', type=int, default=HORIZON_DAYS, help="远期收益的交易日数")
+    parser.add_argument('--ticker', action='append', default=[], help="只统计指定股票 (可重复)")
+    args = parser.parse_args(argv)
+
+    brief_files = sorted(glob.glob(BRIEFS_GLOB))
+    parsed, removed, total = update(brief_files, lambda f: os.path.basename(f)[len('brief_'):-len('.md')])
+    print(f"📡 信号表: 重新解析 {parsed} 份简报, 移除 {removed} 份, 共 {total} 条信号 ({SIGNALS_PATH})")
+
+    frame = load_frame()
+    if args.ticker:
+        frame = frame[frame['ticker'].astype(str).isin([t.upper() for t in args.ticker])]
+    if frame.empty:
+        print("  暂无信号")
+        return 0
+    returns = forward_returns(frame, args.horizon)
+    print(f"  {int(returns.notna().sum())}/{len(frame)} 条信号有 {args.horizon} 日远期价格")
+    _print_table("按评级:", hit_rates(frame, returns, 'action'))
+    _print_table("按股票:", hit_rates(frame, returns, 'ticker'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())